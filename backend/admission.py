@@ -0,0 +1,145 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class OverloadedError(Exception):
+    """No capacity freed up in time - the caller should shed to its fallback path"""
+
+
+class ConcurrencyLimiter:
+    """At most `max_concurrent` calls at once; the rest wait in FIFO order for up to `queue_timeout` seconds.
+
+    A call that would be waiter number `max_queue` + 1 is turned away at
+    once, and a waiter still without a slot at its deadline gives up - both
+    raise OverloadedError so the request falls back instead of holding its
+    thread while the upstream is slow. `on_shed(reason)` is called for
+    every call turned away ("queue_full" or "queue_timeout").
+    """
+
+    def __init__(self, name, max_concurrent=4, queue_timeout=2.0, max_queue=8, on_shed=None):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.queue_timeout = queue_timeout
+        self.max_queue = max_queue
+        self.on_shed = on_shed
+        self._active = 0
+        self._waiting = 0
+        self._cond = threading.Condition()
+        self._stats = {"admitted": 0, "queued": 0, "queue_full": 0, "queue_timeout": 0, "wait_ms_total": 0.0, "max_wait_ms": 0.0}
+
+    def acquire(self):
+        """Take a slot, waiting up to queue_timeout; raises OverloadedError when none frees up"""
+        started = time.monotonic()
+        reason = None
+        with self._cond:
+            # Newcomers queue behind existing waiters instead of taking a slot just freed for them
+            if self._active < self.max_concurrent and not self._waiting:
+                self._active += 1
+                self._stats["admitted"] += 1
+                return
+            if self._waiting >= self.max_queue:
+                reason = "queue_full"
+            else:
+                self._waiting += 1
+                self._stats["queued"] += 1
+                deadline = started + self.queue_timeout
+                try:
+                    while self._active >= self.max_concurrent:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            reason = "queue_timeout"
+                            break
+                        self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+                if reason is None:
+                    self._active += 1
+                    self._stats["admitted"] += 1
+                    waited = (time.monotonic() - started) * 1000
+                    self._stats["wait_ms_total"] += waited
+                    self._stats["max_wait_ms"] = max(self._stats["max_wait_ms"], waited)
+                    return
+                # Let the next waiter re-check in case a slot freed up as this one gave up
+                self._cond.notify()
+            self._stats[reason] += 1
+        if self.on_shed is not None:
+            self.on_shed(reason)
+        raise OverloadedError(f"{self.name} is overloaded ({reason})")
+
+    def release(self):
+        with self._cond:
+            self._active -= 1
+            self._cond.notify()
+
+    def active(self):
+        with self._cond:
+            return self._active
+
+    def queue_depth(self):
+        with self._cond:
+            return self._waiting
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats["active"] = self._active
+            stats["queue_depth"] = self._waiting
+        wait_ms_total = stats.pop("wait_ms_total")
+        admitted_after_wait = stats["queued"] - stats["queue_timeout"]
+        stats["avg_wait_ms"] = round(wait_ms_total / admitted_after_wait, 2) if admitted_after_wait > 0 else None
+        stats["max_wait_ms"] = round(stats["max_wait_ms"], 2)
+        stats["shed"] = stats["queue_full"] + stats["queue_timeout"]
+        stats.update(max_concurrent=self.max_concurrent, max_queue=self.max_queue, queue_timeout_seconds=self.queue_timeout)
+        return stats
+
+
+class RateLimiter:
+    """Token bucket per key: `rate` tokens a second up to `burst`, one taken per allowed call.
+
+    Only the `max_keys` most recently seen keys are tracked; a key that was
+    evicted starts again with a full bucket. A rate of 0 allows everything.
+    """
+
+    def __init__(self, rate, burst, max_keys=10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        # key -> (tokens, monotonic time they were counted at), least recently seen first
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"allowed": 0, "limited": 0}
+
+    def allow(self, key):
+        if self.rate <= 0:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            tokens, counted_at = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - counted_at) * self.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            self._stats["allowed" if allowed else "limited"] += 1
+        return allowed
+
+    def available(self, key):
+        """Whether allow(key) would let a call through now, without taking a token"""
+        if self.rate <= 0:
+            return True
+        with self._lock:
+            bucket = self._buckets.get(key)
+        if bucket is None:
+            return True
+        tokens, counted_at = bucket
+        return tokens + (time.monotonic() - counted_at) * self.rate >= 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["keys"] = len(self._buckets)
+        stats.update(rate_per_second=self.rate, burst=self.burst)
+        return stats
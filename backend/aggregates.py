@@ -0,0 +1,135 @@
+import threading
+
+LEVELS = (1, 2, 3, 4, 5)
+_LEVEL_BY_LABEL = {str(level): level for level in LEVELS}
+
+
+def rating_level(value):
+    """Rating as 1-5 when it renders as one of the chart labels ("1".."5"), else None.
+
+    The charts used to bucket rows by f"{rate}" strings, so 4.0 or "x" never
+    landed in a bucket while "4" did - keep exactly that behaviour.
+    """
+    if type(value) is int:
+        return value if 1 <= value <= 5 else None
+    return _LEVEL_BY_LABEL.get(str(value))
+
+
+class EmployeeAggregates:
+    """Every group-by count/total the chart and summary builders need, from one pass over the rows"""
+
+    def __init__(self):
+        self.count = 0
+        self.skill_counts = {}
+        self.domain_counts = {}
+        self.skill_interest = [[0] * 5 for _ in LEVELS]
+        self.skill_levels = [0] * 5
+        self.skill_rate_total = 0
+
+    def add(self, emp):
+        self.count += 1
+        skill = emp.get('Sub Category', 'Unknown')
+        self.skill_counts[skill] = self.skill_counts.get(skill, 0) + 1
+        domain = emp.get('Domain', 'Unknown')
+        self.domain_counts[domain] = self.domain_counts.get(domain, 0) + 1
+
+        skill_rate = emp.get('Skill Rate', 0)
+        if isinstance(skill_rate, (int, float)):
+            self.skill_rate_total += skill_rate
+        skill_level = rating_level(skill_rate)
+        if skill_level:
+            self.skill_levels[skill_level - 1] += 1
+        interest_level = rating_level(emp.get('Interest Rate', 0))
+        if skill_level and interest_level:
+            self.skill_interest[skill_level - 1][interest_level - 1] += 1
+
+    def add_cell(self, key, count, skill_rate_total):
+        """Add `count` rows sharing one AggregateCube cell key at once"""
+        domain, category, skill, skill_level, interest_level = key
+        self.count += count
+        self.skill_counts[skill] = self.skill_counts.get(skill, 0) + count
+        self.domain_counts[domain] = self.domain_counts.get(domain, 0) + count
+        self.skill_rate_total += skill_rate_total
+        if skill_level:
+            self.skill_levels[skill_level - 1] += count
+            if interest_level:
+                self.skill_interest[skill_level - 1][interest_level - 1] += count
+
+    def top_skills(self, limit=10):
+        # Stable sort keeps first-seen order among equal counts
+        return sorted(self.skill_counts.items(), key=lambda x: x[1], reverse=True)[:limit]
+
+    def top_domain(self):
+        return max(self.domain_counts, key=self.domain_counts.get)
+
+    def average_skill(self):
+        return self.skill_rate_total / self.count if self.count else 0
+
+
+def aggregate_employees(rows):
+    aggregates = EmployeeAggregates()
+    for emp in rows:
+        aggregates.add(emp)
+    return aggregates
+
+
+def cube_key(emp):
+    """(domain, category, sub category, skill level, interest level) cell of one row"""
+    return (
+        emp.get('Domain', 'Unknown'),
+        emp.get('Category', 'Unknown'),
+        emp.get('Sub Category', 'Unknown'),
+        rating_level(emp.get('Skill Rate', 0)),
+        rating_level(emp.get('Interest Rate', 0))
+    )
+
+
+class AggregateCube:
+    """Materialized row counts per (domain, category, sub category, skill level, interest level).
+
+    Built once per employee snapshot and kept up to date with add_row /
+    remove_row, so whole-population charts roll up a few thousand cells
+    instead of walking every row. Cells are kept in first-seen order, so a
+    roll-up lists domains and skills in the same order as a fresh pass over
+    the rows (rows added later go to the end, as they would in the table).
+    """
+
+    def __init__(self, rows=()):
+        self.cells = {}
+        self._population = None
+        self._lock = threading.Lock()
+        for emp in rows:
+            self._apply(emp, 1)
+
+    def add_row(self, emp):
+        self._apply(emp, 1)
+
+    def remove_row(self, emp):
+        self._apply(emp, -1)
+
+    def rollup(self, predicate=None):
+        """EmployeeAggregates over every cell whose key satisfies `predicate` (all cells by default)"""
+        with self._lock:
+            if predicate is None and self._population is not None:
+                return self._population
+            aggregates = EmployeeAggregates()
+            for key, (count, skill_rate_total) in self.cells.items():
+                if predicate is None or predicate(key):
+                    aggregates.add_cell(key, count, skill_rate_total)
+            if predicate is None:
+                self._population = aggregates
+            return aggregates
+
+    def _apply(self, emp, sign):
+        key = cube_key(emp)
+        skill_rate = emp.get('Skill Rate', 0)
+        skill_rate = skill_rate if isinstance(skill_rate, (int, float)) else 0
+        with self._lock:
+            cell = self.cells.get(key)
+            if cell is None:
+                cell = self.cells[key] = [0, 0]
+            cell[0] += sign
+            cell[1] += sign * skill_rate
+            if cell[0] <= 0:
+                del self.cells[key]
+            self._population = None
@@ -0,0 +1,621 @@
+"""Micro-benchmarks for the backend hot paths on synthetic data.
+
+Usage:
+    python benchmark.py search [--sizes 10000,100000,1000000]
+    python benchmark.py llm [--latency 0.3] [--requests 10]
+    python benchmark.py plan [--sizes 10000,100000] [--rtt 0.02] [--bandwidth 20]
+    python benchmark.py sync [--sizes 10000,100000,1000000] [--changes 10,100,1000]
+    python benchmark.py snapshot [--sizes 10000,100000,1000000]
+    python benchmark.py hotpaths [--sizes 1000,10000,100000] [--save] [--compare [COMMIT]]
+    python benchmark.py parse [--repeat 3]
+
+The hotpaths suite times process_employee_query for every query type,
+generate_visualizations for every chart type, generate_data_summary,
+handle_query_rule_based, clean_and_parse_json on typical LLM replies and
+the whole /api/ai-assistant request against a stub model. --save appends
+the run to benchmark_results.jsonl (keyed by git commit) and --compare
+prints the change against a stored run, flagging regressions.
+
+The parse suite runs the pre-extractor clean_and_parse_json and the
+llm_json extractor with shape coercion over a corpus of analysis and
+course replies, and reports the time per reply and how many of them
+would have fallen back to the rule-based answer or the fallback courses.
+"""
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import random
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+from aggregates import aggregate_employees
+from employee_cache import EmployeeSnapshot
+from employee_store import EmployeeStore
+from llm_json import coerce_analysis, coerce_courses, extract_json
+from snapshot_file import SnapshotFile
+from synthetic_data import generate_employee_rows
+from tests.postgrest_stub import StubSupabase
+
+SEARCH_TERMS = ["python", "react", "script", "data", "cloud", "ops", "flow"]
+
+
+def time_call(func, repeat):
+    """Best-of-`repeat` wall time of func() in milliseconds, plus its last result"""
+    best = None
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def legacy_skill_search(rows, term):
+    """The pre-index skill_name filter from process_employee_query"""
+    skill_filter = term.lower()
+    return [emp for emp in rows
+            if (skill_filter in emp.get('Sub Category', '').lower() or
+                skill_filter in emp.get('Category', '').lower() or
+                skill_filter in emp.get('Domain', '').lower())]
+
+
+def legacy_filtered_scan(rows, domain, term, min_skill):
+    """The pre-index domain + skill_name + min_skill_rate filters from process_employee_query"""
+    filtered = [emp for emp in rows if domain.lower() in emp.get('Domain', '').lower()]
+    filtered = legacy_skill_search(filtered, term)
+    return [emp for emp in filtered if emp.get('Skill Rate', 0) >= min_skill]
+
+
+def bench_search(sizes, repeat):
+    """Single skill_name search (scan vs index, rows materialized) and a three-filter query (row ids only)"""
+    print(f"{'rows':>10} {'build ms':>10} {'scan ms':>10} {'index ms':>10} {'speedup':>8}"
+          f" {'3-filter scan':>14} {'3-filter ids':>13}")
+    for size in sizes:
+        rows = generate_employee_rows(size)
+        build_ms, store = time_call(lambda: EmployeeStore(rows), 1)
+        scan_total = 0.0
+        index_total = 0.0
+        for term in SEARCH_TERMS:
+            scan_ms, expected = time_call(lambda: legacy_skill_search(rows, term), repeat)
+            index_ms, actual = time_call(lambda: store.get_rows(store.filter(skill_name=term)), repeat)
+            if actual != expected:
+                raise AssertionError(f"Index results differ from substring scan for {term!r}")
+            scan_total += scan_ms
+            index_total += index_ms
+        scan_avg = scan_total / len(SEARCH_TERMS)
+        index_avg = index_total / len(SEARCH_TERMS)
+        multi_scan_ms, expected = time_call(lambda: legacy_filtered_scan(rows, "data", "python", 3), repeat)
+        multi_ms, ids = time_call(lambda: store.filter(domain="data", skill_name="python", min_skill=3), repeat)
+        if store.get_rows(ids) != expected:
+            raise AssertionError("Index results differ from the filtered scan")
+        print(f"{size:>10} {build_ms:>10.1f} {scan_avg:>10.2f} {index_avg:>10.2f} {scan_avg / index_avg:>7.1f}x"
+              f" {multi_scan_ms:>14.2f} {multi_ms:>13.3f}")
+
+
+class StubModel:
+    """Stand-in for genai.GenerativeModel: fixed latency per call and canned, well-formed replies"""
+
+    latency = 0.3
+    calls = 0
+    # Analysis the stub "understands" every question as
+    analysis = {"query_type": "skill_search", "needs_visualization": True, "visualization_type": "bar_chart",
+                "filters": {"skill_name": "python"}, "limit": 10, "sort_by": "Skill Rate", "sort_order": "desc",
+                "context": "python developers"}
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        StubModel.calls += 1
+        if StubModel.latency:
+            time.sleep(StubModel.latency)
+        analysis = StubModel.analysis
+        if '"response_template"' in prompt:
+            text = json.dumps({"analysis": analysis, "response_template": "I found {count} Python developers, mostly in {top_domain}."})
+        elif "RESPONSE FORMAT" in prompt:
+            text = json.dumps(analysis)
+        else:
+            text = "I found several Python developers across the company."
+        reply = type("StubResponse", (), {"text": text})()
+        return iter([reply]) if stream else reply
+
+
+def bench_llm(latency, requests, rows=10000):
+    """End-to-end /api/ai-assistant latency per pipeline mode against a stubbed model"""
+    os.environ["GEMINI_API_KEY"] = ""
+    os.environ["NEXT_PUBLIC_SUPABASE_URL"] = ""
+    os.environ["STARTUP_WARMUP"] = "off"
+    # All requests come from one client - measure the LLM paths, not the per-user rate limit
+    os.environ["USER_RATE_LIMIT"] = "0"
+    with contextlib.redirect_stdout(io.StringIO()):
+        import main as app_main
+        from employee_cache import EmployeeSnapshotCache
+
+        employee_rows = generate_employee_rows(rows)
+        app_main.employee_cache = EmployeeSnapshotCache(lambda: employee_rows)
+        app_main.employee_cache.get()
+        app_main.gemini_client.model_factory = StubModel
+        app_main.genai_api_key = "stub"
+        # Measure the LLM paths themselves - no local fast path, no cached analyses
+        app_main.INTENT_FAST_PATH = False
+        StubModel.latency = latency
+        client = app_main.app.test_client()
+
+    print(f"{'pipeline':>10} {'mean ms':>10} {'LLM calls/request':>18}")
+    for mode in ["sequential", "parallel", "merged"]:
+        app_main.analysis_cache.clear()
+        StubModel.calls = 0
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for i in range(requests):
+                response = client.post("/api/ai-assistant", json={
+                    "message": f"Which employees know Python? #{i}", "userRole": "admin", "pipeline": mode
+                })
+                if response.status_code != 200:
+                    raise AssertionError(f"{mode} request failed: {response.status_code}")
+        mean_ms = (time.perf_counter() - started) * 1000 / requests
+        print(f"{mode:>10} {mean_ms:>10.1f} {StubModel.calls / requests:>18.1f}")
+
+
+PLAN_QUERIES = [
+    {"query_type": "top_performers", "filters": {"skill_name": "python"}, "limit": 10},
+    {"query_type": "upskilling_needs", "filters": {"domain": "data"}, "limit": 20},
+    {"query_type": "skill_search", "filters": {"skill_name": "react", "min_skill_rate": 3}, "limit": 15},
+    {"query_type": "domain_filter", "filters": {"domain": "cloud", "access_level": "admin"}, "limit": 10,
+     "sort_by": "Interest Rate", "sort_order": "asc"},
+    {"query_type": "general_info", "filters": {"category": "learning"}, "limit": 10, "sort_by": "Name", "sort_order": "asc"},
+    {"query_type": "statistics", "filters": {}, "limit": 10},
+]
+
+
+def bench_plan(sizes, rtt, bandwidth):
+    """Full select('*') + local filtering against the planned, pushed-down query on a stubbed Supabase"""
+    os.environ["GEMINI_API_KEY"] = ""
+    os.environ["NEXT_PUBLIC_SUPABASE_URL"] = ""
+    os.environ["STARTUP_WARMUP"] = "off"
+    # All requests come from one client - measure the LLM paths, not the per-user rate limit
+    os.environ["USER_RATE_LIMIT"] = "0"
+    with contextlib.redirect_stdout(io.StringIO()):
+        import main as app_main
+
+    print(f"{'rows':>10} {'query':>18} {'full KB':>10} {'plan KB':>10} {'full ms':>10} {'plan ms':>10}")
+    for size in sizes:
+        rows = generate_employee_rows(size)
+        # Some unrated skills and interests, which the local filters and ranking count as 0
+        for row in rows[::50]:
+            row["Interest Rate"] = None
+        for row in rows[7::50]:
+            row["Skill Rate"] = None
+        stub = StubSupabase(rows, rtt, bandwidth)
+        app_main.supabase_configured = True
+        app_main.get_supabase_client = lambda: stub
+        for analysis in PLAN_QUERIES:
+            analysis = dict({"sort_by": "Skill Rate", "sort_order": "desc"}, **analysis)
+            with contextlib.redirect_stdout(io.StringIO()):
+                stub.bytes_transferred = 0
+                started = time.perf_counter()
+                expected = app_main.process_employee_query(app_main.load_employee_data(), analysis)
+                full_ms = (time.perf_counter() - started) * 1000
+                full_bytes = stub.bytes_transferred
+
+                stub.bytes_transferred = 0
+                started = time.perf_counter()
+                actual = app_main.process_employee_query(app_main.fetch_planned_rows(analysis), analysis)
+                plan_ms = (time.perf_counter() - started) * 1000
+                plan_bytes = stub.bytes_transferred
+            # The pushed-down ORDER BY/LIMIT must pick the same rows, in the same order, as the local ranking
+            if actual != expected:
+                raise AssertionError(f"Planned query results differ for {analysis}")
+            print(f"{size:>10} {analysis['query_type']:>18} {full_bytes / 1024:>10.1f} {plan_bytes / 1024:>10.1f} "
+                  f"{full_ms:>10.1f} {plan_ms:>10.1f}")
+
+
+def simulated_changes(table, count, rng, next_id):
+    """A change-feed batch: half updates, a quarter inserts and a quarter deletes of existing rows.
+
+    `table` (id -> row) is the source table; the changes are applied to it
+    as they are made, so it stays what a full reload would return.
+    """
+    changes = []
+    ids = list(table)
+    for _ in range(count):
+        kind = rng.random()
+        index = rng.randrange(len(ids))
+        live = ids[index]
+        if kind < 0.25:
+            record = dict(table[live], id=next_id[0], Email=f"new{next_id[0]}@example.com")
+            next_id[0] += 1
+            table[record["id"]] = record
+            ids.append(record["id"])
+            changes.append({"type": "INSERT", "record": record})
+        elif kind < 0.5:
+            ids[index] = ids[-1]
+            ids.pop()
+            changes.append({"type": "DELETE", "record": table.pop(live)})
+        else:
+            record = dict(table[live])
+            record["Skill Rate"] = rng.randint(1, 5)
+            record["Interest Rate"] = rng.randint(1, 5)
+            if rng.random() < 0.1:
+                record["Sub Category"] = f"Emerging Skill {rng.randint(1, 50)}"
+            table[live] = record
+            changes.append({"type": "UPDATE", "record": record})
+    return changes
+
+
+def check_snapshot(snapshot, table):
+    """The synced store and cube must answer exactly like ones built fresh from the source table"""
+    if len(snapshot.rows) != len(table):
+        raise AssertionError(f"Synced snapshot has {len(snapshot.rows)} rows, the table {len(table)}")
+    fresh = EmployeeStore(list(table.values()), use_numpy=snapshot.store.use_numpy)
+    for term in SEARCH_TERMS + ["emerging"]:
+        for kwargs in ({"skill_name": term}, {"domain": term, "min_skill": 3}, {"category": term, "max_interest": 2}):
+            # Ties are broken on id, so the rankings agree whatever order the rows are in
+            expected = fresh.get_rows(fresh.top_k(fresh.filter(**kwargs), 20, 'top_performers'))
+            store = snapshot.store
+            if store.get_rows(store.top_k(store.filter(**kwargs), 20, 'top_performers')) != expected:
+                raise AssertionError(f"Synced store differs from a fresh build for {kwargs}")
+    expected = aggregate_employees(table.values())
+    actual = snapshot.cube.rollup()
+    if (actual.count, actual.skill_counts, actual.domain_counts, actual.skill_levels, actual.skill_interest) != \
+            (expected.count, expected.skill_counts, expected.domain_counts, expected.skill_levels, expected.skill_interest):
+        raise AssertionError("Synced aggregate cube differs from a fresh aggregation")
+
+
+def bench_sync(sizes, change_counts):
+    """Applying a change-feed batch in place against rebuilding the snapshot from a full fetch"""
+    def key(emp):
+        return emp.get("id")
+
+    print(f"{'rows':>10} {'full reload ms':>15} {'changes':>8} {'sync ms':>10} {'speedup':>8}")
+    for size in sizes:
+        rows = generate_employee_rows(size)
+        table = {emp["id"]: emp for emp in rows}
+        full_ms, snapshot = time_call(lambda: _build_snapshot(list(rows)), 1)
+        # The key index is built once per full load, on the first sync
+        snapshot.apply_changes([{"type": "UPDATE", "record": rows[0]}], key)
+        rng = random.Random(7)
+        next_id = [size + 1]
+        for count in change_counts:
+            changes = simulated_changes(table, count, rng, next_id)
+            sync_ms, _ = time_call(lambda: snapshot.apply_changes(changes, key), 1)
+            print(f"{size:>10} {full_ms:>15.1f} {count:>8} {sync_ms:>10.2f} {full_ms / sync_ms:>7.0f}x")
+        check_snapshot(snapshot, table)
+
+
+def _build_snapshot(rows):
+    snapshot = EmployeeSnapshot(rows, 1)
+    snapshot.store
+    snapshot.cube
+    return snapshot
+
+
+def bench_snapshot(sizes, repeat):
+    """On-disk snapshot against the JSON a full Supabase fetch transfers: size, save and load time"""
+    print(f"{'rows':>10} {'json MB':>8} {'file MB':>8} {'json load ms':>13} {'save ms':>9} {'load ms':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            rows = generate_employee_rows(size)
+            encoded = json.dumps(rows)
+            json_ms, _ = time_call(lambda: json.loads(encoded), repeat)
+            snapshot_file = SnapshotFile(os.path.join(directory, f"employees-{size}.bin"))
+            save_ms, _ = time_call(lambda: snapshot_file.save(rows, 1), 1)
+            load_ms, (loaded, info) = time_call(snapshot_file.load, repeat)
+            if loaded != rows:
+                raise AssertionError("Snapshot file did not round-trip the rows")
+            print(f"{size:>10} {len(encoded) / 1e6:>8.1f} {info['bytes'] / 1e6:>8.1f} {json_ms:>13.1f} "
+                  f"{save_ms:>9.1f} {load_ms:>9.1f}")
+
+
+# One analysis per query type, shaped like the analysis LLM's replies
+HOTPATH_QUERIES = {
+    "top_performers": {"filters": {"domain": "Data Science"}, "limit": 10},
+    "skill_search": {"filters": {"skill_name": "python", "min_skill_rate": 3}, "limit": 20},
+    "domain_filter": {"filters": {"domain": "Cloud"}, "limit": 50},
+    "upskilling_needs": {"filters": {"category": "Frontend"}, "limit": 15},
+    "skill_distribution": {"filters": {}, "limit": 100, "sort_by": "Domain", "sort_order": "asc"},
+    "general_info": {"filters": {}, "limit": 10},
+    "employee_details": {"filters": {"skill_name": "kubernetes", "access_level": "user"}, "limit": 5},
+    "comparison": {"filters": {"domain": "Web Development"}, "limit": 30, "sort_by": "Interest Rate"},
+    "recommendations": {"filters": {"max_skill_rate": 2, "min_interest_rate": 4}, "limit": 10},
+    "statistics": {"filters": {}, "limit": 1000, "sort_by": "Name", "sort_order": "asc"},
+    "visualization_request": {"filters": {"domain": "AI"}, "limit": 200},
+}
+CHART_TYPES = ["bar_chart", "pie_chart", "line_chart", "heatmap", "scatter_plot", "radar_chart"]
+RULE_BASED_MESSAGES = {
+    "top": "Who are our top performers?",
+    "chart": "Show me a chart of the skill breakdown",
+    "default": "hello there",
+}
+_REPLY_ANALYSIS = {"query_type": "skill_search", "needs_visualization": False, "filters": {"skill_name": "react"},
+                   "limit": 10, "sort_by": "Skill Rate", "sort_order": "desc", "context": "react developers"}
+# Reply shapes Gemini produces for the JSON prompts (course replies are the largest)
+LLM_REPLIES = {
+    "plain": json.dumps(_REPLY_ANALYSIS),
+    "fenced": "```json\n" + json.dumps(_REPLY_ANALYSIS, indent=2) + "\n```",
+    "prose": "Sure! Here is the analysis you asked for:\n" + json.dumps(_REPLY_ANALYSIS) + "\nLet me know if you need more.",
+    "courses": "```json\n" + json.dumps([
+        {"title": f"Course {index}", "provider": "Coursera", "description": "x" * 200, "level": "Intermediate",
+         "duration": "6 weeks", "rating": 4.6, "features": ["a", "b", "c"], "matchScore": 0.9}
+        for index in range(3)
+    ], indent=2) + "\n```",
+    "invalid": "I'm sorry, I can't help with that request {not json",
+}
+RESULTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_results.jsonl")
+
+
+def hotpath_analysis(query_type, chart_type="bar_chart"):
+    spec = HOTPATH_QUERIES[query_type]
+    return {"query_type": query_type, "needs_visualization": True, "visualization_type": chart_type,
+            "filters": spec["filters"], "limit": spec["limit"], "sort_by": spec.get("sort_by", "Skill Rate"),
+            "sort_order": spec.get("sort_order", "desc"), "context": query_type.replace("_", " ")}
+
+
+def bench_hotpaths(sizes, repeat):
+    """{case: best ms} for the query, chart, summary, rule-based, parsing and end-to-end hot paths"""
+    os.environ["GEMINI_API_KEY"] = ""
+    os.environ["NEXT_PUBLIC_SUPABASE_URL"] = ""
+    os.environ["STARTUP_WARMUP"] = "off"
+    # All requests come from one client - measure the LLM paths, not the per-user rate limit
+    os.environ["USER_RATE_LIMIT"] = "0"
+    with contextlib.redirect_stdout(io.StringIO()):
+        import main as app_main
+        from employee_cache import EmployeeSnapshotCache
+    app_main.gemini_client.model_factory = StubModel
+    app_main.genai_api_key = "stub"
+    app_main.INTENT_FAST_PATH = False
+    app_main.log.min_level = 100
+    StubModel.latency = 0
+    client = app_main.app.test_client()
+
+    results = {}
+    for case, reply in LLM_REPLIES.items():
+        results[f"parse_json/{case}"] = time_call(lambda: app_main.clean_and_parse_json(reply), repeat * 100)[0]
+
+    for size in sizes:
+        rows = generate_employee_rows(size)
+        build_ms, _ = time_call(lambda: app_main.get_employee_store(list(rows)), 1)
+        results[f"{size}/store_build"] = build_ms
+        app_main.employee_cache = EmployeeSnapshotCache(lambda: rows)
+        app_main.employee_cache.get()
+        app_main.get_employee_store(rows)
+        gc.collect()
+
+        for query_type in HOTPATH_QUERIES:
+            analysis = hotpath_analysis(query_type)
+            results[f"{size}/query/{query_type}"], processed = time_call(
+                lambda: app_main.process_employee_query(rows, analysis), repeat)
+            results[f"{size}/summary/{query_type}"] = time_call(
+                lambda: app_main.generate_data_summary(processed, analysis), repeat)[0]
+
+        broad = app_main.process_employee_query(rows, hotpath_analysis("statistics"))
+        for chart_type in CHART_TYPES:
+            analysis = hotpath_analysis("visualization_request", chart_type)
+            results[f"{size}/visualizations/{chart_type}"] = time_call(
+                lambda: app_main.generate_visualizations(broad, analysis, rows), repeat)[0]
+
+        for case, message in RULE_BASED_MESSAGES.items():
+            results[f"{size}/rule_based/{case}"] = time_call(
+                lambda: app_main.handle_query_rule_based(message, rows, "admin"), repeat)[0]
+
+        for query_type in HOTPATH_QUERIES:
+            StubModel.analysis = hotpath_analysis(query_type)
+
+            def ask():
+                app_main.analysis_cache.clear()
+                app_main.result_cache.clear()
+                response = client.post("/api/ai-assistant", json={"message": f"benchmark {query_type}", "userRole": "admin"})
+                if response.status_code != 200:
+                    raise AssertionError(f"{query_type} request failed: {response.status_code}")
+            results[f"{size}/assistant/{query_type}"] = time_call(ask, repeat)[0]
+    return {case: round(ms, 4) for case, ms in results.items()}
+
+
+def legacy_clean_and_parse_json(content):
+    """clean_and_parse_json before the single-pass extractor (code fences, then a two-level regex)"""
+    try:
+        return json.loads(content)
+    except ValueError:
+        pass
+    try:
+        if "```json" in content:
+            content = content.split("```json")[1].split("```")[0].strip()
+        elif "```" in content:
+            content = content.split("```")[1].split("```")[0].strip()
+        return json.loads(content)
+    except (ValueError, IndexError):
+        pass
+    match = re.search(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', content, re.DOTALL)
+    if match:
+        try:
+            return json.loads(match.group(0))
+        except ValueError:
+            pass
+    return None
+
+
+def _course(index, description_length=200):
+    return {"title": f"Course {index}", "provider": "Coursera", "description": "x" * description_length,
+            "level": "Intermediate", "duration": "6 weeks", "rating": 4.6, "features": ["a", "b", "c"], "matchScore": 0.9}
+
+
+_COURSES = json.dumps([_course(index) for index in range(3)], indent=2)
+_NESTED_ANALYSIS = dict(_REPLY_ANALYSIS, context={"summary": "react developers", "hints": {"seniority": ["senior"]}})
+# (expected shape, reply) for the parse suite - the LLM_REPLIES shapes plus the ones the old parser missed
+PARSE_CORPUS = {
+    "analysis/plain": ("analysis", LLM_REPLIES["plain"]),
+    "analysis/fenced": ("analysis", LLM_REPLIES["fenced"]),
+    "analysis/prose": ("analysis", LLM_REPLIES["prose"]),
+    "analysis/brackets_in_prose": ("analysis", "Filters used: {domain} and [skill].\n" + json.dumps(_REPLY_ANALYSIS)),
+    "analysis/nested_3_levels": ("analysis", "Result:\n" + json.dumps(_NESTED_ANALYSIS) + "\nDone."),
+    "analysis/merged_prose": ("merged", "Here you go: " + json.dumps({"analysis": _REPLY_ANALYSIS, "response_template": "Found {count}."})),
+    "analysis/placeholders": ("analysis", json.dumps(dict(_REPLY_ANALYSIS, query_type="one_of_the_types_above", limit="5",
+                                                         filters={"domain": "exact_domain_name_if_mentioned", "min_skill_rate": "3"}))),
+    "analysis/truncated": ("analysis", LLM_REPLIES["plain"][:-20]),
+    "analysis/invalid": ("analysis", LLM_REPLIES["invalid"]),
+    "courses/fenced": ("courses", LLM_REPLIES["courses"]),
+    "courses/plain": ("courses", _COURSES),
+    "courses/prose": ("courses", "Here are [3] courses for you:\n" + _COURSES + "\nGood luck!"),
+    "courses/wrapped": ("courses", json.dumps({"courses": json.loads(_COURSES)})),
+    "courses/large": ("courses", "```json\n" + json.dumps([_course(index, 2000) for index in range(20)], indent=2) + "\n```"),
+    "courses/truncated": ("courses", _COURSES[:-40]),
+}
+
+
+def _merged(value):
+    return coerce_analysis(value.get("analysis")) if isinstance(value, dict) else None
+
+
+def _legacy_outcome(shape, parsed, convert):
+    """ok/fallback as the pre-extractor callers saw it, or "wrong" when they used a value of the wrong shape"""
+    if shape == "courses":
+        used = isinstance(parsed, list) and len(parsed) >= 3
+    elif shape == "merged":
+        used = isinstance(parsed, dict) and isinstance(parsed.get("analysis"), dict)
+    else:
+        used = bool(parsed)
+    if not used:
+        return "fallback"
+    return "ok" if convert(parsed) is not None else "wrong"
+
+
+def bench_parse(repeat):
+    """Time per reply and fallback share of the old parser against the extractor with shape coercion"""
+    converters = {"analysis": coerce_analysis, "merged": _merged, "courses": coerce_courses}
+    print(f"{'case':<28} {'chars':>7} {'legacy us':>10} {'new us':>8} {'legacy':>8} {'new':>8}")
+    totals = {"legacy_us": 0.0, "new_us": 0.0, "legacy": [], "new": []}
+    for case, (shape, reply) in PARSE_CORPUS.items():
+        convert = converters[shape]
+        legacy_ms, parsed = time_call(lambda: legacy_clean_and_parse_json(reply), repeat * 200)
+        new_ms, extracted = time_call(lambda: extract_json(reply, convert), repeat * 200)
+        legacy_outcome = _legacy_outcome(shape, parsed, convert)
+        new_outcome = "ok" if extracted is not None else "fallback"
+        totals["legacy_us"] += legacy_ms * 1000
+        totals["new_us"] += new_ms * 1000
+        totals["legacy"].append(legacy_outcome)
+        totals["new"].append(new_outcome)
+        print(f"{case:<28} {len(reply):>7} {legacy_ms * 1000:>10.1f} {new_ms * 1000:>8.1f} {legacy_outcome:>8} {new_outcome:>8}")
+    count = len(PARSE_CORPUS)
+    print(f"{'mean per reply':<28} {'':>7} {totals['legacy_us'] / count:>10.1f} {totals['new_us'] / count:>8.1f}")
+    for outcome in ("fallback", "wrong"):
+        print(f"{outcome + ' share':<28} {'':>7} {'':>10} {'':>8} {totals['legacy'].count(outcome) / count:>8.0%} "
+              f"{totals['new'].count(outcome) / count:>8.0%}")
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{commit}-dirty" if dirty else commit
+
+
+def load_results(path=RESULTS_PATH):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def save_results(results, path=RESULTS_PATH):
+    run = {"commit": git_commit(), "timestamp": round(time.time()), "machine": platform.node(),
+           "python": platform.python_version(), "results": results}
+    with open(path, "a") as f:
+        f.write(json.dumps(run) + "\n")
+    return run
+
+
+def compare_results(results, baseline, threshold=0.25):
+    """Print every case with its change against `baseline`; returns the cases slower by more than `threshold`"""
+    regressions = []
+    print(f"{'case':<48} {'base ms':>10} {'now ms':>10} {'change':>8}")
+    for case, ms in results.items():
+        base = baseline["results"].get(case)
+        if base is None:
+            print(f"{case:<48} {'-':>10} {ms:>10.3f} {'new':>8}")
+            continue
+        change = (ms - base) / base if base else 0.0
+        flag = ""
+        # Sub-50us cases are mostly timer noise
+        if change > threshold and ms - base > 0.05:
+            regressions.append(case)
+            flag = "  REGRESSION"
+        print(f"{case:<48} {base:>10.3f} {ms:>10.3f} {change:>+7.0%}{flag}")
+    return regressions
+
+
+def run_hotpaths(sizes, repeat, save, compare, threshold):
+    """Run the hotpaths suite, print or compare it and optionally store it; returns the regressed cases"""
+    results = bench_hotpaths(sizes, repeat)
+    regressions = []
+    history = [run for run in load_results() if run.get("machine") == platform.node()]
+    if compare is not None:
+        # Latest stored run of the requested commit, or of any other commit when none was given
+        commit = git_commit()
+        candidates = [run for run in history if (run["commit"].startswith(compare) if compare else run["commit"] != commit)]
+        if not candidates:
+            print(f"No stored run to compare with on this machine ({RESULTS_PATH})")
+        else:
+            baseline = candidates[-1]
+            print(f"Compared with {baseline['commit']} from {time.strftime('%Y-%m-%d %H:%M', time.localtime(baseline['timestamp']))}")
+            regressions = compare_results(results, baseline, threshold)
+            if regressions:
+                print(f"{len(regressions)} regressions over {threshold:.0%}")
+    else:
+        print(f"{'case':<48} {'ms':>10}")
+        for case, ms in results.items():
+            print(f"{case:<48} {ms:>10.3f}")
+    if save:
+        run = save_results(results)
+        print(f"Saved results for {run['commit']} to {RESULTS_PATH}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("suite", choices=["search", "llm", "plan", "sync", "snapshot", "hotpaths", "parse"])
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="comma-separated row counts")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.3, help="stub LLM latency per call (seconds)")
+    parser.add_argument("--requests", type=int, default=10)
+    parser.add_argument("--rtt", type=float, default=0.02, help="stub Supabase round trip (seconds)")
+    parser.add_argument("--bandwidth", type=float, default=20, help="stub Supabase bandwidth (MB/s)")
+    parser.add_argument("--changes", default="10,100,1000", help="comma-separated change-feed batch sizes")
+    parser.add_argument("--save", action="store_true", help="store the hotpaths results under the current commit")
+    parser.add_argument("--compare", nargs="?", const="", default=None, metavar="COMMIT",
+                        help="compare hotpaths with a stored run (default: the latest from another commit)")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="slowdown reported as a regression (sub-millisecond cases vary ~20%% run to run)")
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    if args.suite == "search":
+        bench_search(sizes, args.repeat)
+    elif args.suite == "llm":
+        bench_llm(args.latency, args.requests)
+    elif args.suite == "plan":
+        bench_plan(sizes, args.rtt, args.bandwidth)
+    elif args.suite == "sync":
+        bench_sync(sizes, [int(count) for count in args.changes.split(",")])
+    elif args.suite == "snapshot":
+        bench_snapshot(sizes, args.repeat)
+    elif args.suite == "hotpaths":
+        if args.sizes == parser.get_default("sizes"):
+            sizes = [1000, 10000, 100000]
+        if run_hotpaths(sizes, args.repeat, args.save, args.compare, args.threshold):
+            sys.exit(1)
+    elif args.suite == "parse":
+        bench_parse(args.repeat)
+
+
+if __name__ == "__main__":
+    main()
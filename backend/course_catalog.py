@@ -0,0 +1,117 @@
+import threading
+import time
+
+# Fields of an employee row that course recommendations depend on
+PROFILE_FIELDS = ('Sub Category', 'Domain', 'Category', 'Skill Rate', 'Interest Rate')
+
+
+def catalog_profiles(rows, key_func):
+    """One representative skill profile per distinct catalog key, in first-seen order"""
+    profiles = {}
+    for emp in rows:
+        key = key_func(emp)
+        if key not in profiles:
+            profiles[key] = {field: emp.get(field) for field in PROFILE_FIELDS if field in emp}
+    return profiles
+
+
+class CourseCatalogWarmer:
+    """Background thread that keeps course recommendations precomputed for the whole workforce.
+
+    Every `interval` seconds it enumerates the distinct profiles in the
+    employee snapshot (via `rows_source` and `key_func`) and regenerates the
+    ones that are missing from `cache` or expire within `refresh_margin`
+    seconds. `generate_batch(profiles)` returns {index: courses} for the
+    profiles it could answer. LLM calls are spaced `min_call_interval`
+    seconds apart and capped at `max_calls_per_run`, so a large catalog is
+    filled over several runs instead of bursting against the API quota.
+    """
+
+    def __init__(self, rows_source, key_func, cache, generate_batch, interval=21600, batch_size=5,
+                 min_call_interval=4.0, max_calls_per_run=100, refresh_margin=None):
+        self.rows_source = rows_source
+        self.key_func = key_func
+        self.cache = cache
+        self.generate_batch = generate_batch
+        self.interval = interval
+        self.batch_size = batch_size
+        self.min_call_interval = min_call_interval
+        self.max_calls_per_run = max_calls_per_run
+        self.refresh_margin = cache.ttl / 4 if refresh_margin is None else refresh_margin
+        self._stop = threading.Event()
+        self._thread = None
+        self._run_lock = threading.Lock()
+        self._last_call = 0.0
+        self._stats = {"runs": 0, "run_errors": 0, "llm_calls": 0, "warmed": 0, "failed": 0,
+                       "combinations": 0, "pending": 0, "last_run_at": None, "last_run_ms": None}
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="course-catalog-warmer", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def run_once(self):
+        """Warm every missing or soon-to-expire profile, within this run's call budget"""
+        with self._run_lock:
+            started = time.perf_counter()
+            profiles = catalog_profiles(self.rows_source() or [], self.key_func)
+            due = [key for key, profile in profiles.items() if self._is_due(key)]
+            calls = warmed = failed = 0
+            for start in range(0, len(due), self.batch_size):
+                if calls >= self.max_calls_per_run or not self._wait_for_slot():
+                    break
+                chunk = due[start:start + self.batch_size]
+                calls += 1
+                try:
+                    generated = self.generate_batch([profiles[key] for key in chunk])
+                except Exception as e:
+                    print(f"Course catalog warm-up error: {str(e)}")
+                    generated = {}
+                for index, key in enumerate(chunk):
+                    if index in generated:
+                        self.cache.set(key, generated[index])
+                        warmed += 1
+                    else:
+                        failed += 1
+
+            self._stats["runs"] += 1
+            self._stats["llm_calls"] += calls
+            self._stats["warmed"] += warmed
+            self._stats["failed"] += failed
+            self._stats["combinations"] = len(profiles)
+            self._stats["pending"] = len(due) - warmed
+            self._stats["last_run_at"] = time.time()
+            self._stats["last_run_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            print(f"Course catalog warmed {warmed} of {len(due)} due profiles ({len(profiles)} total, {calls} LLM calls)")
+            return dict(self._stats)
+
+    def stats(self):
+        stats = dict(self._stats)
+        stats["running"] = self._thread is not None and self._thread.is_alive()
+        stats["interval_seconds"] = self.interval
+        return stats
+
+    def _is_due(self, key):
+        remaining = self.cache.ttl_remaining(key)
+        return remaining is None or remaining < self.refresh_margin
+
+    def _wait_for_slot(self):
+        """Sleep until the next LLM call is allowed; False when the warmer is stopping"""
+        delay = self._last_call + self.min_call_interval - time.monotonic()
+        if delay > 0 and self._stop.wait(delay):
+            return False
+        self._last_call = time.monotonic()
+        return not self._stop.is_set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                self._stats["run_errors"] += 1
+                print(f"Course catalog warm-up failed: {str(e)}")
+            self._stop.wait(self.interval)
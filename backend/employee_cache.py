@@ -0,0 +1,371 @@
+import threading
+import time
+from collections import deque
+from employee_store import EmployeeStore
+from aggregates import AggregateCube
+
+
+class EmployeeSnapshot:
+    """View of the employee table as of one successful load, plus any changes synced into it since.
+
+    `rows` is never changed in place: a sync builds a new list and swaps it
+    in, so callers can iterate the list they got without taking a lock.
+    """
+
+    # Lists replaced by syncs that owns() still recognises, for requests that took `rows` just before a swap
+    PREVIOUS_ROWS_KEPT = 4
+
+    def __init__(self, rows, version):
+        self.rows = rows
+        self.version = version
+        self.loaded_at = time.time()
+        self.refreshed_at = self.loaded_at
+        # Free-form state for the change loader (e.g. its updated_at high-water mark)
+        self.sync_state = {}
+        self._store = None
+        self._cube = None
+        self._keys = None
+        self._previous_rows = deque(maxlen=self.PREVIOUS_ROWS_KEPT)
+        self._store_lock = threading.Lock()
+
+    def owns(self, rows):
+        """Whether `rows` is this snapshot's list, current or recently replaced (its store and cube cover it)"""
+        return rows is self.rows or any(rows is previous for previous in self._previous_rows)
+
+    def age(self):
+        """Seconds since the snapshot was last brought up to date (full load or sync)"""
+        return time.time() - self.refreshed_at
+
+    @property
+    def store(self):
+        """Columnar/indexed view of the rows, built once per snapshot"""
+        if self._store is None:
+            with self._store_lock:
+                if self._store is None:
+                    self._store = EmployeeStore(self.rows)
+        return self._store
+
+    @property
+    def cube(self):
+        """Aggregate cube for whole-population charts, built once per snapshot"""
+        if self._cube is None:
+            with self._store_lock:
+                if self._cube is None:
+                    self._cube = AggregateCube(self.rows)
+        return self._cube
+
+    def apply_changes(self, changes, key_func):
+        """Apply change events to a copy of the rows and to the store and cube; returns how many were applied.
+
+        Each change is {"type": "INSERT" | "UPDATE" | "DELETE", "record": row,
+        "old_record": row} (old_record optional), matched to a row by
+        key_func. An UPDATE of an unknown key inserts and a DELETE of an
+        unknown key is skipped, so replaying a batch is harmless. key_func
+        must read columns that never change (the primary key): a change
+        without old_record is matched on its new values. A batch that fails
+        part-way publishes none of its changes.
+        """
+        if not changes:
+            self.refreshed_at = time.time()
+            return 0
+        store = self.store
+        cube = self.cube
+        with store.lock:
+            if self._keys is None:
+                self._keys = {key_func(emp): row_id for row_id, emp in enumerate(self.rows)}
+            keys = self._keys
+            # The store patches the new list; readers still holding the old one never see it change
+            rows = store.rows = list(self.rows)
+            try:
+                applied = 0
+                for change in changes:
+                    record = change.get('record') or {}
+                    key = key_func(change.get('old_record') or record)
+                    row_id = keys.get(key)
+                    if change.get('type') == 'DELETE':
+                        if row_id is None:
+                            continue
+                        cube.remove_row(rows[row_id])
+                        moved_from = store.delete_row(row_id)
+                        del keys[key]
+                        if moved_from != row_id:
+                            keys[key_func(rows[row_id])] = row_id
+                    elif row_id is None:
+                        keys[key_func(record)] = store.append_row(record)
+                        cube.add_row(record)
+                    else:
+                        cube.remove_row(rows[row_id])
+                        cube.add_row(record)
+                        store.update_row(row_id, record)
+                        new_key = key_func(record)
+                        if new_key != key:
+                            del keys[key]
+                            keys[new_key] = row_id
+                    applied += 1
+            except Exception:
+                # Part of the batch is in the store and cube but not in self.rows - drop them (and the keys) so
+                # they are rebuilt from the rows still published, then let the caller fall back to a full reload
+                with self._store_lock:
+                    self._store = None
+                    self._cube = None
+                    self._keys = None
+                raise
+            self._previous_rows.append(self.rows)
+            self.rows = rows
+            self.refreshed_at = time.time()
+            return applied
+
+
+class EmployeeSnapshotCache:
+    """Shared, thread-safe cache of the employee table.
+
+    - Fresh snapshots (younger than ``ttl``) are served directly.
+    - Expired snapshots are still served for up to ``stale_ttl`` more seconds
+      while a single background thread refreshes them (stale-while-revalidate).
+    - Only one refresh runs at a time; concurrent callers that have nothing to
+      serve wait for it instead of hitting the database themselves.
+    - With a ``change_loader`` a refresh fetches only the rows changed since
+      the last one and applies them to the current snapshot in place, so its
+      cost follows the rate of change rather than the table size. A full
+      reload still happens every ``full_refresh_interval`` seconds, after
+      invalidate(), and whenever the change loader fails or returns None.
+    - ``on_refresh(snapshot)`` runs after every successful reload or sync
+      (e.g. to persist it), and seed() starts the cache from such a copy.
+    """
+
+    def __init__(self, loader, ttl=60, stale_ttl=300, change_loader=None, key_func=None, full_refresh_interval=3600,
+                 on_refresh=None):
+        self._loader = loader
+        self._change_loader = change_loader
+        self._key_func = key_func
+        self._on_refresh = on_refresh
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.full_refresh_interval = full_refresh_interval
+        self._snapshot = None
+        self._version = 0
+        self._invalidated = False
+        self._refreshing = False
+        self._lock = threading.Lock()
+        self._refresh_done = threading.Condition(self._lock)
+        self._stats = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "refreshes": 0,
+            "refresh_errors": 0,
+            "invalidations": 0,
+            "last_refresh_ms": None,
+            "max_refresh_ms": None,
+            "total_refresh_ms": 0.0,
+            "syncs": 0,
+            "sync_errors": 0,
+            "synced_changes": 0,
+            "pushed_changes": 0,
+            "last_sync_ms": None,
+            "seeded_rows": 0,
+            "unchanged_refreshes": 0,
+        }
+
+    def get(self):
+        """Return the current snapshot, refreshing it if needed (None if nothing could be loaded)"""
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot and not self._invalidated:
+                age = snapshot.age()
+                if age < self.ttl:
+                    self._stats["hits"] += 1
+                    return snapshot
+                if age < self.ttl + self.stale_ttl:
+                    self._stats["stale_hits"] += 1
+                    if not self._refreshing:
+                        self._refreshing = True
+                        threading.Thread(target=self._refresh, daemon=True).start()
+                    return snapshot
+
+            self._stats["misses"] += 1
+            if self._refreshing:
+                # Another caller is already loading - wait for its result
+                while self._refreshing:
+                    self._refresh_done.wait()
+                return self._snapshot
+            self._refreshing = True
+
+        self._refresh()
+        with self._lock:
+            return self._snapshot
+
+    def peek(self):
+        """Return the current snapshot without refreshing it or touching the counters"""
+        return self._snapshot
+
+    def is_warm(self):
+        """Whether get() would answer right away instead of loading the table synchronously"""
+        with self._lock:
+            snapshot = self._snapshot
+            return bool(snapshot) and not self._invalidated and snapshot.age() < self.ttl + self.stale_ttl
+
+    def warm(self):
+        """Start loading the table in the background unless a load is already running"""
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._refresh, daemon=True).start()
+
+    def seed(self, rows, loaded_at):
+        """Start from rows saved earlier (at `loaded_at`) when nothing has been loaded yet.
+
+        The seeded snapshot counts as already stale: it is served right away
+        while the first get() refreshes it in the background, and it keeps
+        being served if the database can't be reached.
+        """
+        snapshot = EmployeeSnapshot(rows, self._version + 1)
+        snapshot.loaded_at = loaded_at
+        snapshot.refreshed_at = time.time() - self.ttl
+        snapshot.store
+        snapshot.cube
+        with self._lock:
+            if self._snapshot is not None:
+                return False
+            self._version = snapshot.version
+            self._snapshot = snapshot
+            self._stats["seeded_rows"] = len(rows)
+            return True
+
+    def follow(self, loader):
+        """Refresh only from `loader` from now on, without the change loader or the on_refresh hook.
+
+        For a process whose snapshots come from another one keeping them up
+        to date (say, from a file it writes). The loader returns the current
+        snapshot's rows when nothing changed, which only marks the snapshot
+        fresh again, keeping its store and cube.
+        """
+        with self._lock:
+            self._loader = loader
+            self._change_loader = None
+            self._on_refresh = None
+
+    @property
+    def invalidated(self):
+        """Whether invalidate() was called since the last reload"""
+        return self._invalidated
+
+    def wait_idle(self, timeout=None):
+        """Block until no refresh is running (e.g. before forking workers); False on timeout"""
+        with self._lock:
+            return self._refresh_done.wait_for(lambda: not self._refreshing, timeout)
+
+    def apply_changes(self, changes):
+        """Apply pushed change events (e.g. from a realtime subscription) to the current snapshot now"""
+        snapshot = self._snapshot
+        if snapshot is None or self._key_func is None:
+            return 0
+        applied = snapshot.apply_changes(changes, self._key_func)
+        with self._lock:
+            self._stats["pushed_changes"] += applied
+        return applied
+
+    def invalidate(self):
+        """Force the next get() to reload synchronously instead of serving stale data"""
+        with self._lock:
+            self._invalidated = True
+            self._stats["invalidations"] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            refreshes = stats.pop("total_refresh_ms")
+            stats["avg_refresh_ms"] = round(refreshes / stats["refreshes"], 2) if stats["refreshes"] else None
+            lookups = stats["hits"] + stats["stale_hits"] + stats["misses"]
+            stats["hit_rate"] = round((stats["hits"] + stats["stale_hits"]) / lookups, 3) if lookups else None
+            stats["ttl_seconds"] = self.ttl
+            stats["stale_ttl_seconds"] = self.stale_ttl
+            stats["snapshot_version"] = self._snapshot.version if self._snapshot else None
+            stats["snapshot_rows"] = len(self._snapshot.rows) if self._snapshot else 0
+            stats["snapshot_age_seconds"] = round(self._snapshot.age(), 1) if self._snapshot else None
+            stats["sync_mode"] = "incremental" if self._change_loader else "full"
+            return stats
+
+    def _refresh(self):
+        """Run the loader once; callers must have set self._refreshing"""
+        if self._sync():
+            return
+        started = time.perf_counter()
+        rows = None
+        try:
+            rows = self._loader()
+        except Exception as e:
+            print(f"Error refreshing employee snapshot: {str(e)}")
+        current = self._snapshot
+        if rows and current is not None and rows is current.rows:
+            with self._lock:
+                current.refreshed_at = time.time()
+                self._invalidated = False
+                self._stats["unchanged_refreshes"] += 1
+                self._refreshing = False
+                self._refresh_done.notify_all()
+            return
+        snapshot = None
+        if rows:
+            snapshot = EmployeeSnapshot(rows, self._version + 1)
+            try:
+                # Build derived indexes before publishing so requests never pay for them
+                snapshot.store
+                snapshot.cube
+            except Exception as e:
+                print(f"Error building employee store: {str(e)}")
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        with self._lock:
+            self._stats["last_refresh_ms"] = round(elapsed_ms, 2)
+            self._stats["max_refresh_ms"] = round(max(self._stats["max_refresh_ms"] or 0, elapsed_ms), 2)
+            if snapshot:
+                self._version = snapshot.version
+                self._snapshot = snapshot
+                self._invalidated = False
+                self._stats["refreshes"] += 1
+                self._stats["total_refresh_ms"] += elapsed_ms
+            else:
+                # Keep serving the previous snapshot (if any) when the database is unavailable
+                self._stats["refresh_errors"] += 1
+            self._refreshing = False
+            self._refresh_done.notify_all()
+        if snapshot:
+            self._notify(snapshot)
+
+    def _notify(self, snapshot):
+        if self._on_refresh is None:
+            return
+        try:
+            self._on_refresh(snapshot)
+        except Exception as e:
+            print(f"Error in employee snapshot refresh hook: {str(e)}")
+
+    def _sync(self):
+        """Bring the current snapshot up to date from the change loader; False when a full reload is needed"""
+        snapshot = self._snapshot
+        if (self._change_loader is None or self._key_func is None or snapshot is None or self._invalidated
+                or time.time() - snapshot.loaded_at >= self.full_refresh_interval):
+            return False
+        started = time.perf_counter()
+        try:
+            changes = self._change_loader(snapshot)
+            if changes is None:
+                return False
+            applied = snapshot.apply_changes(changes, self._key_func)
+        except Exception as e:
+            print(f"Error syncing employee snapshot, reloading it: {str(e)}")
+            with self._lock:
+                self._stats["sync_errors"] += 1
+            return False
+
+        with self._lock:
+            self._stats["syncs"] += 1
+            self._stats["synced_changes"] += applied
+            self._stats["last_sync_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            self._refreshing = False
+            self._refresh_done.notify_all()
+        if applied:
+            self._notify(snapshot)
+        return True
@@ -0,0 +1,422 @@
+import bisect
+import heapq
+import os
+import sys
+import threading
+from array import array
+from text_index import NgramIndex
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional - the bitmap path works without it
+    np = None
+
+# Categorical columns kept as interned vocabularies plus per-row small-int codes
+CATEGORICAL_COLUMNS = ['Domain', 'Category', 'Sub Category', 'Access']
+# Columns searched by free-text terms, each with a trigram index over its vocabulary
+TEXT_INDEXED_COLUMNS = ['Domain', 'Category', 'Sub Category']
+# Numeric 1-5 ratings kept as compact arrays
+RATE_COLUMNS = ['Skill Rate', 'Interest Rate']
+# Integer primary key of the table; rankings break rating ties on it, so every path (and the pushed-down
+# ORDER BY of a query plan) ranks equal ratings the same way whatever order the rows arrived in
+ID_COLUMN = os.getenv('EMPLOYEE_ID_COLUMN', 'id')
+
+# Set bit positions for every possible byte, used to decode bitmaps into row ids
+_BYTE_BITS = [tuple(bit for bit in range(8) if byte & (1 << bit)) for byte in range(256)]
+
+
+def numpy_enabled():
+    """NumPy predicates are used when NumPy is installed unless EMPLOYEE_STORE_NUMPY=0"""
+    return np is not None and os.getenv('EMPLOYEE_STORE_NUMPY', '1') != '0'
+
+
+def top_k(items, k, key, reverse=False):
+    """Same result as sorted(items, key=key, reverse=reverse)[:k], in O(n log k).
+
+    heapq.nsmallest/nlargest break ties by input position, so equal keys keep
+    the stable-sort order the callers relied on.
+    """
+    if k <= 0:
+        return []
+    if k >= len(items):
+        return sorted(items, key=key, reverse=reverse)
+    if reverse:
+        return heapq.nlargest(k, items, key=key)
+    return heapq.nsmallest(k, items, key=key)
+
+
+def _rate_value(value):
+    """Mirror the legacy emp.get('Skill Rate', 0) default for missing/empty ratings"""
+    return value if isinstance(value, (int, float)) else 0
+
+
+def _id_value(value):
+    """Tie-break value of a row: its integer id, or 0 (ties keep row order) when it has none"""
+    return value if type(value) is int else 0
+
+
+def _remove_sorted(postings, row_id):
+    del postings[bisect.bisect_left(postings, row_id)]
+
+
+def _insert_sorted(postings, row_id):
+    postings.insert(bisect.bisect_left(postings, row_id), row_id)
+
+
+def _rate_array(values):
+    try:
+        return array('b', values)
+    except (OverflowError, TypeError):
+        # Non-integer or out-of-range ratings - fall back to doubles
+        return array('d', values)
+
+
+class EmployeeStore:
+    """Columnar, indexed view of the employee rows of one snapshot.
+
+    Categorical columns are dictionary-encoded (interned strings plus small-int
+    codes) with an inverted index of row ids per value, and ratings are kept in
+    compact arrays. Filters are resolved against the small vocabularies first
+    and then combined as bitmaps (Python ints, or NumPy boolean masks when
+    NumPy is available), so a query never re-lowercases or re-scans the rows.
+    The original row dicts are kept so results can be returned unchanged.
+
+    append_row / update_row / delete_row patch every index in place for
+    incremental snapshot syncs. They hold `lock`, which readers running a
+    filter -> top_k -> get_rows sequence must hold too; `version` counts
+    the changes so derived caches can tell when they are out of date.
+    """
+
+    def __init__(self, rows, use_numpy=None):
+        self.rows = rows
+        self.size = len(rows)
+        self.use_numpy = numpy_enabled() if use_numpy is None else (use_numpy and np is not None)
+        self.lock = threading.RLock()
+        self.version = 0
+
+        self.vocab = {}
+        self.vocab_lower = {}
+        self.codes = {}
+        self.postings = {}
+        self._lookup = {}
+        for column in CATEGORICAL_COLUMNS:
+            values = []
+            lookup = {}
+            codes = array('I')
+            postings = []
+            for row_id, emp in enumerate(rows):
+                value = emp.get(column) or ''
+                code = lookup.get(value)
+                if code is None:
+                    code = lookup[value] = len(values)
+                    values.append(sys.intern(str(value)))
+                    postings.append(array('I'))
+                codes.append(code)
+                postings[code].append(row_id)
+            self.vocab[column] = values
+            self.vocab_lower[column] = [value.lower() for value in values]
+            self.codes[column] = codes
+            self.postings[column] = postings
+            self._lookup[column] = lookup
+
+        self.text_index = {column: NgramIndex(self.vocab[column]) for column in TEXT_INDEXED_COLUMNS}
+
+        self.rates = {}
+        self.rate_postings = {}
+        for column in RATE_COLUMNS:
+            values = [_rate_value(emp.get(column, 0)) for emp in rows]
+            self.rates[column] = _rate_array(values)
+            postings = {}
+            for row_id, value in enumerate(values):
+                postings.setdefault(value, array('I')).append(row_id)
+            self.rate_postings[column] = postings
+
+        self.ids = array('q', (_id_value(emp.get(ID_COLUMN)) for emp in rows))
+
+        self._orders = {}
+        self._bitmaps = {}
+        self._np_codes = {}
+        self._np_rates = {}
+        self._attach_views()
+
+    def __len__(self):
+        return self.size
+
+    def match_codes(self, column, text, fuzzy=False):
+        """Vocabulary codes of `column` whose lowercased value contains `text` (legacy substring semantics).
+
+        With `fuzzy`, a term that matches nothing falls back to the closest
+        values by edit similarity (e.g. "pyhton" -> "Python").
+        """
+        index = self.text_index.get(column)
+        if index is None:
+            text = text.lower()
+            return [code for code, value in enumerate(self.vocab_lower[column]) if text in value]
+        codes = index.search(text)
+        if not codes and fuzzy:
+            codes = [code for code, similarity in index.rank(text)]
+        return codes
+
+    def suggest(self, column, text, limit=5):
+        """Closest vocabulary values of `column` to `text` as (value, similarity) pairs"""
+        return [(self.vocab[column][code], similarity) for code, similarity in self.text_index[column].rank(text, limit=limit)]
+
+    def equal_codes(self, column, text):
+        """Vocabulary codes of `column` whose lowercased value equals `text`"""
+        text = text.lower()
+        return [code for code, value in enumerate(self.vocab_lower[column]) if value == text]
+
+    def filter(self, domain=None, category=None, skill_name=None, access=None,
+               min_skill=None, max_skill=None, min_interest=None, max_interest=None, fuzzy=False):
+        """Return the ids (in row order) of rows matching every given predicate"""
+        masks = []
+        if domain is not None:
+            masks.append(self._codes_mask('Domain', self.match_codes('Domain', domain)))
+        if category is not None:
+            masks.append(self._codes_mask('Category', self.match_codes('Category', category)))
+        if skill_name is not None:
+            sub_categories = self.match_codes('Sub Category', skill_name)
+            categories = self.match_codes('Category', skill_name)
+            domains = self.match_codes('Domain', skill_name)
+            if fuzzy and not (sub_categories or categories or domains):
+                sub_categories = self.match_codes('Sub Category', skill_name, fuzzy=True)
+            masks.append(self._or(
+                self._codes_mask('Sub Category', sub_categories),
+                self._codes_mask('Category', categories),
+                self._codes_mask('Domain', domains)
+            ))
+        if access is not None:
+            masks.append(self._codes_mask('Access', self.equal_codes('Access', access)))
+        if min_skill is not None or max_skill is not None:
+            masks.append(self._rate_mask('Skill Rate', min_skill, max_skill))
+        if min_interest is not None or max_interest is not None:
+            masks.append(self._rate_mask('Interest Rate', min_interest, max_interest))
+
+        if not masks:
+            return list(range(self.size))
+        mask = masks[0]
+        for other in masks[1:]:
+            mask = mask & other
+        return self._row_ids(mask)
+
+    def rank_key(self, ranking, reverse=True):
+        """Sort key over row ids for a named ranking used by the query handlers.
+
+        Ties go to the lower ID_COLUMN in either direction - the order the
+        legacy stable sort kept for rows listed by id.
+        """
+        skill_rates = self.rates['Skill Rate']
+        interest_rates = self.rates['Interest Rate']
+        ids = self.ids
+        tie = -1 if reverse else 1
+        if ranking == 'top_performers':
+            return lambda i: (skill_rates[i], interest_rates[i], tie * ids[i])
+        if ranking == 'upskilling_needs':
+            return lambda i: (interest_rates[i], -skill_rates[i], tie * ids[i])
+        if ranking == 'Skill Rate':
+            return lambda i: (skill_rates[i], tie * ids[i])
+        if ranking == 'Interest Rate':
+            return lambda i: (interest_rates[i], tie * ids[i])
+        raise ValueError(f"Unknown ranking: {ranking}")
+
+    def text_rank_key(self, column, reverse=True):
+        """Sort key over row ids by the text of `column`, ties to the lower ID_COLUMN like rank_key"""
+        rows = self.rows
+        ids = self.ids
+        tie = -1 if reverse else 1
+        return lambda i: (str(rows[i].get(column, '')), tie * ids[i])
+
+    def top_k(self, row_ids, k, ranking, reverse=True):
+        """The first k of row_ids sorted (stably) by a named ranking.
+
+        When row_ids covers the whole store the answer is a prefix of a sort
+        order computed once per store, so repeated unfiltered queries are O(k).
+        """
+        if len(row_ids) == self.size:
+            order = self._orders.get((ranking, reverse))
+            if order is None:
+                order = self._orders[(ranking, reverse)] = sorted(range(self.size), key=self.rank_key(ranking, reverse), reverse=reverse)
+            return order[:max(k, 0)]
+        return top_k(row_ids, k, self.rank_key(ranking, reverse), reverse=reverse)
+
+    def get_rows(self, row_ids):
+        rows = self.rows
+        return [rows[row_id] for row_id in row_ids]
+
+    # -- incremental updates --------------------------------------------
+
+    def append_row(self, emp):
+        """Add a row at the end of the store (and of `rows`)"""
+        with self.lock:
+            self._detach_views()
+            row_id = self.size
+            self.rows.append(emp)
+            self.size += 1
+            for column in CATEGORICAL_COLUMNS:
+                code = self._code(column, emp.get(column) or '')
+                self.codes[column].append(code)
+                self.postings[column][code].append(row_id)
+                self._bitmaps.pop((column, code), None)
+            for column in RATE_COLUMNS:
+                value = _rate_value(emp.get(column, 0))
+                self._ensure_rate_type(column, value)
+                self.rates[column].append(value)
+                self.rate_postings[column].setdefault(value, array('I')).append(row_id)
+                self._bitmaps.pop((column, value), None)
+            self.ids.append(_id_value(emp.get(ID_COLUMN)))
+            self._attach_views()
+            self._changed()
+            return row_id
+
+    def update_row(self, row_id, emp):
+        """Replace the row at `row_id`, moving it between posting lists where its values changed"""
+        with self.lock:
+            self.rows[row_id] = emp
+            for column in CATEGORICAL_COLUMNS:
+                old_code = self.codes[column][row_id]
+                code = self._code(column, emp.get(column) or '')
+                if code != old_code:
+                    _remove_sorted(self.postings[column][old_code], row_id)
+                    _insert_sorted(self.postings[column][code], row_id)
+                    self.codes[column][row_id] = code
+                    self._bitmaps.pop((column, old_code), None)
+                    self._bitmaps.pop((column, code), None)
+            for column in RATE_COLUMNS:
+                old_value = self.rates[column][row_id]
+                value = _rate_value(emp.get(column, 0))
+                if value != old_value:
+                    if self._ensure_rate_type(column, value):
+                        self._attach_views()
+                    self.rates[column][row_id] = value
+                    postings = self.rate_postings[column]
+                    _remove_sorted(postings[old_value], row_id)
+                    _insert_sorted(postings.setdefault(value, array('I')), row_id)
+                    self._bitmaps.pop((column, old_value), None)
+                    self._bitmaps.pop((column, value), None)
+            self.ids[row_id] = _id_value(emp.get(ID_COLUMN))
+            self._changed()
+
+    def delete_row(self, row_id):
+        """Remove the row at `row_id` by moving the last row into its slot; returns the moved row's old id"""
+        with self.lock:
+            last = self.size - 1
+            if row_id != last:
+                self.update_row(row_id, self.rows[last])
+            # The last slot is now a duplicate - its id is the largest in every posting list it is in
+            self._detach_views()
+            self.rows.pop()
+            self.size -= 1
+            for column in CATEGORICAL_COLUMNS:
+                code = self.codes[column].pop()
+                self.postings[column][code].pop()
+                self._bitmaps.pop((column, code), None)
+            for column in RATE_COLUMNS:
+                value = self.rates[column].pop()
+                self.rate_postings[column][value].pop()
+                self._bitmaps.pop((column, value), None)
+            self.ids.pop()
+            self._attach_views()
+            self._changed()
+            return last
+
+    def _code(self, column, value):
+        """Vocabulary code of `value`, adding it to the vocabulary (and its text index) when new"""
+        lookup = self._lookup[column]
+        code = lookup.get(value)
+        if code is None:
+            code = lookup[value] = len(self.vocab[column])
+            value = sys.intern(str(value))
+            self.vocab[column].append(value)
+            self.vocab_lower[column].append(value.lower())
+            self.postings[column].append(array('I'))
+            if column in self.text_index:
+                self.text_index[column].add(value)
+        return code
+
+    def _ensure_rate_type(self, column, value):
+        """Widen a compact rate array to doubles when `value` doesn't fit; True if it was replaced"""
+        rates = self.rates[column]
+        if rates.typecode == 'b' and (type(value) is not int or not -128 <= value <= 127):
+            self._detach_views()
+            self.rates[column] = array('d', rates)
+            return True
+        return False
+
+    def _changed(self):
+        # Whole-store sort orders are recomputed lazily on the next unfiltered top_k
+        self._orders.clear()
+        self.version += 1
+
+    def _attach_views(self):
+        """NumPy views over the code/rate arrays (they share memory, so updates in place show through)"""
+        if self.use_numpy:
+            for column in CATEGORICAL_COLUMNS:
+                self._np_codes[column] = np.frombuffer(self.codes[column], dtype=np.uint32)
+            for column in RATE_COLUMNS:
+                self._np_rates[column] = np.asarray(self.rates[column])
+
+    def _detach_views(self):
+        """Drop the NumPy views - an array can't be resized while it is exporting its buffer"""
+        self._np_codes.clear()
+        self._np_rates.clear()
+
+    # -- bitmap helpers -------------------------------------------------
+
+    def _codes_mask(self, column, codes):
+        if self.use_numpy:
+            values = self._np_codes[column]
+            if len(codes) <= 8:
+                # A handful of equality passes beats a gather through a lookup table
+                mask = np.zeros(self.size, dtype=bool)
+                for code in codes:
+                    mask |= values == code
+                return mask
+            lookup = np.zeros(len(self.vocab[column]), dtype=bool)
+            lookup[codes] = True
+            return lookup.take(values)
+        mask = 0
+        for code in codes:
+            mask |= self._bitmap(column, code, self.postings[column][code])
+        return mask
+
+    def _rate_mask(self, column, low, high):
+        if self.use_numpy:
+            values = self._np_rates[column]
+            mask = np.ones(self.size, dtype=bool)
+            if low is not None:
+                mask &= values >= low
+            if high is not None:
+                mask &= values <= high
+            return mask
+        mask = 0
+        for value, postings in self.rate_postings[column].items():
+            if (low is None or value >= low) and (high is None or value <= high):
+                mask |= self._bitmap(column, value, postings)
+        return mask
+
+    def _or(self, *masks):
+        result = masks[0]
+        for mask in masks[1:]:
+            result = result | mask
+        return result
+
+    def _bitmap(self, column, key, postings):
+        """Bitmap (Python int) of one posting list, built on first use and memoized"""
+        bitmap = self._bitmaps.get((column, key))
+        if bitmap is None:
+            buffer = bytearray((self.size + 7) // 8)
+            for row_id in postings:
+                buffer[row_id >> 3] |= 1 << (row_id & 7)
+            bitmap = self._bitmaps[(column, key)] = int.from_bytes(buffer, 'little')
+        return bitmap
+
+    def _row_ids(self, mask):
+        if self.use_numpy:
+            return np.flatnonzero(mask).tolist()
+        row_ids = []
+        data = mask.to_bytes((mask.bit_length() + 7) // 8, 'little')
+        for byte_index, byte in enumerate(data):
+            if byte:
+                base = byte_index << 3
+                row_ids.extend(base + bit for bit in _BYTE_BITS[byte])
+        return row_ids
@@ -0,0 +1,81 @@
+"""Gunicorn settings for the backend (gunicorn -c gunicorn.conf.py wsgi:app).
+
+The app is preloaded in the master, which loads the employee snapshot once
+and then forks the workers, so they all share its pages copy-on-write
+instead of each holding its own copy. Upstream clients (HTTP connection
+pools, the Gemini gRPC channel) don't survive a fork and are created by
+every worker after it starts; a worker reports ready on /api/health/ready
+once they are.
+
+Only one worker (the holder of the background-jobs lock) refreshes the
+snapshot from Supabase; it saves every change to the snapshot file and the
+other workers reload from that file instead of querying the database.
+Workers share the pre-fork pages until the table first changes, after
+which each holds its own copy of the new rows.
+"""
+import fcntl
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+# The server hooks below do the warm-up, split around the fork
+os.environ.setdefault('STARTUP_WARMUP', 'prefork')
+# Each worker keeps its own metrics; they are merged through files here so a scrape of any worker covers all
+os.environ.setdefault('METRICS_DIR', tempfile.mkdtemp(prefix='backend-metrics-'))
+# The refreshing worker hands every change to the others through the snapshot file, so it saves each one right
+# away. Without a configured path the file goes to a private (0700) directory removed on exit
+_snapshot_dir = None
+if not os.getenv('EMPLOYEE_SNAPSHOT_PATH'):
+    _snapshot_dir = tempfile.mkdtemp(prefix='backend-snapshot-')
+    os.environ['EMPLOYEE_SNAPSHOT_PATH'] = os.path.join(_snapshot_dir, 'employee_snapshot.bin')
+os.environ.setdefault('EMPLOYEE_SNAPSHOT_SAVE_INTERVAL', '0')
+
+bind = f"0.0.0.0:{os.getenv('PORT', 5000)}"
+workers = int(os.getenv('WEB_WORKERS', min(multiprocessing.cpu_count() * 2, 8)))
+# Requests mostly wait on Gemini and Supabase, so every worker serves several at once on threads
+worker_class = 'gthread'
+threads = int(os.getenv('WEB_THREADS', 8))
+preload_app = True
+# gthread workers heartbeat from their main loop, so this doesn't cut slow requests short; it is still kept
+# above the longest assistant request - a Supabase fetch and two Gemini calls in a row, each bounded by its
+# deadline, plus two LLM queue waits (SUPABASE_DEADLINE + 2 * GEMINI_DEADLINE + 2 * LLM_QUEUE_TIMEOUT = 114 s
+# by default) - for the sync worker class
+timeout = int(os.getenv('WEB_TIMEOUT', 120))
+graceful_timeout = 30
+keepalive = 5
+max_requests = int(os.getenv('WEB_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+accesslog = os.getenv('WEB_ACCESS_LOG')
+
+# Held by the one worker that runs the background jobs - the course catalog warmer and the employee snapshot
+# refresh - so neither the LLM quota nor the Supabase load is multiplied by the worker count
+_course_catalog_lock_path = os.getenv('COURSE_CATALOG_LOCK_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.course_catalog.lock'))
+_course_catalog_lock = None
+
+
+def when_ready(server):
+    import main
+    main.warm_up_before_fork()
+    server.log.info("Employee snapshot loaded before forking workers: %s", main.employee_cache.stats()["snapshot_rows"])
+
+
+def post_fork(server, worker):
+    global _course_catalog_lock
+    import main
+    main.after_fork()
+    # The lock is released when its holder exits, and the worker replacing it takes over
+    lock = open(_course_catalog_lock_path, 'a')
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock.close()
+        main.follow_employee_snapshot()
+        return
+    _course_catalog_lock = lock
+    main.start_course_catalog_warmer()
+
+
+def on_exit(server):
+    if _snapshot_dir:
+        shutil.rmtree(_snapshot_dir, ignore_errors=True)
@@ -0,0 +1,240 @@
+import re
+import threading
+import weakref
+
+_WORD_PATTERN = re.compile(r"[a-z0-9+#.]+(?:\.[a-z0-9]+)*")
+
+VISUALIZATION_KEYWORDS = {
+    "heatmap": "heatmap",
+    "heat map": "heatmap",
+    "pie": "pie_chart",
+    "radar": "radar_chart",
+    "bar": "bar_chart",
+    "chart": "bar_chart",
+    "graph": "bar_chart",
+    "plot": "bar_chart",
+    "visualize": "chart",
+    "visualise": "chart",
+    "visualization": "chart",
+    "distribution": "chart",
+    "breakdown": "chart",
+}
+
+# Phrases that decide the query type, checked in this order
+INTENT_PHRASES = [
+    ("upskilling_needs", ["upskill", "upskilling", "training", "need to improve", "needs improvement",
+                          "skill gap", "skill gaps", "want to learn", "wants to learn", "beginner", "beginners",
+                          "room to grow", "low skill", "weak"]),
+    ("top_performers", ["top", "best", "highest", "strongest", "expert", "experts", "skilled", "performer",
+                        "performers", "excellent", "leading", "most skilled"]),
+    ("statistics", ["how many", "count", "average", "statistics", "stats", "number of", "total"]),
+]
+
+# Requests the local rules can't express - leave these to the LLM
+AMBIGUOUS_PHRASES = ["compare", "comparison", "versus", "vs", "difference", "why", "recommend", "suggest",
+                     "career", "path", "should", "trend", "trends", "predict"]
+
+STOP_WORDS = {
+    "a", "an", "the", "please", "me", "us", "can", "could", "would", "you", "show", "list", "give", "find",
+    "get", "display", "tell", "who", "which", "what", "are", "is", "with", "in", "of", "for", "on", "and",
+    "or", "all", "our", "my", "i", "to", "by", "that", "have", "has", "do", "does", "see", "want", "some",
+    "there", "at", "as", "good", "knows", "know", "skill", "skills", "level", "rate", "rating", "ratings",
+    "interest", "employees", "employee", "people", "persons", "developers", "developer", "engineers",
+    "engineer", "team", "staff", "members", "folks", "users", "user", "data", "about", "how", "much",
+    "many", "than", "above", "below", "over", "under", "least", "most", "greater", "less", "min", "max",
+    "minimum", "maximum", "score", "scores", "their", "them", "they", "experience", "experienced",
+    "workforce", "company", "organization", "org", "based", "need", "needs", "domain", "domains",
+    "category", "categories", "department", "departments", "whose", "where", "currently",
+}
+
+_RATE_BOUND_PATTERN = re.compile(
+    r"\b(skill|interest)\s*(?:rate|rating|level|score)?\s*(?:of|is|=)?\s*"
+    r"(>=|<=|>|<|at least|at most|above|over|greater than|more than|below|under|less than|min(?:imum)?|max(?:imum)?)"
+    r"\s*(?:of\s*)?([1-5])\b"
+)
+_LIMIT_PATTERN = re.compile(r"\b(?:top|best|first)\s+(\d{1,3})\b|\b(\d{1,3})\s+(?:employees|people|developers|engineers|experts|persons|members)\b")
+
+
+def _contains_phrase(text, phrase):
+    return re.search(rf"(?<![a-z0-9]){re.escape(phrase)}(?![a-z0-9])", text) is not None
+
+
+class IntentClassifier:
+    """Deterministic, local replacement for the LLM query-analysis call.
+
+    classify() returns an analysis_result in the exact schema
+    process_employee_query consumes plus a confidence in [0, 1]. Entities
+    (domains, categories, skills) are recognised with a phrase index over
+    the real vocabulary of the employee store, built once per store version.
+    Callers take the fast path only above `threshold` and leave everything
+    else to the LLM; record() keeps the counters behind the fast-path
+    traffic report.
+    """
+
+    def __init__(self, threshold=0.8):
+        self.threshold = threshold
+        self._vocabularies = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "fast_path": 0, "llm": 0, "by_query_type": {}}
+
+    def classify(self, message, store):
+        """(analysis_result, confidence) for `message` against the vocabulary of `store`"""
+        text = " ".join(message.lower().split())
+        words = [word.strip(".") for word in _WORD_PATTERN.findall(text) if word.strip(".")]
+        consumed = set()
+        confidence = 0.95
+
+        entities = self._match_entities(message, words, store, consumed)
+        filters = {}
+        if entities.get("Sub Category"):
+            filters["skill_name"] = entities["Sub Category"]
+        if entities.get("Category"):
+            filters["category"] = entities["Category"]
+        if entities.get("Domain"):
+            filters["domain"] = entities["Domain"]
+        for column in ("Sub Category", "Category", "Domain"):
+            if entities.get(f"{column} extra"):
+                # Several values of one column ("Python and Java") can't be expressed as one filter
+                confidence -= 0.3
+
+        if re.search(r"\badmins?\b|\badministrators?\b", text):
+            filters["access_level"] = "admin"
+            consumed.update({"admin", "admins", "administrator", "administrators"})
+
+        for match in _RATE_BOUND_PATTERN.finditer(text):
+            column, operator, value = match.group(1), match.group(2), int(match.group(3))
+            if operator in (">", "above", "over", "greater than", "more than"):
+                bound, value = "min", value + 1
+            elif operator in ("<", "below", "under", "less than"):
+                bound, value = "max", value - 1
+            elif operator in (">=", "at least") or operator.startswith("min"):
+                bound = "min"
+            else:
+                bound = "max"
+            if column == "interest" and bound == "max":
+                confidence -= 0.5  # no max_interest_rate filter in the analysis schema
+                continue
+            if 1 <= value <= 5:
+                filters[f"{bound}_{column}_rate"] = value
+            consumed.add(match.group(3))
+
+        limit = 10
+        limit_match = _LIMIT_PATTERN.search(text)
+        if limit_match:
+            limit = int(limit_match.group(1) or limit_match.group(2))
+            consumed.add(str(limit))
+
+        visualization_type = None
+        for phrase, chart_type in VISUALIZATION_KEYWORDS.items():
+            if _contains_phrase(text, phrase):
+                # The first keyword wins, so "heatmap" beats a generic "chart"
+                visualization_type = visualization_type or chart_type
+                consumed.update(phrase.split())
+        for word in list(words):
+            if word.rstrip("s") in VISUALIZATION_KEYWORDS:
+                consumed.add(word)
+
+        query_type = None
+        for intent, phrases in INTENT_PHRASES:
+            for phrase in phrases:
+                if _contains_phrase(text, phrase):
+                    query_type = query_type or intent
+                    consumed.update(phrase.split())
+        if query_type is None:
+            if "skill_name" in filters:
+                query_type = "skill_search"
+            elif "domain" in filters:
+                query_type = "domain_filter"
+            elif visualization_type:
+                query_type = "visualization_request"
+            else:
+                query_type = "general_info"
+                confidence -= 0.5
+
+        if any(_contains_phrase(text, phrase) for phrase in AMBIGUOUS_PHRASES):
+            confidence -= 0.6
+
+        # Every word (or number) we could not account for makes the local reading less trustworthy
+        unknown = [word for word in words if word not in consumed and word not in STOP_WORDS]
+        confidence -= 0.2 * len(unknown)
+
+        analysis_result = {
+            "query_type": query_type,
+            "needs_visualization": visualization_type is not None,
+            "visualization_type": visualization_type or "bar_chart",
+            "filters": filters,
+            "limit": limit,
+            "sort_by": "Skill Rate",
+            "sort_order": "desc",
+            "context": message.strip()
+        }
+        return analysis_result, round(max(confidence, 0.0), 2)
+
+    def fast_path(self, message, store):
+        """The local analysis_result when it is confident enough to skip the LLM, else None"""
+        analysis_result, confidence = self.classify(message, store)
+        if confidence >= self.threshold:
+            return analysis_result
+        return None
+
+    def record(self, analysis_result, fast_path):
+        """Count one assistant request by the path that produced its analysis"""
+        with self._lock:
+            self._stats["requests"] += 1
+            self._stats["fast_path" if fast_path else "llm"] += 1
+            if fast_path:
+                by_type = self._stats["by_query_type"]
+                query_type = analysis_result["query_type"]
+                by_type[query_type] = by_type.get(query_type, 0) + 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["by_query_type"] = dict(stats["by_query_type"])
+        stats["fast_path_rate"] = round(stats["fast_path"] / stats["requests"], 3) if stats["requests"] else None
+        stats["threshold"] = self.threshold
+        return stats
+
+    def _match_entities(self, message, words, store, consumed):
+        """Longest-first, non-overlapping matches of vocabulary phrases in the message"""
+        phrases, max_words = self._vocabulary(store)
+        entities = {}
+        position = 0
+        while position < len(words):
+            for size in range(min(max_words, len(words) - position), 0, -1):
+                phrase = " ".join(words[position:position + size])
+                match = phrases.get(phrase)
+                if match is None:
+                    continue
+                column, value = match
+                # Very short values ("AI", "Go", "R") only count when written the same way
+                if len(value) <= 2 and not re.search(rf"(?<!\w){re.escape(value)}(?!\w)", message):
+                    continue
+                if column in entities and entities[column] != value:
+                    entities[f"{column} extra"] = value
+                else:
+                    entities[column] = value
+                consumed.update(words[position:position + size])
+                position += size
+                break
+            else:
+                position += 1
+        return entities
+
+    def _vocabulary(self, store):
+        version = getattr(store, 'version', 0)
+        cached = self._vocabularies.get(store)
+        vocabulary = cached[1] if cached and cached[0] == version else None
+        if vocabulary is None:
+            phrases = {}
+            # Later columns win on collisions, so a skill name beats an identical category name
+            for column in ("Domain", "Category", "Sub Category"):
+                for value in store.vocab[column]:
+                    key = " ".join(word.strip(".") for word in _WORD_PATTERN.findall(value.lower()))
+                    if key and key not in STOP_WORDS:
+                        phrases[key] = (column, value)
+            max_words = max((len(key.split()) for key in phrases), default=1)
+            vocabulary = (phrases, max_words)
+            with self._lock:
+                self._vocabularies[store] = (version, vocabulary)
+        return vocabulary
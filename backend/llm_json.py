@@ -0,0 +1,285 @@
+import json
+import re
+
+# Tokens inside a JSON candidate: a bracket or a whole string (without `closed` while it is still
+# streaming in); everything between tokens is skipped in C by the regex engine
+_TOKEN = re.compile(r'[\[\]{}]|"[^"\\]*(?:\\.[^"\\]*)*(?P<closed>")?', re.DOTALL)
+_decoder = json.JSONDecoder()
+_CLOSERS = {"}": "{", "]": "["}
+# Characters handed to json.loads per character of text (plus one slack) - retrying the spans nested
+# in a rejected candidate stays linear in the reply size however deep or broken it is
+PARSE_BUDGET = 4
+
+
+class JsonExtractor:
+    """Single-pass finder of the first complete JSON object or array in LLM text.
+
+    Text can be fed in chunks as it streams in; feed() returns the value as
+    soon as its closing bracket arrives. Outside a candidate the scanner only
+    looks for an opening bracket, inside one it jumps between brackets and
+    quotes (skipping string contents, so brackets in strings don't count),
+    so every character is looked at once and only balanced spans are handed
+    to json.loads. Prose, code fences and trailing chatter around the JSON
+    are ignored, and there is no limit on nesting depth.
+
+    `convert(value)` can reject values of the wrong shape (by returning
+    None) or coerce them; a rejected or unparseable span makes the scanner
+    try the spans nested inside it, then carry on after it.
+    """
+
+    def __init__(self, convert=None, openers="{["):
+        self.convert = convert
+        self.openers = openers
+        self.value = None
+        self.done = False
+        self.attempts = 0
+        self._fed = 0
+        self._parsed = 0
+        self._text = ""
+        self._pos = 0
+        # (opener, offset) of the brackets open in the current candidate
+        self._stack = []
+        # Closed spans inside the current candidate, tried when the whole candidate is rejected
+        self._spans = []
+
+    def feed(self, chunk):
+        """Scan another piece of text; returns the value once found (None until then)"""
+        if self.done:
+            return self.value
+        self._text += chunk
+        self._fed += len(chunk)
+        self._scan()
+        return self.value
+
+    def _scan(self):
+        text = self._text
+        pos = self._pos
+        while not self.done:
+            if not self._stack:
+                start = self._next_opener(text, pos)
+                if start < 0:
+                    # Nothing to keep before the next opener
+                    self._text, self._pos = "", 0
+                    return
+                self._stack.append((text[start], start))
+                self._spans = []
+                pos = start + 1
+                continue
+
+            pos = self._scan_candidate(text, pos)
+            if self._stack:
+                break
+
+        if not self.done and self._stack:
+            # Drop text before the open candidate so the buffer stays bounded by its size
+            base = self._stack[0][1]
+            self._stack = [(opener, offset - base) for opener, offset in self._stack]
+            self._spans = [(start - base, end - base) for start, end in self._spans]
+            self._text = text[base:]
+            self._pos = pos - base
+        elif not self.done:
+            self._text, self._pos = "", 0
+
+    def _scan_candidate(self, text, pos):
+        """Follow the open candidate until it closes or the text runs out; returns where scanning stopped"""
+        stack = self._stack
+        for match in _TOKEN.finditer(text, pos):
+            char = match.group()
+            if char[0] == '"':
+                if match.group("closed") is None:
+                    # String still streaming in - resume at its opening quote
+                    return match.start()
+            elif char in "{[":
+                stack.append((char, match.start()))
+            else:
+                opener, start = stack.pop()
+                if opener != _CLOSERS[char]:
+                    # Mismatched brackets - this candidate can't be JSON
+                    stack.clear()
+                    self._try_spans(text)
+                    return match.end()
+                if not stack:
+                    self._try_candidate(text, start, match.end())
+                    return match.end()
+                if opener in self.openers:
+                    self._spans.append((start, match.end()))
+        return len(text)
+
+    def _next_opener(self, text, pos):
+        found = [index for index in (text.find(opener, pos) for opener in self.openers) if index >= 0]
+        return min(found) if found else -1
+
+    def _try_candidate(self, text, start, end):
+        if not self._accept(text, start, end):
+            self._try_spans(text)
+
+    def _try_spans(self, text):
+        # Inner spans close before their parents - try them in order of where they start
+        for start, end in sorted(self._spans):
+            if self._accept(text, start, end):
+                return
+        self._spans = []
+
+    def _accept(self, text, start, end):
+        # Checked before slicing so that spans over budget cost nothing
+        if self._parsed + end - start > PARSE_BUDGET * self._fed + 1024:
+            return False
+        self._parsed += end - start
+        self.attempts += 1
+        try:
+            value = json.loads(text[start:end])
+        except (ValueError, RecursionError):
+            return False
+        if self.convert is not None:
+            value = self.convert(value)
+            if value is None:
+                return False
+        self.value = value
+        self.done = True
+        return True
+
+
+def extract_json(text, convert=None, openers="{["):
+    """First complete JSON object/array in `text` that `convert` accepts (converted), or None.
+
+    Whole replies usually hold one well-formed value, so it is first decoded
+    straight from the first opening bracket (json's raw_decode stops at the
+    end of the value, ignoring what follows); the scanner only runs when
+    that fails.
+    """
+    if not isinstance(text, str):
+        return None
+    found = [index for index in (text.find(opener) for opener in openers) if index >= 0]
+    if found:
+        try:
+            value = _decoder.raw_decode(text, min(found))[0]
+        except (ValueError, RecursionError):
+            pass
+        else:
+            value = value if convert is None else convert(value)
+            if value is not None:
+                return value
+    return JsonExtractor(convert, openers).feed(text)
+
+
+QUERY_TYPES = (
+    "top_performers", "skill_search", "domain_filter", "upskilling_needs", "skill_distribution", "general_info",
+    "employee_details", "comparison", "recommendations", "statistics", "visualization_request",
+)
+# "chart" asks for both the bar and the pie chart
+VISUALIZATION_TYPES = ("bar_chart", "pie_chart", "line_chart", "heatmap", "scatter_plot", "radar_chart", "chart")
+SORT_FIELDS = ("Name", "Domain", "Category", "Sub Category", "Skill Rate", "Interest Rate", "Access", "Email")
+_SORT_FIELD_NAMES = {re.sub(r"[\s_]+", "", field.lower()): field for field in SORT_FIELDS}
+# Prompt placeholders the model sometimes echoes back instead of leaving a filter out
+_PLACEHOLDER = re.compile(r"^(?:|null|none|n/?a|any|all)$|_if_|_mentioned$|_specified$", re.IGNORECASE)
+_TEXT_FILTERS = ("domain", "category", "skill_name")
+_RATE_FILTERS = ("min_skill_rate", "max_skill_rate", "min_interest_rate")
+DEFAULT_LIMIT = 10
+
+
+def _number(value):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, str):
+        try:
+            value = float(value.strip())
+        except ValueError:
+            return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return value if isinstance(value, (int, float)) else None
+
+
+def _flag(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ("true", "yes", "1")
+    return bool(value)
+
+
+def coerce_analysis(value):
+    """An analysis_result with the keys and types process_employee_query expects, or None.
+
+    Unknown query/chart types, sort fields and orders fall back to the
+    defaults the pipeline already uses, echoed prompt placeholders become
+    missing filters, and numbers sent as strings are converted. A value
+    with neither a query_type nor filters isn't an analysis at all.
+    """
+    if not isinstance(value, dict) or ("query_type" not in value and "filters" not in value):
+        return None
+    analysis = dict(value)
+
+    query_type = value.get("query_type")
+    analysis["query_type"] = query_type if query_type in QUERY_TYPES else "general_info"
+    analysis["needs_visualization"] = _flag(value.get("needs_visualization", False))
+    visualization_type = value.get("visualization_type")
+    analysis["visualization_type"] = visualization_type if visualization_type in VISUALIZATION_TYPES else "bar_chart"
+
+    raw_filters = value.get("filters") if isinstance(value.get("filters"), dict) else {}
+    filters = {}
+    for key in _TEXT_FILTERS:
+        text = raw_filters.get(key)
+        if isinstance(text, str) and not _PLACEHOLDER.search(text.strip()):
+            filters[key] = text.strip()
+    for key in _RATE_FILTERS:
+        rate = _number(raw_filters.get(key))
+        if rate is not None and 1 <= rate <= 5:
+            filters[key] = rate
+    access = raw_filters.get("access_level")
+    if isinstance(access, str) and access.strip().lower() in ("admin", "user"):
+        filters["access_level"] = access.strip().lower()
+    analysis["filters"] = filters
+
+    limit = value.get("limit", DEFAULT_LIMIT)
+    if limit is not None:
+        limit = _number(limit)
+        limit = int(limit) if limit is not None and limit >= 1 else DEFAULT_LIMIT
+    analysis["limit"] = limit
+    sort_by = value.get("sort_by")
+    analysis["sort_by"] = _SORT_FIELD_NAMES.get(re.sub(r"[\s_]+", "", sort_by.lower()), "Skill Rate") \
+        if isinstance(sort_by, str) else "Skill Rate"
+    sort_order = value.get("sort_order")
+    analysis["sort_order"] = "asc" if isinstance(sort_order, str) and sort_order.strip().lower().startswith("asc") else "desc"
+    if not isinstance(value.get("context"), str):
+        analysis["context"] = ""
+    return analysis
+
+
+def coerce_course(value):
+    """One course with the fields the course cards render (title required), or None"""
+    if not isinstance(value, dict):
+        return None
+    title = value.get("title")
+    if not isinstance(title, str) or not title.strip():
+        return None
+    course = dict(value)
+    course["title"] = title.strip()
+    for key, default in (("provider", "Online"), ("description", ""), ("level", "Intermediate")):
+        course[key] = value[key] if isinstance(value.get(key), str) and value[key] else default
+    duration = value.get("duration")
+    course["duration"] = f"{duration} weeks" if _number(duration) is not None and not isinstance(duration, str) \
+        else duration if isinstance(duration, str) and duration else "Self-paced"
+    rating = _number(value.get("rating"))
+    course["rating"] = min(5.0, max(0.0, rating)) if rating is not None else 4.5
+    match_score = _number(value.get("matchScore"))
+    course["matchScore"] = min(1.0, max(0.0, match_score)) if match_score is not None else 0.8
+    features = value.get("features")
+    if isinstance(features, str):
+        features = [features]
+    course["features"] = [str(feature) for feature in features if feature] if isinstance(features, list) else []
+    return course
+
+
+def coerce_courses(value, count=3):
+    """Exactly `count` courses from a course list (or a {"courses": [...]} wrapper), or None if too few are usable"""
+    if isinstance(value, dict):
+        value = value.get("courses") or value.get("recommendations")
+    if not isinstance(value, list):
+        return None
+    courses = []
+    for item in value:
+        course = coerce_course(item)
+        if course is not None:
+            courses.append(course)
+            if len(courses) == count:
+                return courses
+    return None
@@ -0,0 +1,163 @@
+"""Load test of the production server (gunicorn.conf.py) with stubbed Gemini and Supabase.
+
+Usage:
+    python loadtest.py [--configs 1x8,2x4,4x4] [--rows 20000] [--requests 400] [--concurrency 16]
+                       [--latency 0.2] [--rtt 0.02]
+
+Every workers x threads configuration gets its own gunicorn server serving
+stub_app(): the real app with the stand-ins from benchmark.py in place of
+the Gemini model (fixed latency per call) and Supabase (round trip plus
+transfer time). The harness waits for the workers to report ready, sends
+`--requests` assistant questions from `--concurrency` clients and reports
+requests/sec, p50/p99 latency and the memory of the workers. RSS counts
+shared pages in every worker; PSS splits them between the processes
+sharing them, so its total shows what the workers really cost.
+
+The per-user rate limit is off (every request comes from one client), but
+the LLM concurrency limit applies: requests beyond LLM_MAX_CONCURRENCY plus
+LLM_MAX_QUEUE per worker get the fast rule-based answers. Set those in the
+environment to load test other limits.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+QUESTIONS = [
+    "Which employees know Python?",
+    "Show top performers in Cloud",
+    "Who needs upskilling in Data Science?",
+    "Show the skill distribution",
+    "How many employees are in each domain?",
+    "Find employees with React skills",
+]
+
+
+def stub_app():
+    """The backend app wired to the stubs (gunicorn -c gunicorn.conf.py 'loadtest:stub_app()')"""
+    os.environ.update({
+        "GEMINI_API_KEY": "", "NEXT_PUBLIC_SUPABASE_URL": "", "EMPLOYEE_SNAPSHOT_PATH": "",
+        "COURSE_CACHE_PATH": "", "COURSE_CATALOG_WARMER": "0", "USER_RATE_LIMIT": "0"
+    })
+    import main
+    from benchmark import StubModel, StubSupabase
+    from synthetic_data import generate_employee_rows
+
+    StubModel.latency = float(os.getenv("LOADTEST_LATENCY", 0.2))
+    stub = StubSupabase(generate_employee_rows(int(os.getenv("LOADTEST_ROWS", 20000))),
+                        rtt=float(os.getenv("LOADTEST_RTT", 0.02)))
+    main.genai_api_key = "stub"
+    main.gemini_client.model_factory = StubModel
+    main.supabase_configured = True
+    main.get_supabase_client = lambda: stub
+    return main.app
+
+
+def process_memory_kb(pid):
+    """(RSS, PSS) of one process in kB, from /proc"""
+    memory = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            field, _, value = line.partition(":")
+            if field in ("Rss", "Pss"):
+                memory[field] = int(value.split()[0])
+    return memory.get("Rss", 0), memory.get("Pss", 0)
+
+
+def worker_pids(master_pid):
+    with open(f"/proc/{master_pid}/task/{master_pid}/children") as f:
+        return [int(pid) for pid in f.read().split()]
+
+
+def wait_ready(port, workers, timeout=120):
+    """Wait until readiness checks (spread over the workers by the kernel) keep succeeding"""
+    deadline = time.time() + timeout
+    streak = 0
+    while streak < workers * 3:
+        if time.time() > deadline:
+            raise RuntimeError(f"Server on port {port} did not become ready within {timeout}s")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/api/health/ready", timeout=5):
+                streak += 1
+                continue
+        except (urllib.error.URLError, ConnectionError):
+            streak = 0
+        time.sleep(0.1)
+
+
+def ask(port, index, distinct):
+    question = QUESTIONS[index % len(QUESTIONS)]
+    body = json.dumps({"message": f"{question} #{index % distinct}", "userRole": "admin"}).encode()
+    request = urllib.request.Request(f"http://127.0.0.1:{port}/api/ai-assistant", data=body,
+                                     headers={"Content-Type": "application/json"})
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=60) as response:
+            response.read()
+            ok = response.status == 200
+    except (urllib.error.URLError, ConnectionError):
+        ok = False
+    return (time.perf_counter() - started) * 1000, ok
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def run_config(workers, threads, port, args):
+    env = dict(os.environ, WEB_WORKERS=str(workers), WEB_THREADS=str(threads), PORT=str(port),
+               LOADTEST_ROWS=str(args.rows), LOADTEST_LATENCY=str(args.latency), LOADTEST_RTT=str(args.rtt))
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "loadtest:stub_app()"],
+        cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_ready(port, workers)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            results = list(pool.map(lambda index: ask(port, index, args.distinct), range(args.requests)))
+        elapsed = time.perf_counter() - started
+        memory = [process_memory_kb(pid) for pid in worker_pids(server.pid)]
+    finally:
+        server.terminate()
+        server.wait()
+
+    latencies = sorted(latency for latency, _ in results)
+    return {
+        "rps": len(results) / elapsed,
+        "p50": percentile(latencies, 0.5),
+        "p99": percentile(latencies, 0.99),
+        "errors": sum(1 for _, ok in results if not ok),
+        "rss_mb": sum(rss for rss, _ in memory) / 1024,
+        "pss_mb": sum(pss for _, pss in memory) / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--configs", default="1x8,2x4,4x4", help="comma-separated workers x threads")
+    parser.add_argument("--rows", type=int, default=20000, help="employee rows served by the stub Supabase")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--distinct", type=int, default=50, help="distinct questions (the rest repeat)")
+    parser.add_argument("--latency", type=float, default=0.2, help="stub LLM latency per call (seconds)")
+    parser.add_argument("--rtt", type=float, default=0.02, help="stub Supabase round trip (seconds)")
+    parser.add_argument("--port", type=int, default=5057)
+    args = parser.parse_args()
+
+    print(f"{'config':>8} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7} {'RSS MB':>8} {'PSS MB':>8}")
+    for config in args.configs.split(","):
+        workers, threads = (int(part) for part in config.split("x"))
+        result = run_config(workers, threads, args.port, args)
+        print(f"{config:>8} {result['rps']:>8.1f} {result['p50']:>8.1f} {result['p99']:>8.1f} "
+              f"{result['errors']:>7} {result['rss_mb']:>8.1f} {result['pss_mb']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,37 @@
-from flask import Flask, request, jsonify
+import time
+# Start of the startup time budget - taken before the heavier imports below
+_import_started = time.perf_counter()
+from flask import Flask, request, jsonify, Response, stream_with_context, has_app_context, has_request_context, g
 from flask_cors import CORS
-import google.generativeai as genai
+from werkzeug.middleware.proxy_fix import ProxyFix
 import os
 from dotenv import load_dotenv
-import supabase
 import json
+import threading
+import gc
 import traceback
 import re
+import weakref
+import uuid
+from datetime import datetime, timedelta
+from collections import OrderedDict
+from functools import lru_cache
+from employee_cache import EmployeeSnapshotCache
+from employee_store import ID_COLUMN, EmployeeStore, top_k
+from aggregates import aggregate_employees
+from response_cache import TTLCache, normalize_message
+from intent_classifier import IntentClassifier
+from pipeline import PipelineTimings, StagePool, StageTimeout
+from course_catalog import CourseCatalogWarmer
+from upstream import CircuitBreaker, GeminiClient, UpstreamClient
+from admission import ConcurrencyLimiter, OverloadedError, RateLimiter
+from query_planner import EMPLOYEE_COLUMNS, plan_employee_query
+from snapshot_file import SnapshotFile, SnapshotFileError
+from startup import Startup
+from metrics import MetricsRegistry, StageTimer, clear_shared_metrics, current_trace, end_trace, start_trace
+from structured_log import StructuredLogger
+from llm_json import coerce_analysis, coerce_courses, extract_json
+from singleflight import SingleFlight
 
 app = Flask(__name__)
 # More comprehensive CORS configuration
@@ -21,54 +46,375 @@ CORS(app, resources={
 # Load environment variables
 load_dotenv()
 
+# Proxies in front of the server that set X-Forwarded-For, so request.remote_addr (the rate-limit key of
+# requests that name no user) is the client's address rather than the proxy's. Off by default: without a proxy
+# overwriting it, any client could pick its own rate-limit key by sending the header
+app.wsgi_app = ProxyFix(app.wsgi_app, x_for=int(os.getenv('TRUSTED_PROXIES', 0)))
+
+# External clients are created on first use or by the warm-up task, never by the import itself.
+# STARTUP_WARMUP is "background" (warm up in a thread, not ready until done), "blocking" (warm up
+# before the import returns), "off" (everything on first use) or "prefork" (left to the server hooks in
+# gunicorn.conf.py, which load the employee snapshot in the master and the clients in each worker)
+STARTUP_WARMUP = os.getenv('STARTUP_WARMUP', 'background')
+startup = Startup(_import_started, budget_ms=float(os.getenv('STARTUP_BUDGET_MS', 1000)))
+
+# Request and pipeline-stage latency histograms, scraped from /api/metrics. Forked workers (gunicorn.conf.py
+# sets METRICS_DIR) merge their metrics through files in METRICS_DIR, written every METRICS_WRITE_INTERVAL
+# seconds, so any worker answers a scrape for all of them
+metrics = MetricsRegistry()
+METRICS_DIR = os.getenv('METRICS_DIR')
+METRICS_WRITE_INTERVAL = float(os.getenv('METRICS_WRITE_INTERVAL', 5))
+request_seconds = metrics.histogram('backend_request_duration_seconds', 'Latency of API requests', ('endpoint', 'method', 'status'))
+stage_timer = StageTimer(metrics.histogram('backend_stage_duration_seconds', 'Latency of assistant and course pipeline stages', ('stage',)))
+# Shape of the LLM replies parsed, and whether a usable value came out or the caller fell back
+llm_replies = metrics.counter('backend_llm_replies_total', 'LLM JSON replies by expected shape and parse outcome', ('shape', 'outcome'))
+# Duplicate requests answered with another request's response, and the upstream calls that saved
+coalesced_requests = metrics.counter('backend_coalesced_requests_total', 'Requests answered with the response of an identical in-flight request', ('endpoint',))
+coalesced_upstream_calls = metrics.counter('backend_coalesced_upstream_calls_saved_total', 'Upstream calls not made thanks to coalescing', ('endpoint', 'upstream'))
+# Assistant and course requests answered without the LLM because of overload or the per-user rate limit
+llm_shed = metrics.counter('backend_llm_shed_total', 'Requests shed from the LLM to the rule-based or fallback path', ('reason',))
+# TIMING_HEADER=1 adds a Server-Timing header with the stage spans to every response
+TIMING_HEADER = os.getenv('TIMING_HEADER', '0') == '1'
+
+def log_context():
+    trace = current_trace()
+    return {"request_id": trace.request_id} if trace else None
+
+# Request-path logging: JSON lines written off the request thread. LOG_SAMPLE_RATE keeps that share
+# of debug/info records (warnings and errors are always kept)
+log = StructuredLogger(
+    sample_rate=float(os.getenv('LOG_SAMPLE_RATE', 1.0)),
+    min_level=os.getenv('LOG_LEVEL', 'info'),
+    context=log_context
+)
+
 # Configure the Gemini API
 genai_api_key = os.getenv('GEMINI_API_KEY')
 if not genai_api_key:
     print("WARNING: Gemini API key not found in environment variables")
-else:
+
+def create_gemini_model():
+    """Import and configure the Gemini SDK (slow to import) and build the shared model"""
+    import google.generativeai as genai
     genai.configure(api_key=genai_api_key)
     print(f"Gemini API key configured successfully")
-    
-    # Try to list available models to diagnose issues
-    try:
-        models = genai.list_models()
-        print("Available Gemini models:")
-        for model in models:
-            print(f" - {model.name}")
-    except Exception as e:
-        print(f"Error listing models: {str(e)}")
+    if os.getenv('GEMINI_LIST_MODELS') == '1':
+        # Diagnostic only - a network round trip
+        try:
+            print("Available Gemini models:")
+            for model in genai.list_models():
+                print(f" - {model.name}")
+        except Exception as e:
+            print(f"Error listing models: {str(e)}")
+    return genai.GenerativeModel('gemini-1.5-flash')
+
+def record_llm_shed(reason):
+    llm_shed.inc(reason=reason)
+    log.warning("llm_shed", reason=reason)
+    if has_app_context():
+        # The rest of this request skips the LLM instead of queueing for it again
+        g.llm_shed = reason
+
+# Gemini calls in flight per process. Calls beyond LLM_MAX_CONCURRENCY wait (at most LLM_MAX_QUEUE of them)
+# for up to LLM_QUEUE_TIMEOUT seconds and are then shed to the rule-based/fallback answers, so a slow
+# Gemini can't tie up every worker thread; keep LLM_MAX_CONCURRENCY + LLM_MAX_QUEUE below WEB_THREADS
+llm_limiter = ConcurrencyLimiter(
+    'gemini',
+    max_concurrent=int(os.getenv('LLM_MAX_CONCURRENCY', 4)),
+    queue_timeout=float(os.getenv('LLM_QUEUE_TIMEOUT', 2)),
+    max_queue=int(os.getenv('LLM_MAX_QUEUE', 2)),
+    on_shed=record_llm_shed
+)
+# Per-user (userEmail, else client address) token bucket for requests that reach the LLM: USER_RATE_LIMIT
+# requests a second on average, bursts of USER_RATE_BURST; users over it get the rule-based answers.
+# Answers from a cache, the intent fast path or another user's identical request are free.
+# USER_RATE_LIMIT=0 turns it off
+user_rate_limiter = RateLimiter(
+    rate=float(os.getenv('USER_RATE_LIMIT', 0.5)),
+    burst=float(os.getenv('USER_RATE_BURST', 10))
+)
+
+def set_llm_user(user_key):
+    """Charge this request's LLM calls to user_key (the client address when the request names no user)"""
+    g.llm_user = user_key or request.remote_addr
+
+def llm_user_has_tokens():
+    """Whether this request's user could still be charged for an LLM call"""
+    return user_rate_limiter.available(g.get('llm_user') or request.remote_addr)
+
+def charge_llm_user():
+    """Take a token from the user's bucket at the request's first LLM call; a user without one is answered
+    without the LLM this time (the call raises OverloadedError)"""
+    if not has_request_context() or g.get('llm_user_charged'):
+        return True
+    g.llm_user_charged = True
+    if user_rate_limiter.allow(g.get('llm_user') or request.remote_addr):
+        return True
+    record_llm_shed("rate_limited")
+    return False
+
+# Shared upstream clients: one reused model/connection per service, with a deadline, jittered
+# retries and a circuit breaker that sends requests straight to the fallback path while it is open
+gemini_client = GeminiClient(
+    create_gemini_model,
+    UpstreamClient(
+        'gemini',
+        timeout=float(os.getenv('GEMINI_TIMEOUT', 30)),
+        # Whole-call budget including retries and backoff
+        deadline=float(os.getenv('GEMINI_DEADLINE', 45)),
+        retries=int(os.getenv('GEMINI_RETRIES', 2)),
+        breaker=CircuitBreaker(int(os.getenv('GEMINI_BREAKER_THRESHOLD', 5)), float(os.getenv('GEMINI_BREAKER_RESET', 30)))
+    ),
+    limiter=llm_limiter,
+    admit=charge_llm_user
+)
+supabase_upstream = UpstreamClient(
+    'supabase',
+    timeout=float(os.getenv('SUPABASE_TIMEOUT', 10)),
+    deadline=float(os.getenv('SUPABASE_DEADLINE', 20)),
+    retries=int(os.getenv('SUPABASE_RETRIES', 2)),
+    breaker=CircuitBreaker(int(os.getenv('SUPABASE_BREAKER_THRESHOLD', 5)), float(os.getenv('SUPABASE_BREAKER_RESET', 30)))
+)
+
+def llm_available():
+    """Whether Gemini is configured, its circuit breaker lets calls through and this request hasn't been shed"""
+    if has_app_context() and g.get('llm_shed'):
+        return False
+    return bool(genai_api_key) and gemini_client.available()
 
 # Configure Supabase connection
 supabase_url = os.getenv("NEXT_PUBLIC_SUPABASE_URL")
 supabase_key = os.getenv("NEXT_PUBLIC_SUPABASE_ANON_KEY")
-if not supabase_url or not supabase_key:
+supabase_configured = bool(supabase_url and supabase_key)
+if not supabase_configured:
     print("WARNING: Supabase credentials not found in environment variables")
-    supabase_client = None
-else:
-    # Initialize Supabase client
-    supabase_client = supabase.create_client(supabase_url, supabase_key)
-    print("Supabase client configured successfully")
+_supabase_client = None
+_supabase_client_lock = threading.Lock()
+
+def get_supabase_client():
+    """The shared Supabase client, created on first use (None without credentials)"""
+    global _supabase_client
+    if _supabase_client is None and supabase_configured:
+        with _supabase_client_lock:
+            if _supabase_client is None:
+                import supabase
+                from supabase import ClientOptions
+                _supabase_client = supabase.create_client(
+                    supabase_url, supabase_key,
+                    options=ClientOptions(postgrest_client_timeout=supabase_upstream.timeout)
+                )
+                print("Supabase client configured successfully")
+    return _supabase_client
+
+# Course recommendations memoized per (skill, domain, category, skill-level bucket). This is also the
+# precomputed course catalog; set COURSE_CACHE_PATH (e.g. to a course_catalog.db file) to persist it to SQLite
+# so it survives restarts and is shared by workers
+course_cache = TTLCache(
+    'courses',
+    max_size=int(os.getenv('COURSE_CACHE_SIZE', 4096)),
+    ttl=float(os.getenv('COURSE_CACHE_TTL', 86400)),
+    path=os.getenv('COURSE_CACHE_PATH') or None
+)
+# Profiles sent to the LLM per batch prompt, and the most profiles one batch request may carry
+COURSE_BATCH_SIZE = int(os.getenv('COURSE_BATCH_SIZE', 5))
+MAX_COURSE_BATCH = int(os.getenv('MAX_COURSE_BATCH', 100))
+
+# Answer questions with server-side filtered queries while the employee snapshot is still cold
+PLANNED_QUERIES = os.getenv('PLANNED_QUERIES', '1') == '1'
+
+# Ranked assistant results kept server-side so further pages don't re-run the fetch or the LLM
+result_cache = TTLCache(
+    'results',
+    max_size=int(os.getenv('RESULT_CACHE_SIZE', 256)),
+    ttl=float(os.getenv('RESULT_CACHE_TTL', 600))
+)
+# Most rows one query may rank, rows per page (default and maximum) and the byte budget of one page
+MAX_RESULT_ROWS = int(os.getenv('MAX_RESULT_ROWS', 1000))
+RESULT_PAGE_SIZE = int(os.getenv('RESULT_PAGE_SIZE', 50))
+MAX_RESULT_PAGE_SIZE = int(os.getenv('MAX_RESULT_PAGE_SIZE', 200))
+MAX_RESULT_PAGE_BYTES = int(os.getenv('MAX_RESULT_PAGE_BYTES', 256 * 1024))
+
+# Local intent classifier that answers common questions without the analysis LLM call
+INTENT_FAST_PATH = os.getenv('INTENT_FAST_PATH', '1') == '1'
+intent_classifier = IntentClassifier(threshold=float(os.getenv('INTENT_FAST_PATH_THRESHOLD', 0.8)))
+
+# "parallel" overlaps independent stages of /api/ai-assistant and "merged" answers with a single
+# LLM call; requests can also pick one with "pipeline"
+ASSISTANT_PIPELINE = os.getenv('ASSISTANT_PIPELINE', 'sequential')
+stage_pool = StagePool(max_workers=int(os.getenv('ASSISTANT_STAGE_WORKERS', 16)))
+# Supabase fetches and chart building get their own workers, so LLM stages stuck on a slow upstream can't
+# hold every thread while requests wait for data
+io_stage_pool = StagePool(max_workers=int(os.getenv('ASSISTANT_IO_STAGE_WORKERS', 8)), name="assistant-io-stage")
+# Per-stage deadlines (seconds) for the parallel pipeline
+STAGE_TIMEOUTS = {
+    "fetch": float(os.getenv('STAGE_TIMEOUT_FETCH', 10)),
+    "analysis": float(os.getenv('STAGE_TIMEOUT_ANALYSIS', 15)),
+    "visualizations": float(os.getenv('STAGE_TIMEOUT_VISUALIZATIONS', 5)),
+    "narrative": float(os.getenv('STAGE_TIMEOUT_NARRATIVE', 20))
+}
+
+# Cache of parsed query analyses, keyed by user role + normalized question (ANALYSIS_CACHE_PATH enables on-disk persistence)
+analysis_cache = TTLCache(
+    'analysis',
+    max_size=int(os.getenv('ANALYSIS_CACHE_SIZE', 512)),
+    ttl=float(os.getenv('ANALYSIS_CACHE_TTL', 3600)),
+    path=os.getenv('ANALYSIS_CACHE_PATH')
+)
+
+# Identical assistant questions and course profiles arriving while one is being answered wait for it and
+# get a copy of its response instead of repeating the Supabase and Gemini calls. Followers give up waiting
+# after COALESCE_WAIT_TIMEOUT seconds; COALESCE_REQUESTS=0 turns this off
+COALESCE_REQUESTS = os.getenv('COALESCE_REQUESTS', '1') == '1'
+assistant_flight = SingleFlight('assistant', wait_timeout=float(os.getenv('COALESCE_WAIT_TIMEOUT', 30)))
+course_flight = SingleFlight('courses', wait_timeout=float(os.getenv('COALESCE_WAIT_TIMEOUT', 30)))
+# Trace stages that are one upstream call each, for counting the calls a coalesced request saved
+UPSTREAM_STAGES = {
+    "supabase_fetch": "supabase", "supabase_sync": "supabase",
+    "analysis_llm": "gemini", "merged_llm": "gemini", "narrative_llm": "gemini",
+    "narrative_llm_stream": "gemini", "course_llm": "gemini"
+}
+
+@app.before_request
+def begin_request_trace():
+    g.trace, g.trace_token = start_trace()
+
+@app.after_request
+def finish_request_trace(response):
+    trace = g.get('trace')
+    if trace is not None:
+        labels = dict(endpoint=request.url_rule.rule if request.url_rule else 'unmatched', method=request.method,
+                      status=response.status_code)
+        if response.is_streamed:
+            # A streamed (SSE) response is only done once its body has been sent
+            response.call_on_close(lambda: request_seconds.observe(time.perf_counter() - trace.started, **labels))
+        else:
+            request_seconds.observe(time.perf_counter() - trace.started, **labels)
+        if TIMING_HEADER:
+            response.headers['Server-Timing'] = trace.server_timing()
+    return response
+
+@app.teardown_request
+def end_request_trace(error=None):
+    token = g.pop('trace_token', None)
+    if token is not None:
+        try:
+            end_trace(token)
+        except ValueError:
+            # Streamed responses finish in a different context than they started in
+            pass
+
+metrics.gauge('backend_ready', 'Whether the startup warm-up has finished', lambda: int(startup.is_ready()))
+metrics.gauge('backend_employee_snapshot_rows', 'Rows in the employee snapshot', lambda: employee_cache.stats()["snapshot_rows"])
+metrics.gauge('backend_employee_snapshot_age_seconds', 'Seconds since the employee snapshot was refreshed',
+              lambda: employee_cache.stats()["snapshot_age_seconds"])
+metrics.gauge('backend_upstream_circuit_open', 'Whether the circuit breaker of an upstream is open', lambda: {
+    ("gemini",): int(gemini_client.upstream.breaker.state == "open"),
+    ("supabase",): int(supabase_upstream.breaker.state == "open")
+}, ('upstream',))
+metrics.gauge('backend_cache_hit_rate', 'Hit rate of the in-process caches', lambda: {
+    (name,): cache.stats()["hit_rate"] for name, cache in (
+        ("employees", employee_cache), ("analysis", analysis_cache), ("results", result_cache), ("courses", course_cache)
+    )
+}, ('cache',))
+metrics.gauge('backend_coalesce_in_flight', 'Distinct requests being answered that duplicates can join', lambda: {
+    (flight.name,): flight.in_flight() for flight in (assistant_flight, course_flight)
+}, ('endpoint',))
+metrics.gauge('backend_llm_queue_depth', 'Gemini calls waiting for a concurrency slot', llm_limiter.queue_depth)
+metrics.gauge('backend_llm_active_calls', 'Gemini calls holding a concurrency slot', llm_limiter.active)
+metrics.gauge('backend_log_records', 'Structured log records written, sampled out and dropped', lambda: {
+    (outcome,): log.stats()[outcome] for outcome in ("written", "sampled_out", "dropped")
+}, ('outcome',))
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+# Liveness: the process answers HTTP (restart it if not)
+@app.route('/api/health/live', methods=['GET'])
+def liveness_check():
+    return jsonify({"status": "alive"})
+
+# Readiness: the warm-up has finished, so the first requests won't pay for it (route traffic here only then)
+@app.route('/api/health/ready', methods=['GET'])
+def readiness_check():
+    ready = startup.is_ready()
+    return jsonify({"status": "ready" if ready else "starting", "startup": startup.stats()}), 200 if ready else 503
 
 # Add health check endpoint
 @app.route('/api/health', methods=['GET'])
 def health_check():
     return jsonify({
         "status": "healthy",
+        "ready": startup.is_ready(),
+        "startup": startup.stats(),
         "gemini_configured": bool(genai_api_key),
-        "supabase_configured": bool(supabase_client)
+        "supabase_configured": supabase_configured,
+        "employee_cache": employee_cache.stats(),
+        "employee_snapshot_file": snapshot_file.stats(),
+        "analysis_cache": analysis_cache.stats(),
+        "result_cache": result_cache.stats(),
+        "intent_classifier": intent_classifier.stats(),
+        "course_cache": course_cache.stats(),
+        "course_catalog": course_catalog_warmer.stats(),
+        "admission": {
+            "llm": llm_limiter.stats(),
+            "user_rate_limit": user_rate_limiter.stats()
+        },
+        "coalescing": {
+            "assistant": assistant_flight.stats(),
+            "courses": course_flight.stats()
+        },
+        "upstreams": {
+            "gemini": gemini_client.upstream.stats(),
+            "supabase": supabase_upstream.stats()
+        }
     })
 
+@app.route('/api/cache/invalidate', methods=['POST', 'OPTIONS'])
+def invalidate_employee_cache():
+    # Handle preflight requests
+    if request.method == 'OPTIONS':
+        return jsonify({"status": "ok"}), 200
+
+    employee_cache.invalidate()
+    log.info("employee_cache_invalidated")
+    return jsonify({"status": "invalidated", "employee_cache": employee_cache.stats()})
+
+def coalesced_response(flight, key, view):
+    """view()'s response, computed once for all identical requests that overlap with it.
+
+    Followers get a copy of the leader's body and status in a Response of
+    their own (the CORS and timing headers are still added per request), and
+    the upstream calls in the leader's trace are counted as saved for each.
+    """
+    trace = current_trace()
+
+    def compute():
+        spans_before = len(trace.spans) if trace else 0
+        response = app.make_response(view())
+        upstream_calls = {}
+        for stage, _ in (list(trace.spans)[spans_before:] if trace else []):
+            upstream = UPSTREAM_STAGES.get(stage)
+            if upstream:
+                upstream_calls[upstream] = upstream_calls.get(upstream, 0) + 1
+        return response.get_data(), response.status_code, response.content_type, upstream_calls
+
+    (body, status, content_type, upstream_calls), shared = flight.do(key, compute)
+    if shared:
+        coalesced_requests.inc(endpoint=flight.name)
+        for upstream, calls in upstream_calls.items():
+            coalesced_upstream_calls.inc(calls, endpoint=flight.name, upstream=upstream)
+        log.info("request_coalesced", endpoint=flight.name, upstream_calls_saved=sum(upstream_calls.values()))
+    return Response(body, status=status, content_type=content_type)
+
 @app.route('/api/ai-assistant', methods=['POST', 'OPTIONS'])
 def ai_assistant():
     # Handle preflight requests
     if request.method == 'OPTIONS':
         return jsonify({"status": "ok"}), 200
     
-    print("Received AI assistant request")
-    
     try:
         request_data = request.json
-        print(f"Request data: {request_data}")
         
         if not request_data:
             return jsonify({"error": "No request data provided"}), 400
@@ -76,160 +422,604 @@ def ai_assistant():
         user_message = request_data.get('message', '')
         user_role = request_data.get('userRole', 'user')
         user_email = request_data.get('userEmail', '')
+        # Server-sent events instead of one JSON body
+        stream = bool(request_data.get('stream')) or 'text/event-stream' in request.headers.get('Accept', '')
         
         if not user_message:
             return jsonify({"error": "No message provided"}), 400
         
-        # Fetch employee data from Supabase
-        employee_data = fetch_employee_data()
-        if not employee_data:
-            return jsonify({
-                "response": "Sorry, I couldn't fetch employee data at the moment. Please check your database connection and try again.",
-                "data": None,
-                "visualizations": None
-            })
+        pipeline_mode = request_data.get('pipeline') or ASSISTANT_PIPELINE
+        log.info("assistant_request", role=user_role, message_chars=len(user_message), pipeline=pipeline_mode, stream=stream)
+        set_llm_user(user_email)
+        # Rate-limited requests get the rule-based answer, which must not be shared with other requests
+        if COALESCE_REQUESTS and not stream and llm_user_has_tokens():
+            # Page options shape the reply, so they are part of what makes two requests identical
+            key = json.dumps([user_role, normalize_message(user_message), pipeline_mode,
+                              request_data.get('page_size'), request_data.get('fields')], default=str)
+            return coalesced_response(assistant_flight, key, lambda: answer_question(user_message, user_role, pipeline_mode, stream))
+        return answer_question(user_message, user_role, pipeline_mode, stream)
+            
+    except Exception as e:
+        log.error("assistant_error", error=str(e), traceback=traceback.format_exc())
+        return jsonify({
+            "response": "Sorry, I encountered an error while processing your request. Please try again.",
+            "data": None,
+            "visualizations": None
+        }), 500
+
+def answer_question(user_message, user_role, pipeline_mode, stream):
+    """The /api/ai-assistant response for a validated question, in the requested pipeline mode"""
+    if pipeline_mode == 'parallel':
+        return run_parallel_pipeline(user_message, user_role, stream)
+    if pipeline_mode == 'merged':
+        return run_merged_pipeline(user_message, user_role, stream)
+    
+    # Cold snapshot cache: let Supabase run the filters instead of waiting for the whole table
+    if PLANNED_QUERIES and supabase_configured and llm_available() and not employee_cache.is_warm():
+        planned_response = run_planned_query(user_message, user_role, stream)
+        if planned_response is not None:
+            return planned_response
+    
+    # Fetch employee data from Supabase
+    employee_data = fetch_employee_data()
+    if not employee_data:
+        return no_employee_data_response(stream)
+    
+    # Common, unambiguous questions are analysed locally instead of by the LLM
+    fast_analysis = None
+    if INTENT_FAST_PATH:
+        fast_analysis = intent_classifier.fast_path(user_message, get_employee_store(employee_data))
+    intent_classifier.record(fast_analysis, fast_path=fast_analysis is not None)
+    
+    # Check if Gemini API key is configured and Gemini is healthy
+    if not llm_available():
+        log.info("assistant_rule_based", reason="llm_unavailable")
+        response_data = handle_query_rule_based(user_message, employee_data, user_role, fast_analysis)
+        return stream_complete_response(response_data) if stream else jsonify(response_data)
+    
+    try:
+        # Use enhanced Gemini API for intelligent responses
+        model = gemini_client
+        
+        analysis_result = fast_analysis or analyze_user_query(model, user_message, user_role, len(employee_data))
         
-        # Check if Gemini API key is configured
-        if not genai_api_key:
-            print("Gemini API key not configured, using rule-based responses")
+        if not analysis_result:
+            log.warning("assistant_rule_based", reason="analysis_unparseable")
             response_data = handle_query_rule_based(user_message, employee_data, user_role)
-            return jsonify(response_data)
+            return stream_complete_response(response_data) if stream else jsonify(response_data)
         
+        log.debug("query_analysis", analysis=analysis_result)
+        
+        return respond_with_results(model, user_message, user_role, analysis_result, employee_data, stream)
+        
+    except Exception as gemini_error:
+        log.error("gemini_error", error=str(gemini_error))
+        # Fall back to rule-based responses
+        response_data = handle_query_rule_based(user_message, employee_data, user_role, fast_analysis)
+        return stream_complete_response(response_data) if stream else jsonify(response_data)
+
+def build_response_prompt(user_message, user_role, analysis_result, processed_data, visualizations, aggregates=None):
+    """Prompt for the natural language answer about already processed query results"""
+    response_prompt = f"""
+    You are a professional AI Career Assistant providing insights about employee data. Generate a helpful, conversational, and informative response.
+
+    CONTEXT:
+    - User asked: "{user_message}"
+    - Query analysis: {analysis_result}
+    - Results found: {len(processed_data)} employees
+    - User role: {user_role}
+    - Visualization generated: {bool(visualizations)}
+
+    DATA SUMMARY:
+    {generate_data_summary(processed_data, analysis_result, aggregates)}
+
+    INSTRUCTIONS:
+    1. Start with a direct acknowledgment of what the user asked
+    2. Provide key insights from the data
+    3. Be conversational but professional
+    4. Include relevant statistics or patterns
+    5. If visualizations were generated, mention them
+    6. Suggest follow-up questions if appropriate
+    7. Keep response concise (2-4 sentences)
+    8. Don't repeat the raw data - just insights and summary
+
+    TONE: Helpful, professional, insightful
+
+    Generate your response:
+    """
+    return response_prompt
+
+def format_sse(event, payload):
+    """One server-sent event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+def sse_response(events):
+    return Response(
+        stream_with_context(events),
+        mimetype='text/event-stream',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def stream_complete_response(response_data):
+    """Stream an already complete assistant response (rule-based and fallback paths)"""
+    def events():
+        yield format_sse("data", {"data": response_data.get("data"), "visualizations": response_data.get("visualizations")})
+        yield format_sse("token", {"text": response_data.get("response", "")})
+        yield format_sse("done", {"response": response_data.get("response", "")})
+    return sse_response(events())
+
+def stream_assistant_response(model, response_prompt, analysis_result, processed_data, visualizations):
+    """Stream the result payload right away, then the narrative tokens as the LLM produces them.
+
+    Events: "data" ({data, visualizations}), any number of "token" ({text})
+    and a final "done" ({response}) carrying the full narrative.
+    """
+    def events():
+        yield format_sse("data", {
+            "data": employee_result(processed_data),
+            "visualizations": visualizations
+        })
+        
+        chunks = []
         try:
-            # Use enhanced Gemini API for intelligent responses
-            model = genai.GenerativeModel('gemini-1.5-flash')
-            
-            # Enhanced analysis prompt with visualization detection
-            analysis_prompt = f"""
-            You are an expert AI Career Assistant analyzing employee data queries. Your role is to understand user intent and determine if visualizations are needed.
-
-            CONTEXT:
-            - User Query: "{user_message}"
-            - User Role: {user_role}
-            - Available Employee Data: {len(employee_data)} employees
-            - Data Fields: Name, Domain, Category, Sub Category (skill name), Skill Rate (1-5), Interest Rate (1-5), Access (admin/user), Email
-
-            VISUALIZATION DETECTION:
-            Check if the user is asking for:
-            - Charts, graphs, plots, visualizations
-            - Heatmaps, distribution analysis
-            - Trends, patterns, comparisons
-            - Statistical analysis, breakdowns
-            - Keywords like: "show chart", "graph", "heatmap", "visualize", "plot", "distribution", "breakdown", "analysis"
-
-            TASK: Analyze the user query and determine the exact type of analysis needed.
-
-            QUERY TYPES TO CONSIDER:
-            1. "top_performers" - Finding highest skilled employees
-            2. "skill_search" - Looking for specific skills or technologies
-            3. "domain_filter" - Filtering by domain/department
-            4. "upskilling_needs" - Finding employees who need training (low skill + high interest)
-            5. "skill_distribution" - Understanding skill spread across teams
-            6. "general_info" - General questions about the workforce
-            7. "employee_details" - Specific employee information
-            8. "comparison" - Comparing skills, domains, or performance
-            9. "recommendations" - Suggesting career paths or improvements
-            10. "statistics" - Data analysis and trends
-            11. "visualization_request" - User explicitly wants charts/graphs/heatmaps
-
-            RESPONSE FORMAT:
+            with stage_timer.span("narrative_llm_stream"):
+                for chunk in model.generate_content(response_prompt, stream=True):
+                    text = chunk.text
+                    if text:
+                        chunks.append(text)
+                        yield format_sse("token", {"text": text})
+        except Exception as e:
+            log.error("gemini_stream_error", error=str(e))
+            if not chunks:
+                # Nothing streamed yet - answer with the template narrative instead
+                text = describe_rule_based_results(analysis_result, processed_data)
+                chunks.append(text)
+                yield format_sse("token", {"text": text})
+        
+        yield format_sse("done", {"response": "".join(chunks).strip()})
+    
+    return sse_response(events())
+
+def respond_with_results(model, user_message, user_role, analysis_result, employee_data, stream=False):
+    """Run an analysed query over employee_data and answer with data, charts and the LLM narrative"""
+    # Process the query based on analysis
+    processed_data = process_employee_query(employee_data, analysis_result)
+    
+    # One aggregation pass shared by the charts and the data summary
+    aggregates = aggregate_employees(processed_data) if processed_data else None
+    
+    # Generate visualizations if requested
+    visualizations = None
+    if analysis_result.get('needs_visualization', False):
+        visualizations = generate_visualizations(processed_data, analysis_result, employee_data, aggregates)
+    
+    # Enhanced natural language response generation
+    response_prompt = build_response_prompt(user_message, user_role, analysis_result, processed_data, visualizations, aggregates)
+    
+    if stream:
+        return stream_assistant_response(model, response_prompt, analysis_result, processed_data, visualizations)
+    
+    try:
+        ai_response = generate_narrative(model, response_prompt)
+    except OverloadedError:
+        ai_response = describe_rule_based_results(analysis_result, processed_data)
+    except Exception as e:
+        # The analysis already succeeded - answer from it rather than starting over without it
+        log.error("narrative_failed", error=str(e))
+        ai_response = describe_rule_based_results(analysis_result, processed_data)
+    
+    return jsonify({
+        "response": ai_response,
+        "data": employee_result(processed_data),
+        "visualizations": visualizations
+    })
+
+def generate_narrative(model, response_prompt):
+    """The LLM's natural language answer for a response prompt"""
+    with stage_timer.span("narrative_llm"):
+        return model.generate_content(response_prompt).text.strip()
+
+def run_planned_query(user_message, user_role, stream=False):
+    """ai_assistant while the snapshot cache is cold, or None to fall back to the snapshot path.
+
+    The full table starts loading in the background; this request analyses
+    the question first and then fetches only the matching rows, with the
+    filters, ordering and limit pushed down to Supabase.
+    """
+    employee_cache.warm()
+    try:
+        analysis_result = analyze_user_query(gemini_client, user_message, user_role, "all")
+        if not analysis_result:
+            return None
+        log.debug("query_analysis", analysis=analysis_result, planned=True)
+        employee_data = fetch_planned_rows(analysis_result)
+        if not employee_data and FUZZY_SKILL_SEARCH:
+            # Typo-tolerant matching needs the vocabularies of the full snapshot
+            return None
+        return respond_with_results(gemini_client, user_message, user_role, analysis_result, employee_data, stream)
+    except Exception as e:
+        log.warning("planned_query_failed", error=str(e))
+        return None
+
+def no_employee_data_response(stream=False):
+    response_data = {
+        "response": "Sorry, I couldn't fetch employee data at the moment. Please check your database connection and try again.",
+        "data": None,
+        "visualizations": None
+    }
+    return stream_complete_response(response_data) if stream else jsonify(response_data)
+
+def run_parallel_pipeline(user_message, user_role, stream=False):
+    """ai_assistant with independent stages overlapped and a per-stage latency breakdown.
+
+    The Supabase fetch runs alongside the analysis LLM call. Every stage
+    has a deadline (STAGE_TIMEOUTS) after which the request degrades the
+    same way the sequential handler does on errors: no data, rule-based
+    analysis, no charts, or the template narrative. The narrative prompt
+    is built once the charts are settled, so it never mentions charts the
+    response doesn't carry.
+    """
+    timings = PipelineTimings()
+    model = gemini_client if llm_available() else None
+    
+    # With a warm snapshot the local classifier can run before deciding whether the LLM is needed at all
+    snapshot = employee_cache.peek()
+    fast_analysis = None
+    if INTENT_FAST_PATH and snapshot:
+        fast_analysis = timings.time("classify", intent_classifier.fast_path, user_message, snapshot.store)
+    
+    data_future = io_stage_pool.submit(timings, "fetch", fetch_employee_data)
+    analysis_future = None
+    if model and not fast_analysis:
+        employee_count = len(snapshot.rows) if snapshot else "all"
+        analysis_future = stage_pool.submit(timings, "analysis", analyze_user_query, model, user_message, user_role, employee_count)
+    
+    try:
+        employee_data = io_stage_pool.result(timings, "fetch", data_future, STAGE_TIMEOUTS["fetch"])
+    except StageTimeout as e:
+        log.warning("stage_timeout", error=str(e))
+        employee_data = None
+    if not employee_data:
+        return no_employee_data_response(stream)
+    
+    if INTENT_FAST_PATH and not snapshot:
+        fast_analysis = timings.time("classify", intent_classifier.fast_path, user_message, get_employee_store(employee_data))
+    intent_classifier.record(fast_analysis, fast_path=fast_analysis is not None)
+    
+    analysis_result = fast_analysis
+    if not analysis_result and analysis_future:
+        try:
+            analysis_result = stage_pool.result(timings, "analysis", analysis_future, STAGE_TIMEOUTS["analysis"])
+        except StageTimeout as e:
+            log.warning("stage_timeout", error=str(e))
+        except Exception as e:
+            log.error("gemini_error", error=str(e))
+    
+    if not model or not analysis_result:
+        response_data = timings.time("rule_based", handle_query_rule_based, user_message, employee_data, user_role, fast_analysis)
+        response_data["timings"] = timings.as_dict()
+        return stream_complete_response(response_data) if stream else jsonify(response_data)
+    
+    processed_data = timings.time("query", process_employee_query, employee_data, analysis_result)
+    aggregates = timings.time("aggregate", aggregate_employees, processed_data) if processed_data else None
+    needs_visualization = analysis_result.get('needs_visualization', False)
+    
+    # The prompt tells the model whether charts are shown, so they are settled before it is built
+    visualizations = None
+    if needs_visualization:
+        visualizations_future = io_stage_pool.submit(timings, "visualizations", generate_visualizations, processed_data, analysis_result, employee_data, aggregates)
+        try:
+            visualizations = io_stage_pool.result(timings, "visualizations", visualizations_future, STAGE_TIMEOUTS["visualizations"])
+        except StageTimeout as e:
+            log.warning("stage_timeout", error=str(e))
+    response_prompt = build_response_prompt(user_message, user_role, analysis_result, processed_data, visualizations, aggregates)
+    
+    if stream:
+        return stream_assistant_response(model, response_prompt, analysis_result, processed_data, visualizations)
+    
+    narrative_future = stage_pool.submit(timings, "narrative", generate_narrative, model, response_prompt)
+    try:
+        ai_response = stage_pool.result(timings, "narrative", narrative_future, STAGE_TIMEOUTS["narrative"])
+    except Exception as e:
+        log.error("narrative_failed", error=str(e))
+        ai_response = describe_rule_based_results(analysis_result, processed_data)
+    
+    return jsonify({
+        "response": ai_response,
+        "data": employee_result(processed_data),
+        "visualizations": visualizations,
+        "timings": timings.as_dict()
+    })
+
+# Compact dataset descriptions for the merged pipeline, one per employee store
+_dataset_contexts = weakref.WeakKeyDictionary()
+
+def build_dataset_context(employee_data):
+    """Short text description of the dataset (vocabulary and aggregate stats) for single-call prompts"""
+    store = get_employee_store(employee_data)
+    version, context = _dataset_contexts.get(store, (None, None))
+    if context is None or version != store.version:
+        aggregates = get_population_aggregates(employee_data) or aggregate_employees(employee_data)
+        top_skills = ", ".join(f"{skill} ({count})" for skill, count in aggregates.top_skills(25))
+        context = "\n".join([
+            f"- Rows (employee skills): {aggregates.count}",
+            f"- Domains: {', '.join(store.vocab['Domain'])}",
+            f"- Categories: {', '.join(store.vocab['Category'][:60])}",
+            f"- Most common skills (Sub Category): {top_skills}",
+            f"- Average skill rating: {aggregates.average_skill():.1f}/5",
+            f"- Skill level counts (1-5): {aggregates.skill_levels}"
+        ])
+        _dataset_contexts[store] = (store.version, context)
+    return context
+
+def _merged_reply(value):
+    if not isinstance(value, dict):
+        return None
+    analysis_result = coerce_analysis(value.get('analysis'))
+    if analysis_result is None:
+        return None
+    template = value.get('response_template')
+    return analysis_result, template if isinstance(template, str) else None
+
+def parse_merged_response(content):
+    """(analysis_result, response_template) from a merged-mode LLM reply, or (None, None)"""
+    return clean_and_parse_json(content, _merged_reply, shape="merged") or (None, None)
+
+_TEMPLATE_FIELD = re.compile(r"\{(\w+)\}")
+
+def fill_response_template(template, analysis_result, processed_data, aggregates):
+    """Replace the {placeholders} of a merged-mode template with values from the results (unknown ones are dropped)"""
+    if not processed_data:
+        return describe_rule_based_results(analysis_result, processed_data)
+    top_domain = aggregates.top_domain()
+    values = {
+        "count": len(processed_data),
+        "top_domain": top_domain,
+        "top_domain_count": aggregates.domain_counts[top_domain],
+        "avg_skill": f"{aggregates.average_skill():.1f}",
+        "top_names": ", ".join(dict.fromkeys(emp.get('Name', 'Unknown') for emp in processed_data[:3])),
+        "top_skill": aggregates.top_skills(1)[0][0]
+    }
+    return _TEMPLATE_FIELD.sub(lambda match: str(values.get(match.group(1), "")), template).strip()
+
+def run_merged_pipeline(user_message, user_role, stream=False):
+    """ai_assistant with at most one LLM call.
+
+    The model gets a precomputed summary of the dataset with the question and
+    returns the analysis_result together with a narrative template; the
+    template's placeholders are filled in once process_employee_query has
+    run. Questions the local classifier is sure about need no LLM call.
+    """
+    employee_data = fetch_employee_data()
+    fast_analysis = None
+    if INTENT_FAST_PATH:
+        fast_analysis = intent_classifier.fast_path(user_message, get_employee_store(employee_data))
+    intent_classifier.record(fast_analysis, fast_path=fast_analysis is not None)
+    
+    analysis_result, template = fast_analysis, None
+    if not analysis_result and llm_available():
+        merged_key = f"merged:{user_role}:{normalize_message(user_message)}"
+        cached = analysis_cache.get(merged_key)
+        if cached:
+            analysis_result, template = cached["analysis"], cached["template"]
+        else:
+            dataset_context = build_dataset_context(employee_data)
+            prompt = f"""
+            You are an expert AI Career Assistant for an employee skills database. In ONE reply, work out what the user wants and write the answer.
+
+            DATASET:
+            {dataset_context}
+
+            USER:
+            - Query: "{user_message}"
+            - Role: {user_role}
+
             Return ONLY a valid JSON object with this exact structure:
             {{
-                "query_type": "one_of_the_types_above",
-                "needs_visualization": true_or_false,
-                "visualization_type": "chart_type_if_needed", // Options: "bar_chart", "pie_chart", "line_chart", "heatmap", "scatter_plot", "radar_chart"
-                "filters": {{
-                    "domain": "exact_domain_name_if_mentioned",
-                    "category": "category_if_specified",
-                    "skill_name": "skill_or_technology_mentioned",
-                    "min_skill_rate": minimum_skill_level_if_specified,
-                    "max_skill_rate": maximum_skill_level_if_specified,
-                    "min_interest_rate": minimum_interest_if_specified,
-                    "access_level": "admin_or_user_if_specified"
+                "analysis": {{
+                    "query_type": "top_performers | skill_search | domain_filter | upskilling_needs | skill_distribution | general_info | employee_details | comparison | recommendations | statistics | visualization_request",
+                    "needs_visualization": true_or_false,
+                    "visualization_type": "bar_chart | pie_chart | line_chart | heatmap | scatter_plot | radar_chart",
+                    "filters": {{
+                        "domain": "exact_domain_name_if_mentioned",
+                        "category": "category_if_specified",
+                        "skill_name": "skill_or_technology_mentioned",
+                        "min_skill_rate": minimum_skill_level_if_specified,
+                        "max_skill_rate": maximum_skill_level_if_specified,
+                        "min_interest_rate": minimum_interest_if_specified,
+                        "access_level": "admin_or_user_if_specified"
+                    }},
+                    "limit": number_of_results_to_show,
+                    "sort_by": "field_to_sort_by",
+                    "sort_order": "asc_or_desc",
+                    "context": "brief_summary_of_what_user_wants"
                 }},
-                "limit": number_of_results_to_show,
-                "sort_by": "field_to_sort_by",
-                "sort_order": "asc_or_desc",
-                "context": "brief_summary_of_what_user_wants"
+                "response_template": "2-4 friendly, professional sentences answering the user. Use these placeholders for facts you cannot know yet: {{count}} (employees found), {{top_names}} (first names in the result), {{top_domain}} and {{top_domain_count}}, {{avg_skill}} (average skill rating), {{top_skill}}."
             }}
             """
-            
-            analysis_response = model.generate_content(analysis_prompt)
-            analysis_content = analysis_response.text.strip()
-            
-            # Clean up JSON response with better parsing
-            analysis_result = clean_and_parse_json(analysis_content)
-            
-            if not analysis_result:
-                print("Failed to parse analysis JSON, using rule-based approach")
-                response_data = handle_query_rule_based(user_message, employee_data, user_role)
-                return jsonify(response_data)
-            
-            print(f"Query analysis: {analysis_result}")
-            
-            # Process the query based on analysis
-            processed_data = process_employee_query(employee_data, analysis_result)
-            
-            # Generate visualizations if requested
-            visualizations = None
-            if analysis_result.get('needs_visualization', False):
-                visualizations = generate_visualizations(processed_data, analysis_result, employee_data)
-            
-            # Enhanced natural language response generation
-            response_prompt = f"""
-            You are a professional AI Career Assistant providing insights about employee data. Generate a helpful, conversational, and informative response.
-
-            CONTEXT:
-            - User asked: "{user_message}"
-            - Query analysis: {analysis_result}
-            - Results found: {len(processed_data)} employees
-            - User role: {user_role}
-            - Visualization generated: {bool(visualizations)}
-
-            DATA SUMMARY:
-            {generate_data_summary(processed_data, analysis_result)}
-
-            INSTRUCTIONS:
-            1. Start with a direct acknowledgment of what the user asked
-            2. Provide key insights from the data
-            3. Be conversational but professional
-            4. Include relevant statistics or patterns
-            5. If visualizations were generated, mention them
-            6. Suggest follow-up questions if appropriate
-            7. Keep response concise (2-4 sentences)
-            8. Don't repeat the raw data - just insights and summary
-
-            TONE: Helpful, professional, insightful
-
-            Generate your response:
-            """
-            
-            response_generation = model.generate_content(response_prompt)
-            ai_response = response_generation.text.strip()
-            
-            return jsonify({
-                "response": ai_response,
-                "data": {"employees": processed_data} if processed_data else None,
-                "visualizations": visualizations
-            })
-            
-        except Exception as gemini_error:
-            print(f"Gemini API error: {str(gemini_error)}")
-            # Fall back to rule-based responses
-            response_data = handle_query_rule_based(user_message, employee_data, user_role)
-            return jsonify(response_data)
-            
-    except Exception as e:
-        print(f"Error in AI assistant: {str(e)}")
-        print(traceback.format_exc())
-        return jsonify({
-            "response": "Sorry, I encountered an error while processing your request. Please try again.",
-            "data": None,
-            "visualizations": None
-        }), 500
+            try:
+                with stage_timer.span("merged_llm"):
+                    content = gemini_client.generate_content(prompt).text
+                analysis_result, template = parse_merged_response(content)
+                if analysis_result:
+                    analysis_cache.set(merged_key, {"analysis": analysis_result, "template": template})
+            except Exception as e:
+                log.error("gemini_error", error=str(e))
+    
+    if not analysis_result:
+        log.info("assistant_rule_based", reason="no_merged_analysis")
+        response_data = handle_query_rule_based(user_message, employee_data, user_role)
+        return stream_complete_response(response_data) if stream else jsonify(response_data)
+    
+    processed_data = process_employee_query(employee_data, analysis_result)
+    aggregates = aggregate_employees(processed_data) if processed_data else None
+    visualizations = None
+    if analysis_result.get('needs_visualization', False):
+        visualizations = generate_visualizations(processed_data, analysis_result, employee_data, aggregates)
+    
+    if template:
+        ai_response = fill_response_template(template, analysis_result, processed_data, aggregates)
+    else:
+        ai_response = describe_rule_based_results(analysis_result, processed_data)
+    
+    response_data = {
+        "response": ai_response,
+        "data": employee_result(processed_data),
+        "visualizations": visualizations
+    }
+    return stream_complete_response(response_data) if stream else jsonify(response_data)
+
+def _page_size(value):
+    try:
+        page_size = int(value)
+    except (TypeError, ValueError):
+        return RESULT_PAGE_SIZE
+    return max(1, min(page_size, MAX_RESULT_PAGE_SIZE))
+
+def _result_fields(value):
+    """Requested column projection (list or comma-separated string), or None for every column"""
+    if isinstance(value, str):
+        value = value.split(',')
+    if not isinstance(value, list):
+        return None
+    fields = [field.strip() for field in value if isinstance(field, str) and field.strip()]
+    return fields or None
+
+def result_page(query_id, rows, cursor=0, page_size=None, fields=None):
+    """One page of a cached result set, projected to `fields` and capped at MAX_RESULT_PAGE_BYTES"""
+    page_size = _page_size(page_size)
+    fields = _result_fields(fields)
+    employees = []
+    page_bytes = 2
+    position = cursor
+    while position < len(rows) and len(employees) < page_size:
+        row = rows[position]
+        if fields:
+            row = {field: row[field] for field in fields if field in row}
+        row_bytes = len(json.dumps(row)) + 1
+        if employees and page_bytes + row_bytes > MAX_RESULT_PAGE_BYTES:
+            break
+        employees.append(row)
+        page_bytes += row_bytes
+        position += 1
+    return {
+        "employees": employees,
+        "query_id": query_id,
+        "total": len(rows),
+        "cursor": cursor,
+        "next_cursor": position if position < len(rows) else None
+    }
+
+def employee_result(processed_data):
+    """The "data" block of an assistant reply: the first page of the ranked employees.
+
+    The whole ranked list is kept in result_cache under a new query ID, and
+    GET /api/ai-assistant/results/<query_id>?cursor=... serves the rest.
+    "page_size" and "fields" in the request body shape the first page.
+    """
+    if not processed_data:
+        return None
+    options = request.get_json(silent=True) if has_request_context() else None
+    if not isinstance(options, dict):
+        options = {}
+    query_id = uuid.uuid4().hex
+    result_cache.set(query_id, processed_data)
+    return result_page(query_id, processed_data, 0, options.get('page_size'), options.get('fields'))
+
+@app.route('/api/ai-assistant/results/<query_id>', methods=['GET'])
+def ai_assistant_results(query_id):
+    """Further pages of an earlier assistant answer, straight from the result cache"""
+    rows = result_cache.get(query_id)
+    if rows is None:
+        return jsonify({"error": "Unknown or expired query_id, please ask the question again"}), 404
+    try:
+        cursor = int(request.args.get('cursor', 0))
+    except ValueError:
+        return jsonify({"error": "cursor must be an integer"}), 400
+    if cursor < 0 or cursor > len(rows):
+        return jsonify({"error": "cursor out of range"}), 400
+    return jsonify({"data": result_page(query_id, rows, cursor, request.args.get('page_size'), request.args.get('fields'))})
+
+def analyze_user_query(model, user_message, user_role, employee_count):
+    """Turn the user message into an analysis_result dict with the LLM (None if unparseable).
+
+    Repeated questions reuse the cached analysis instead of calling the LLM again.
+    """
+    analysis_key = f"{user_role}:{normalize_message(user_message)}"
+    analysis_result = analysis_cache.get(analysis_key)
+    if analysis_result is not None:
+        return analysis_result
+    
+    # Enhanced analysis prompt with visualization detection
+    analysis_prompt = f"""
+    You are an expert AI Career Assistant analyzing employee data queries. Your role is to understand user intent and determine if visualizations are needed.
+
+    CONTEXT:
+    - User Query: "{user_message}"
+    - User Role: {user_role}
+    - Available Employee Data: {employee_count} employees
+    - Data Fields: Name, Domain, Category, Sub Category (skill name), Skill Rate (1-5), Interest Rate (1-5), Access (admin/user), Email
+
+    VISUALIZATION DETECTION:
+    Check if the user is asking for:
+    - Charts, graphs, plots, visualizations
+    - Heatmaps, distribution analysis
+    - Trends, patterns, comparisons
+    - Statistical analysis, breakdowns
+    - Keywords like: "show chart", "graph", "heatmap", "visualize", "plot", "distribution", "breakdown", "analysis"
+
+    TASK: Analyze the user query and determine the exact type of analysis needed.
+
+    QUERY TYPES TO CONSIDER:
+    1. "top_performers" - Finding highest skilled employees
+    2. "skill_search" - Looking for specific skills or technologies
+    3. "domain_filter" - Filtering by domain/department
+    4. "upskilling_needs" - Finding employees who need training (low skill + high interest)
+    5. "skill_distribution" - Understanding skill spread across teams
+    6. "general_info" - General questions about the workforce
+    7. "employee_details" - Specific employee information
+    8. "comparison" - Comparing skills, domains, or performance
+    9. "recommendations" - Suggesting career paths or improvements
+    10. "statistics" - Data analysis and trends
+    11. "visualization_request" - User explicitly wants charts/graphs/heatmaps
+
+    RESPONSE FORMAT:
+    Return ONLY a valid JSON object with this exact structure:
+    {{
+        "query_type": "one_of_the_types_above",
+        "needs_visualization": true_or_false,
+        "visualization_type": "chart_type_if_needed", // Options: "bar_chart", "pie_chart", "line_chart", "heatmap", "scatter_plot", "radar_chart"
+        "filters": {{
+            "domain": "exact_domain_name_if_mentioned",
+            "category": "category_if_specified",
+            "skill_name": "skill_or_technology_mentioned",
+            "min_skill_rate": minimum_skill_level_if_specified,
+            "max_skill_rate": maximum_skill_level_if_specified,
+            "min_interest_rate": minimum_interest_if_specified,
+            "access_level": "admin_or_user_if_specified"
+        }},
+        "limit": number_of_results_to_show,
+        "sort_by": "field_to_sort_by",
+        "sort_order": "asc_or_desc",
+        "context": "brief_summary_of_what_user_wants"
+    }}
+    """
+    
+    with stage_timer.span("analysis_llm"):
+        analysis_content = model.generate_content(analysis_prompt).text.strip()
+    
+    analysis_result = clean_and_parse_json(analysis_content, coerce_analysis, shape="analysis")
+    if analysis_result:
+        analysis_cache.set(analysis_key, analysis_result)
+    return analysis_result
+
+@stage_timer.timed("visualizations")
+def generate_visualizations(processed_data, analysis_result, all_employee_data, aggregates=None):
+    """Generate visualization data based on the query and processed data.
 
-def generate_visualizations(processed_data, analysis_result, all_employee_data):
-    """Generate visualization data based on the query and processed data"""
+    `aggregates` may carry a precomputed aggregate_employees() result for the
+    rows being charted so the caller can share one pass with generate_data_summary.
+    """
     try:
         visualization_type = analysis_result.get('visualization_type', 'bar_chart')
         visualizations = []
@@ -239,15 +1029,14 @@ def generate_visualizations(processed_data, analysis_result, all_employee_data):
         
         data_to_use = processed_data if processed_data else all_employee_data
         
+        # One pass computes every count the charts below need (or a cube roll-up for the whole population)
+        if aggregates is None:
+            aggregates = get_population_aggregates(data_to_use) or aggregate_employees(data_to_use)
+        
         # Skill Distribution Bar Chart
         if visualization_type in ['bar_chart', 'chart']:
-            skill_counts = {}
-            for emp in data_to_use:
-                skill = emp.get('Sub Category', 'Unknown')
-                skill_counts[skill] = skill_counts.get(skill, 0) + 1
-            
             # Sort by count and take top 10
-            top_skills = sorted(skill_counts.items(), key=lambda x: x[1], reverse=True)[:10]
+            top_skills = aggregates.top_skills(10)
             
             visualizations.append({
                 "type": "bar_chart",
@@ -266,10 +1055,7 @@ def generate_visualizations(processed_data, analysis_result, all_employee_data):
         
         # Domain Distribution Pie Chart
         if visualization_type in ['pie_chart', 'chart'] or len(visualizations) < 2:
-            domain_counts = {}
-            for emp in data_to_use:
-                domain = emp.get('Domain', 'Unknown')
-                domain_counts[domain] = domain_counts.get(domain, 0) + 1
+            domain_counts = aggregates.domain_counts
             
             visualizations.append({
                 "type": "pie_chart",
@@ -288,21 +1074,8 @@ def generate_visualizations(processed_data, analysis_result, all_employee_data):
         
         # Skill vs Interest Heatmap
         if visualization_type == 'heatmap' or 'heatmap' in analysis_result.get('context', '').lower():
-            # Create skill-interest matrix
-            skill_interest_matrix = {}
-            for emp in data_to_use:
-                skill_rate = emp.get('Skill Rate', 0)
-                interest_rate = emp.get('Interest Rate', 0)
-                key = f"{skill_rate},{interest_rate}"
-                skill_interest_matrix[key] = skill_interest_matrix.get(key, 0) + 1
-            
-            heatmap_data = []
-            for skill in range(1, 6):
-                row = []
-                for interest in range(1, 6):
-                    count = skill_interest_matrix.get(f"{skill},{interest}", 0)
-                    row.append(count)
-                heatmap_data.append(row)
+            # Skill-interest matrix, rows are skill levels 1-5 and columns interest levels 1-5
+            heatmap_data = [list(row) for row in aggregates.skill_interest]
             
             visualizations.append({
                 "type": "heatmap",
@@ -318,10 +1091,7 @@ def generate_visualizations(processed_data, analysis_result, all_employee_data):
         
         # Skill Level Distribution
         if len(visualizations) < 3:
-            skill_levels = {}
-            for emp in data_to_use:
-                level = emp.get('Skill Rate', 0)
-                skill_levels[f"Level {level}"] = skill_levels.get(f"Level {level}", 0) + 1
+            skill_levels = aggregates.skill_levels
             
             visualizations.append({
                 "type": "radar_chart",
@@ -330,13 +1100,7 @@ def generate_visualizations(processed_data, analysis_result, all_employee_data):
                     "labels": ["Level 1", "Level 2", "Level 3", "Level 4", "Level 5"],
                     "datasets": [{
                         "label": "Number of Employees",
-                        "data": [
-                            skill_levels.get("Level 1", 0),
-                            skill_levels.get("Level 2", 0),
-                            skill_levels.get("Level 3", 0),
-                            skill_levels.get("Level 4", 0),
-                            skill_levels.get("Level 5", 0)
-                        ],
+                        "data": list(skill_levels),
                         "backgroundColor": "rgba(34, 197, 94, 0.2)",
                         "borderColor": "rgba(34, 197, 94, 1)",
                         "pointBackgroundColor": "rgba(34, 197, 94, 1)",
@@ -348,167 +1112,372 @@ def generate_visualizations(processed_data, analysis_result, all_employee_data):
         return visualizations if visualizations else None
         
     except Exception as e:
-        print(f"Error generating visualizations: {str(e)}")
+        log.error("visualizations_error", error=str(e))
         return None
 
-def clean_and_parse_json(content):
-    """Enhanced JSON parsing with multiple fallback strategies"""
-    try:
-        # Strategy 1: Direct JSON parsing
-        return json.loads(content)
-    except:
-        pass
-    
-    try:
-        # Strategy 2: Extract JSON from markdown code blocks
-        if "```json" in content:
-            content = content.split("```json")[1].split("```")[0].strip()
-        elif "```" in content:
-            content = content.split("```")[1].split("```")[0].strip()
-        return json.loads(content)
-    except:
-        pass
-    
-    try:
-        # Strategy 3: Find JSON pattern with regex
-        json_pattern = r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}'
-        json_match = re.search(json_pattern, content, re.DOTALL)
-        if json_match:
-            return json.loads(json_match.group(0))
-    except:
-        pass
-    
-    # Strategy 4: Return None if all parsing fails
-    return None
+@stage_timer.timed("parse_json")
+def clean_and_parse_json(content, convert=None, shape="json"):
+    """First JSON object or array in an LLM reply (bare, fenced or wrapped in prose), or None.
 
-def generate_data_summary(data, analysis_result):
+    `convert` validates/coerces the value into the shape the caller needs
+    (see llm_json); values it rejects are skipped in favour of a later one.
+    """
+    parsed = extract_json(content, convert)
+    llm_replies.inc(shape=shape, outcome="parsed" if parsed is not None else "fallback")
+    return parsed
+
+def generate_data_summary(data, analysis_result, aggregates=None):
     """Generate a summary of the processed data for better context"""
     if not data:
         return "No employees found matching the criteria."
     
+    if aggregates is None:
+        aggregates = aggregate_employees(data)
+    
     summary_parts = []
     
     # Basic count
     summary_parts.append(f"Found {len(data)} employees")
     
     # Domain distribution if relevant
-    domains = {}
-    skill_rates = []
-    interest_rates = []
-    
-    for emp in data:
-        domain = emp.get('Domain', 'Unknown')
-        domains[domain] = domains.get(domain, 0) + 1
-        skill_rates.append(emp.get('Skill Rate', 0))
-        interest_rates.append(emp.get('Interest Rate', 0))
-    
+    domains = aggregates.domain_counts
     if len(domains) > 1:
-        top_domain = max(domains, key=domains.get)
+        top_domain = aggregates.top_domain()
         summary_parts.append(f"Most from {top_domain} ({domains[top_domain]} employees)")
     
     # Skill statistics
-    if skill_rates:
-        avg_skill = sum(skill_rates) / len(skill_rates)
-        summary_parts.append(f"Average skill rating: {avg_skill:.1f}/5")
+    summary_parts.append(f"Average skill rating: {aggregates.average_skill():.1f}/5")
     
     return ". ".join(summary_parts)
 
+# Typo-tolerant skill_name matching when an exact substring finds nothing (off by default)
+FUZZY_SKILL_SEARCH = os.getenv('FUZZY_SKILL_SEARCH', '0') == '1'
+
+# Stores built for lists other than the snapshot's (sample data, ad-hoc lists), by list identity;
+# the list is kept alongside so its id can't be reused while the entry exists
+_adhoc_stores = OrderedDict()
+_adhoc_stores_lock = threading.Lock()
+ADHOC_STORE_CACHE_SIZE = 8
+
+def get_employee_store(employee_data):
+    """Return the columnar store for employee_data, reusing the snapshot's prebuilt one"""
+    snapshot = employee_cache.peek()
+    if snapshot and snapshot.owns(employee_data):
+        return snapshot.store
+    with _adhoc_stores_lock:
+        entry = _adhoc_stores.get(id(employee_data))
+        # A list that changed length since its store was built gets a fresh one
+        if entry and entry[0] is employee_data and len(entry[1]) == len(employee_data):
+            _adhoc_stores.move_to_end(id(employee_data))
+            return entry[1]
+    store = EmployeeStore(employee_data)
+    with _adhoc_stores_lock:
+        _adhoc_stores[id(employee_data)] = (employee_data, store)
+        while len(_adhoc_stores) > ADHOC_STORE_CACHE_SIZE:
+            _adhoc_stores.popitem(last=False)
+    return store
+
+def get_population_aggregates(employee_data):
+    """Chart aggregates for the full snapshot rolled up from its cube, or None for any other list"""
+    snapshot = employee_cache.peek()
+    if snapshot and snapshot.owns(employee_data):
+        return snapshot.cube.rollup()
+    return None
+
+def _filter_number(value):
+    """Numeric filter value from the LLM analysis, or None if missing/zero/unusable"""
+    if isinstance(value, str):
+        try:
+            value = float(value)
+        except ValueError:
+            return None
+    if isinstance(value, (int, float)) and value:
+        return value
+    return None
+
+def _filter_text(value):
+    return value if isinstance(value, str) and value else None
+
+def _rank_all(store, row_ids, query_type, sort_by, sort_order):
+    """Fully sort row_ids the way process_employee_query ranks each query type"""
+    if query_type == 'top_performers':
+        return sorted(row_ids, key=store.rank_key('top_performers'), reverse=True)
+    if query_type == 'upskilling_needs':
+        return sorted(row_ids, key=store.rank_key('upskilling_needs'), reverse=True)
+    if query_type == 'skill_search':
+        return sorted(row_ids, key=store.rank_key('Skill Rate'), reverse=True)
+    if sort_by in ['Skill Rate', 'Interest Rate']:
+        return sorted(row_ids, key=store.rank_key(sort_by, sort_order == 'desc'), reverse=(sort_order == 'desc'))
+    return sorted(row_ids, key=store.text_rank_key(sort_by, sort_order == 'desc'), reverse=(sort_order == 'desc'))
+
+def query_filters(analysis_result):
+    """The analysis filters normalized to EmployeeStore.filter keywords"""
+    filters = analysis_result.get('filters') or {}
+    min_skill = _filter_number(filters.get('min_skill_rate'))
+    max_skill = _filter_number(filters.get('max_skill_rate'))
+    min_interest = _filter_number(filters.get('min_interest_rate'))
+    if analysis_result.get('query_type', 'general_info') == 'upskilling_needs':
+        # High interest but lower skill
+        max_skill = 3 if max_skill is None else min(max_skill, 3)
+        min_interest = 3 if min_interest is None else max(min_interest, 3)
+    return {
+        "domain": _filter_text(filters.get('domain')),
+        "category": _filter_text(filters.get('category')),
+        "skill_name": _filter_text(filters.get('skill_name')),
+        "access": _filter_text(filters.get('access_level')),
+        "min_skill": min_skill,
+        "max_skill": max_skill,
+        "min_interest": min_interest
+    }
+
+@stage_timer.timed("query")
 def process_employee_query(employee_data, analysis_result):
     """Enhanced employee data processing with better filtering and sorting"""
     try:
         query_type = analysis_result.get('query_type', 'general_info')
-        filters = analysis_result.get('filters', {})
         limit = analysis_result.get('limit', 10)
         sort_by = analysis_result.get('sort_by', 'Skill Rate')
         sort_order = analysis_result.get('sort_order', 'desc')
         
-        # Start with all data
-        filtered_data = employee_data.copy()
-        
-        # Apply filters with fuzzy matching
-        if filters.get('domain'):
-            domain_filter = filters['domain'].lower()
-            filtered_data = [emp for emp in filtered_data 
-                           if domain_filter in emp.get('Domain', '').lower()]
-        
-        if filters.get('category'):
-            category_filter = filters['category'].lower()
-            filtered_data = [emp for emp in filtered_data 
-                           if category_filter in emp.get('Category', '').lower()]
-        
-        if filters.get('skill_name'):
-            skill_filter = filters['skill_name'].lower()
-            filtered_data = [emp for emp in filtered_data 
-                           if (skill_filter in emp.get('Sub Category', '').lower() or
-                               skill_filter in emp.get('Category', '').lower() or
-                               skill_filter in emp.get('Domain', '').lower())]
-        
-        if filters.get('min_skill_rate'):
-            min_skill = filters['min_skill_rate']
-            filtered_data = [emp for emp in filtered_data 
-                           if emp.get('Skill Rate', 0) >= min_skill]
-        
-        if filters.get('max_skill_rate'):
-            max_skill = filters['max_skill_rate']
-            filtered_data = [emp for emp in filtered_data 
-                           if emp.get('Skill Rate', 0) <= max_skill]
-        
-        if filters.get('min_interest_rate'):
-            min_interest = filters['min_interest_rate']
-            filtered_data = [emp for emp in filtered_data 
-                           if emp.get('Interest Rate', 0) >= min_interest]
-        
-        if filters.get('access_level'):
-            access_filter = filters['access_level'].lower()
-            filtered_data = [emp for emp in filtered_data 
-                           if emp.get('Access', '').lower() == access_filter]
-        
-        # Apply query-specific logic
-        if query_type == 'top_performers':
-            filtered_data.sort(key=lambda x: (x.get('Skill Rate', 0), x.get('Interest Rate', 0)), reverse=True)
-        elif query_type == 'upskilling_needs':
-            # High interest but lower skill
-            filtered_data = [emp for emp in filtered_data 
-                           if emp.get('Skill Rate', 0) <= 3 and emp.get('Interest Rate', 0) >= 3]
-            filtered_data.sort(key=lambda x: (x.get('Interest Rate', 0), -x.get('Skill Rate', 0)), reverse=True)
-        elif query_type == 'skill_search':
-            filtered_data.sort(key=lambda x: x.get('Skill Rate', 0), reverse=True)
-        else:
-            # Default sorting based on analysis
-            if sort_by in ['Skill Rate', 'Interest Rate']:
-                filtered_data.sort(key=lambda x: x.get(sort_by, 0), reverse=(sort_order == 'desc'))
+        # Apply all filters in one pass over the prebuilt indexes (fuzzy matching on the vocabularies)
+        store = get_employee_store(employee_data)
+        # Hold the store lock so an incremental sync can't move rows between filtering and reading them
+        with store.lock:
+            row_ids = store.filter(fuzzy=FUZZY_SKILL_SEARCH, **query_filters(analysis_result))
+        
+            if not isinstance(limit, int) or isinstance(limit, bool) or limit < 0:
+                # Unusual limits (None, negative) keep the original sort-then-slice semantics
+                row_ids = _rank_all(store, row_ids, query_type, sort_by, sort_order)
+                return store.get_rows(row_ids[:limit][:MAX_RESULT_ROWS])
+            # Vague questions can come back with huge limits - never rank more than MAX_RESULT_ROWS
+            limit = min(limit, MAX_RESULT_ROWS)
+        
+            # Apply query-specific logic, selecting only the top `limit` rows
+            if query_type == 'top_performers':
+                row_ids = store.top_k(row_ids, limit, 'top_performers')
+            elif query_type == 'upskilling_needs':
+                row_ids = store.top_k(row_ids, limit, 'upskilling_needs')
+            elif query_type == 'skill_search':
+                row_ids = store.top_k(row_ids, limit, 'Skill Rate')
             else:
-                filtered_data.sort(key=lambda x: str(x.get(sort_by, '')), reverse=(sort_order == 'desc'))
+                # Default sorting based on analysis
+                if sort_by in ['Skill Rate', 'Interest Rate']:
+                    row_ids = store.top_k(row_ids, limit, sort_by, reverse=(sort_order == 'desc'))
+                else:
+                    row_ids = top_k(row_ids, limit, key=store.text_rank_key(sort_by, sort_order == 'desc'), reverse=(sort_order == 'desc'))
         
-        # Apply limit
-        return filtered_data[:limit]
+            return store.get_rows(row_ids)
         
     except Exception as e:
-        print(f"Error processing query: {str(e)}")
+        log.error("query_error", error=str(e))
         return employee_data[:10]  # Return first 10 as fallback
 
+@stage_timer.timed("supabase_fetch")
+def load_employee_data():
+    """Load all employee data straight from Supabase, bypassing the snapshot cache"""
+    if not supabase_configured:
+        log.warning("supabase_not_configured")
+        return None
+
+    response = supabase_upstream.call(get_supabase_client().table('dhanush').select('*').execute)
+
+    if response.data:
+        log.info("employee_rows_fetched", rows=len(response.data))
+        if EMPLOYEE_SYNC_MODE == 'updated_at':
+            # Soft-deleted rows only exist to tell incremental syncs about deletions
+            return [emp for emp in response.data if not emp.get(EMPLOYEE_DELETED_AT_COLUMN)] or None
+        return response.data
+
+    log.warning("employee_rows_empty")
+    return None
+
+# "updated_at" refreshes the snapshot with only the rows changed since the last refresh (the table needs an
+# updated_at column, and a deleted_at soft-delete column for deletions to show up); "full" re-downloads it
+EMPLOYEE_SYNC_MODE = os.getenv('EMPLOYEE_SYNC_MODE', 'full')
+EMPLOYEE_UPDATED_AT_COLUMN = os.getenv('EMPLOYEE_UPDATED_AT_COLUMN', 'updated_at')
+EMPLOYEE_DELETED_AT_COLUMN = os.getenv('EMPLOYEE_DELETED_AT_COLUMN', 'deleted_at')
+# Columns identifying one row of the table (one employee skill). They must never change: synced rows carry
+# only their new values, so a key on editable data (say Email + Sub Category) would turn a renamed skill into
+# a second row
+EMPLOYEE_KEY_COLUMNS = tuple(os.getenv('EMPLOYEE_KEY_COLUMNS', ID_COLUMN).split(','))
+if EMPLOYEE_SYNC_MODE == 'updated_at' and set(EMPLOYEE_KEY_COLUMNS) & set(EMPLOYEE_COLUMNS):
+    raise ValueError(
+        f"EMPLOYEE_SYNC_MODE=updated_at needs EMPLOYEE_KEY_COLUMNS to name the table's immutable primary key, "
+        f"not editable columns ({', '.join(EMPLOYEE_KEY_COLUMNS)})"
+    )
+# Changes are re-read from this many seconds before the high-water mark, so rows whose transaction committed
+# after a later updated_at had already been synced are still picked up (the hourly full reload catches the rest)
+EMPLOYEE_SYNC_OVERLAP = float(os.getenv('EMPLOYEE_SYNC_OVERLAP', 60))
+
+def employee_row_key(emp):
+    return tuple(emp.get(column) for column in EMPLOYEE_KEY_COLUMNS)
+
+def _sync_window_start(since):
+    """`since` moved back by EMPLOYEE_SYNC_OVERLAP seconds (unchanged when it isn't an ISO timestamp)"""
+    try:
+        stamp = datetime.fromisoformat(str(since).replace('Z', '+00:00'))
+    except ValueError:
+        return since
+    return (stamp - timedelta(seconds=EMPLOYEE_SYNC_OVERLAP)).isoformat()
+
+@stage_timer.timed("supabase_sync")
+def load_employee_changes(snapshot):
+    """Rows changed since the snapshot's updated_at high-water mark, as change events (None = reload fully)"""
+    if not supabase_configured:
+        return None
+    since = snapshot.sync_state.get('since')
+    if since is None:
+        rows = snapshot.rows
+        if any(None in employee_row_key(emp) for emp in rows):
+            print(f"Employee rows without {', '.join(EMPLOYEE_KEY_COLUMNS)} can't be synced, using full reloads")
+            return None
+        stamps = [emp[EMPLOYEE_UPDATED_AT_COLUMN] for emp in rows if emp.get(EMPLOYEE_UPDATED_AT_COLUMN)]
+        if not stamps:
+            print(f"No {EMPLOYEE_UPDATED_AT_COLUMN} values in the employee table, using full reloads")
+            return None
+        since = max(stamps)
+    # (key, updated_at) of the rows already applied inside the overlap window
+    applied = snapshot.sync_state.get('applied', set())
+
+    query = (get_supabase_client().table('dhanush').select('*')
+             .gte(EMPLOYEE_UPDATED_AT_COLUMN, _sync_window_start(since))
+             .order(EMPLOYEE_UPDATED_AT_COLUMN))
+    changed_rows = supabase_upstream.call(query.execute).data or []
+    # Latest version of every row in the window, in updated_at order, minus those already applied
+    latest = {}
+    for emp in changed_rows:
+        key = employee_row_key(emp)
+        latest.pop(key, None)
+        latest[key] = emp
+        since = max(since, emp[EMPLOYEE_UPDATED_AT_COLUMN])
+    changes = []
+    for key, emp in latest.items():
+        if (key, emp[EMPLOYEE_UPDATED_AT_COLUMN]) not in applied:
+            changes.append({"type": "DELETE" if emp.get(EMPLOYEE_DELETED_AT_COLUMN) else "UPDATE", "record": emp})
+    window_start = _sync_window_start(since)
+    snapshot.sync_state['applied'] = {(key, emp[EMPLOYEE_UPDATED_AT_COLUMN]) for key, emp in latest.items()
+                                      if emp[EMPLOYEE_UPDATED_AT_COLUMN] >= window_start}
+    snapshot.sync_state['since'] = since
+    if changes:
+        log.info("employee_rows_synced", changes=len(changes))
+    return changes
+
+# Last good employee table on disk, so a restart serves it at once (and keeps serving it while Supabase is
+# down) instead of waiting for a full download. The file holds names and emails, so it is opt-in: set
+# EMPLOYEE_SNAPSHOT_PATH (e.g. to an employee_snapshot.bin on a private volume) to enable it
+snapshot_file = SnapshotFile(
+    os.getenv('EMPLOYEE_SNAPSHOT_PATH') or None,
+    min_interval=float(os.getenv('EMPLOYEE_SNAPSHOT_SAVE_INTERVAL', 300))
+)
+
+def persist_employee_snapshot(snapshot):
+    """Write a refreshed snapshot to disk in the background"""
+    if not snapshot_file.path:
+        return
+    with snapshot.store.lock:
+        rows = list(snapshot.rows)
+    snapshot_file.save_async(rows, snapshot.version)
+
+def seed_employee_cache():
+    """Serve the on-disk snapshot until the first refresh from Supabase completes"""
+    if not snapshot_file.path or not os.path.exists(snapshot_file.path):
+        return
+    try:
+        rows, info = snapshot_file.load()
+    except SnapshotFileError as e:
+        print(str(e))
+        return
+    if rows and employee_cache.seed(rows, info["saved_at"]):
+        print(f"Loaded {info['rows']} employee records from {snapshot_file.path} ({info['bytes']} bytes)")
+
+# Identity of the snapshot file this process last loaded (or wrote before forking)
+_followed_snapshot_file = None
+
+def _snapshot_file_stamp():
+    """Cheap identity of the snapshot file's current version (each save renames a new file over it)"""
+    if not snapshot_file.path:
+        return None
+    try:
+        stat = os.stat(snapshot_file.path)
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+def load_followed_snapshot():
+    """A follower worker's refresh: the rows the refreshing worker last saved, or the current ones if unchanged"""
+    global _followed_snapshot_file
+    snapshot = employee_cache.peek()
+    if employee_cache.invalidated:
+        # An explicit invalidation still means "read the table now", whichever worker it reached
+        return load_employee_data()
+    stamp = _snapshot_file_stamp()
+    if stamp is None or stamp == _followed_snapshot_file:
+        return snapshot.rows if snapshot else None
+    try:
+        rows = snapshot_file.load()[0]
+    except SnapshotFileError as e:
+        print(str(e))
+        return snapshot.rows if snapshot else None
+    _followed_snapshot_file = stamp
+    return rows
+
+def follow_employee_snapshot():
+    """Forked worker that doesn't refresh the snapshot itself: reload it from the file the refreshing worker saves.
+
+    Workers keep sharing the pre-fork snapshot's pages for as long as the
+    table doesn't change; after a change each worker holds its own copy of
+    the new rows (decoded from the file, not downloaded again).
+    """
+    if snapshot_file.path:
+        employee_cache.follow(load_followed_snapshot)
+
+# Shared employee snapshot, refreshed at most once per TTL across all requests
+employee_cache = EmployeeSnapshotCache(
+    load_employee_data,
+    ttl=float(os.getenv('EMPLOYEE_CACHE_TTL', 60)),
+    stale_ttl=float(os.getenv('EMPLOYEE_CACHE_STALE_TTL', 300)),
+    change_loader=load_employee_changes if EMPLOYEE_SYNC_MODE == 'updated_at' else None,
+    key_func=employee_row_key,
+    full_refresh_interval=float(os.getenv('EMPLOYEE_FULL_REFRESH_INTERVAL', 3600)),
+    on_refresh=persist_employee_snapshot
+)
+
+@stage_timer.timed("supabase_fetch")
+def fetch_planned_rows(analysis_result):
+    """Only the rows (and columns) an analysis needs, with its filters, ordering and limit run by Supabase.
+
+    The rows still go through process_employee_query, which re-applies the
+    filters and ranking locally, so a plan that could not push everything
+    down only costs bytes, never correctness.
+    """
+    plan = plan_employee_query(
+        analysis_result.get('query_type', 'general_info'),
+        query_filters(analysis_result),
+        analysis_result.get('limit', 10),
+        analysis_result.get('sort_by', 'Skill Rate'),
+        analysis_result.get('sort_order', 'desc'),
+        max_rows=MAX_RESULT_ROWS,
+        id_column=ID_COLUMN
+    )
+    log.debug("planned_query", plan=plan.describe())
+    query = plan.apply(get_supabase_client().table('dhanush').select(plan.select_clause()))
+    return supabase_upstream.call(query.execute).data or []
+
 def fetch_employee_data():
-    """Fetch all employee data from Supabase"""
+    """Fetch all employee data, served from the shared snapshot cache"""
     try:
-        if not supabase_client:
-            print("Supabase client not configured")
-            return get_sample_employee_data()
-            
-        response = supabase_client.table('dhanush').select('*').execute()
-        
-        if response.data:
-            print(f"Fetched {len(response.data)} employee records")
-            return response.data
-        else:
-            print("No employee data found")
-            return get_sample_employee_data()
-            
+        snapshot = employee_cache.get()
+        if snapshot:
+            return snapshot.rows
+        return get_sample_employee_data()
+
     except Exception as e:
-        print(f"Error fetching employee data: {str(e)}")
+        log.error("employee_fetch_error", error=str(e))
         return get_sample_employee_data()
 
+@lru_cache(maxsize=1)
 def get_sample_employee_data():
-    """Return sample employee data for testing when database is not available"""
+    """Return sample employee data for testing when database is not available (the same list every call)"""
     return [
         {
             "Name": "John Doe",
@@ -582,18 +1551,57 @@ def get_sample_employee_data():
         }
     ]
 
-def handle_query_rule_based(user_message, employee_data, user_role):
-    """Enhanced rule-based query handling with better pattern matching"""
+def describe_rule_based_results(analysis_result, processed_data):
+    """Template narrative for an analysis_result answered without the LLM"""
+    query_type = analysis_result.get('query_type')
+    filters = analysis_result.get('filters') or {}
+    scope = filters.get('skill_name') or filters.get('category') or filters.get('domain')
+    scope_text = f" for {scope}" if scope else ""
+    count = len(processed_data)
+    
+    if not processed_data:
+        return f"I couldn't find any employees matching your request{scope_text}. Try a broader skill or domain."
+    if query_type == 'top_performers':
+        return f"Here are the top {count} employees{scope_text} by skill rating. These employees have demonstrated excellent proficiency and show strong engagement."
+    if query_type == 'upskilling_needs':
+        return f"I found {count} employees{scope_text} with high interest but room to grow their skills - strong candidates for upskilling programs."
+    if query_type == 'statistics':
+        return generate_data_summary(processed_data, analysis_result) + "."
+    if query_type == 'visualization_request':
+        return "Here are the charts you asked for, based on the current employee data."
+    return f"Here are {count} employees{scope_text}, ranked by skill rating."
+
+def handle_query_rule_based(user_message, employee_data, user_role, analysis_result=None):
+    """Enhanced rule-based query handling with better pattern matching.
+
+    `analysis_result` is a confident local classification of the message
+    (see IntentClassifier); when given it drives the full query pipeline.
+    """
     message_lower = user_message.lower()
+    store = get_employee_store(employee_data)
     
     # Check for visualization keywords
     viz_keywords = ['chart', 'graph', 'heatmap', 'visualize', 'plot', 'distribution', 'breakdown']
     needs_viz = any(keyword in message_lower for keyword in viz_keywords)
     
+    # Locally classified query
+    if analysis_result:
+        processed_data = process_employee_query(employee_data, analysis_result)
+        
+        visualizations = None
+        if analysis_result.get('needs_visualization', False):
+            visualizations = generate_visualizations(processed_data, analysis_result, employee_data)
+        
+        return {
+            "response": describe_rule_based_results(analysis_result, processed_data),
+            "data": employee_result(processed_data),
+            "visualizations": visualizations
+        }
+    
     # Top performers query
     if any(keyword in message_lower for keyword in ['top', 'best', 'highest', 'skilled', 'performer', 'excellent']):
-        sorted_data = sorted(employee_data, key=lambda x: (x.get('Skill Rate', 0), x.get('Interest Rate', 0)), reverse=True)
-        limited_data = sorted_data[:10]
+        with store.lock:
+            limited_data = store.get_rows(store.top_k(range(len(store)), 10, 'top_performers'))
         
         visualizations = None
         if needs_viz:
@@ -601,14 +1609,14 @@ def handle_query_rule_based(user_message, employee_data, user_role):
         
         return {
             "response": f"Here are the top {len(limited_data)} employees with the highest skill ratings. These employees have demonstrated excellent proficiency in their respective domains and show strong engagement.",
-            "data": {"employees": limited_data},
+            "data": employee_result(limited_data),
             "visualizations": visualizations
         }
     
     # Default response with visualization if requested
     response_data = {
         "response": f"I found {len(employee_data)} employees in our database. I can help you find specific skills, identify top performers, or suggest training opportunities. Try being more specific about what you're looking for!",
-        "data": {"employees": employee_data[:5]}
+        "data": employee_result(employee_data[:5])
     }
     
     if needs_viz:
@@ -622,93 +1630,279 @@ def recommend_courses():
     if request.method == 'OPTIONS':
         return jsonify({"status": "ok"}), 200
         
-    print("Received request for course recommendations")
-    
     try:
         skill_data = request.json
-        print(f"Request data: {skill_data}")
         
         if not skill_data:
-            print("No skill data provided")
+            log.warning("course_request_empty")
             return jsonify({"error": "No skill data provided"}), 400
+        log.info("course_request", skill=skill_data.get('Sub Category'), domain=skill_data.get('Domain'))
         
-        # Check if Gemini API key is configured
-        if not genai_api_key:
-            print("Gemini API key not configured, using fallback recommendations")
-            fallback_courses = generate_fallback_courses(skill_data)
-            return jsonify(fallback_courses)
+        # Same skill at the same level bucket was answered recently
+        cache_key = course_cache_key(skill_data)
+        cached_courses = course_cache.get(cache_key)
+        if cached_courses:
+            log.info("course_recommendations", source="cache")
+            return jsonify(cached_courses)
         
-        try:
-            # Enhanced course recommendation with Gemini
-            model = genai.GenerativeModel('gemini-1.5-flash')
-            
-            # Enhanced prompt for better course recommendations
-            prompt = f"""
-            You are an expert learning and development consultant. Generate exactly 3 personalized course recommendations based on the following employee profile:
-
-            EMPLOYEE PROFILE:
-            - Skill: {skill_data.get('Sub Category', 'Unknown')}
-            - Domain: {skill_data.get('Domain', 'Unknown')}
-            - Category: {skill_data.get('Category', 'Unknown')}
-            - Current Skill Level: {skill_data.get('Skill Rate', 0)}/5
-            - Interest Level: {skill_data.get('Interest Rate', 0)}/5
-
-            REQUIREMENTS:
-            1. Courses should be progressive (beginner to advanced based on current skill level)
-            2. Mix different providers (Coursera, Udemy, Pluralsight, LinkedIn Learning, edX)
-            3. Include practical, hands-on courses
-            4. Consider current industry trends and demands
-            5. Match the employee's interest level and career progression
-
-            COURSE STRUCTURE (return exactly this JSON format):
-            [
-              {{
-                "title": "Specific and descriptive course title",
-                "provider": "Well-known platform name",
-                "description": "2-3 sentences describing course content and benefits",
-                "level": "Beginner/Intermediate/Advanced",
-                "duration": "X weeks",
-                "rating": 4.X (between 4.0-5.0),
-                "features": ["Practical feature 1", "Practical feature 2", "Practical feature 3"],
-                "matchScore": 0.XX (between 0.75-0.98, higher for better matches)
-              }}
-            ]
-
-            IMPORTANT: Return ONLY the JSON array. No additional text, explanations, or markdown formatting.
-            """
-            
-            print("Sending enhanced request to Gemini API")
-            response = model.generate_content(prompt)
-            print("Received response from Gemini API")
-            
-            # Enhanced JSON parsing
-            content = response.text
-            print(f"Raw content: {content}")
-            
-            parsed_content = clean_and_parse_json(content)
-            
-            if parsed_content and isinstance(parsed_content, list) and len(parsed_content) >= 3:
-                print(f"Successfully parsed {len(parsed_content)} course recommendations")
-                return jsonify(parsed_content[:3])  # Ensure exactly 3 courses
-            else:
-                print("Failed to parse valid course JSON, using fallback")
-                fallback_courses = generate_fallback_courses(skill_data)
-                return jsonify(fallback_courses)
-                
-        except Exception as gemini_error:
-            print(f"Gemini API error: {str(gemini_error)}")
+        # Check if Gemini API key is configured and Gemini is healthy
+        set_llm_user(skill_data.get('userEmail'))
+        if llm_available() and not llm_user_has_tokens():
+            record_llm_shed("rate_limited")
+        if not llm_available():
+            log.info("course_recommendations", source="fallback", reason="llm_unavailable")
             fallback_courses = generate_fallback_courses(skill_data)
             return jsonify(fallback_courses)
+        
+        if COALESCE_REQUESTS:
+            return coalesced_response(course_flight, cache_key, lambda: recommend_courses_with_llm(skill_data, cache_key))
+        return recommend_courses_with_llm(skill_data, cache_key)
             
     except Exception as e:
-        print(f"Error: {str(e)}")
-        print(traceback.format_exc())
+        log.error("course_error", error=str(e), traceback=traceback.format_exc())
         try:
             fallback_courses = generate_fallback_courses({"Sub Category": "General Skills"})
             return jsonify(fallback_courses)
         except:
             return jsonify({"error": str(e)}), 500
         
+def recommend_courses_with_llm(skill_data, cache_key):
+    """The /api/recommend-courses response for a profile missing from the course cache"""
+    try:
+        # Enhanced course recommendation with Gemini
+        model = gemini_client
+        
+        # Enhanced prompt for better course recommendations
+        prompt = build_course_prompt(skill_data)
+        
+        with stage_timer.span("course_llm"):
+            content = model.generate_content(prompt).text
+        log.debug("course_llm_reply", chars=len(content))
+        
+        courses = clean_and_parse_json(content, coerce_courses, shape="courses")
+        
+        if courses:
+            log.info("course_recommendations", source="llm", courses=len(courses))
+            course_cache.set(cache_key, courses)
+            return jsonify(courses)
+        else:
+            log.warning("course_recommendations", source="fallback", reason="reply_unparseable")
+            fallback_courses = generate_fallback_courses(skill_data)
+            return jsonify(fallback_courses)
+            
+    except Exception as gemini_error:
+        log.error("gemini_error", error=str(gemini_error))
+        fallback_courses = generate_fallback_courses(skill_data)
+        return jsonify(fallback_courses)
+
+def skill_level_bucket(skill_level):
+    """Coarse level used for course recommendations (same cut-offs as generate_fallback_courses)"""
+    if not isinstance(skill_level, (int, float)):
+        skill_level = 3
+    if skill_level <= 2:
+        return "beginner"
+    if skill_level <= 3:
+        return "intermediate"
+    return "advanced"
+
+def course_cache_key(skill_data):
+    """Normalized memoization key for a skill profile"""
+    parts = [str(skill_data.get(field) or '').strip().lower() for field in ('Sub Category', 'Domain', 'Category')]
+    parts.append(skill_level_bucket(skill_data.get('Skill Rate', 3)))
+    return "|".join(parts)
+
+def build_course_prompt(skill_data):
+    """Prompt asking for 3 course recommendations for one skill profile"""
+    prompt = f"""
+    You are an expert learning and development consultant. Generate exactly 3 personalized course recommendations based on the following employee profile:
+
+    EMPLOYEE PROFILE:
+    - Skill: {skill_data.get('Sub Category', 'Unknown')}
+    - Domain: {skill_data.get('Domain', 'Unknown')}
+    - Category: {skill_data.get('Category', 'Unknown')}
+    - Current Skill Level: {skill_data.get('Skill Rate', 0)}/5
+    - Interest Level: {skill_data.get('Interest Rate', 0)}/5
+
+    REQUIREMENTS:
+    1. Courses should be progressive (beginner to advanced based on current skill level)
+    2. Mix different providers (Coursera, Udemy, Pluralsight, LinkedIn Learning, edX)
+    3. Include practical, hands-on courses
+    4. Consider current industry trends and demands
+    5. Match the employee's interest level and career progression
+
+    COURSE STRUCTURE (return exactly this JSON format):
+    [
+      {{
+        "title": "Specific and descriptive course title",
+        "provider": "Well-known platform name",
+        "description": "2-3 sentences describing course content and benefits",
+        "level": "Beginner/Intermediate/Advanced",
+        "duration": "X weeks",
+        "rating": 4.X (between 4.0-5.0),
+        "features": ["Practical feature 1", "Practical feature 2", "Practical feature 3"],
+        "matchScore": 0.XX (between 0.75-0.98, higher for better matches)
+      }}
+    ]
+
+    IMPORTANT: Return ONLY the JSON array. No additional text, explanations, or markdown formatting.
+    """
+    return prompt
+
+def generate_course_batch(model, profiles):
+    """Course lists for several skill profiles from one LLM prompt ({index: courses}, missing on failure)"""
+    profile_lines = "\n".join(
+        f"    {index}. Skill: {profile.get('Sub Category', 'Unknown')} | Domain: {profile.get('Domain', 'Unknown')} | "
+        f"Category: {profile.get('Category', 'Unknown')} | Current Skill Level: {profile.get('Skill Rate', 0)}/5 | "
+        f"Interest Level: {profile.get('Interest Rate', 0)}/5"
+        for index, profile in enumerate(profiles)
+    )
+    prompt = f"""
+    You are an expert learning and development consultant. Generate exactly 3 personalized course recommendations for EACH of the following employee profiles:
+
+    EMPLOYEE PROFILES:
+{profile_lines}
+
+    REQUIREMENTS:
+    1. Courses should be progressive (beginner to advanced based on current skill level)
+    2. Mix different providers (Coursera, Udemy, Pluralsight, LinkedIn Learning, edX)
+    3. Include practical, hands-on courses
+    4. Consider current industry trends and demands
+    5. Match the employee's interest level and career progression
+
+    COURSE STRUCTURE (return exactly this JSON object, one key per profile number):
+    {{
+      "0": [
+        {{
+          "title": "Specific and descriptive course title",
+          "provider": "Well-known platform name",
+          "description": "2-3 sentences describing course content and benefits",
+          "level": "Beginner/Intermediate/Advanced",
+          "duration": "X weeks",
+          "rating": 4.X (between 4.0-5.0),
+          "features": ["Practical feature 1", "Practical feature 2", "Practical feature 3"],
+          "matchScore": 0.XX (between 0.75-0.98, higher for better matches)
+        }}
+      ]
+    }}
+
+    IMPORTANT: Return ONLY the JSON object. No additional text, explanations, or markdown formatting.
+    """
+    with stage_timer.span("course_llm"):
+        content = model.generate_content(prompt).text
+    keys = [str(index) for index in range(len(profiles))]
+    parsed_content = clean_and_parse_json(
+        content, lambda value: value if isinstance(value, dict) and any(key in value for key in keys) else None, shape="course_batch"
+    )
+    if parsed_content is None:
+        return {}
+    results = {}
+    for index in range(len(profiles)):
+        courses = coerce_courses(parsed_content.get(keys[index]))
+        if courses:
+            results[index] = courses
+    return results
+
+def recommend_courses_for_profiles(profiles):
+    """Course lists for many skill profiles, in input order.
+
+    Profiles are deduplicated by course_cache_key and answered from the
+    course cache where possible; only the misses go to the LLM,
+    COURSE_BATCH_SIZE profiles per prompt. Profiles the LLM leaves out get
+    the fallback courses, which are not cached. Returns (results, stats).
+    """
+    unique_profiles = {}
+    for profile in profiles:
+        unique_profiles.setdefault(course_cache_key(profile), profile)
+    
+    resolved = {}
+    misses = []
+    for key in unique_profiles:
+        cached_courses = course_cache.get(key)
+        if cached_courses:
+            resolved[key] = cached_courses
+        else:
+            misses.append(key)
+    
+    llm_calls = 0
+    for start in range(0, len(misses), COURSE_BATCH_SIZE):
+        # Checked per chunk: once the request is shed the remaining chunks get the fallback courses
+        if not llm_available():
+            break
+        chunk = misses[start:start + COURSE_BATCH_SIZE]
+        llm_calls += 1
+        try:
+            generated = generate_course_batch(gemini_client, [unique_profiles[key] for key in chunk])
+        except Exception as gemini_error:
+            log.error("gemini_error", error=str(gemini_error))
+            generated = {}
+        for index, key in enumerate(chunk):
+            if index in generated:
+                resolved[key] = generated[index]
+                course_cache.set(key, generated[index])
+    
+    fallbacks = 0
+    for key in misses:
+        if key not in resolved:
+            fallbacks += 1
+            resolved[key] = generate_fallback_courses(unique_profiles[key])
+    
+    stats = {
+        "profiles": len(profiles),
+        "unique": len(unique_profiles),
+        "cached": len(unique_profiles) - len(misses),
+        "llm_calls": llm_calls,
+        "fallbacks": fallbacks
+    }
+    return [resolved[course_cache_key(profile)] for profile in profiles], stats
+
+@app.route('/api/recommend-courses/batch', methods=['POST', 'OPTIONS'])
+def recommend_courses_batch():
+    # Handle preflight requests
+    if request.method == 'OPTIONS':
+        return jsonify({"status": "ok"}), 200
+    
+    try:
+        request_data = request.json
+        profiles = request_data.get('profiles') if isinstance(request_data, dict) else request_data
+        
+        if not isinstance(profiles, list) or not profiles:
+            return jsonify({"error": "No skill profiles provided"}), 400
+        if len(profiles) > MAX_COURSE_BATCH:
+            return jsonify({"error": f"At most {MAX_COURSE_BATCH} profiles per request"}), 400
+        if not all(isinstance(profile, dict) for profile in profiles):
+            return jsonify({"error": "Each profile must be an object"}), 400
+        
+        set_llm_user(request_data.get('userEmail') if isinstance(request_data, dict) else None)
+        recommendations, stats = recommend_courses_for_profiles(profiles)
+        log.info("course_batch", **stats)
+        return jsonify({"recommendations": recommendations, "stats": stats})
+    
+    except Exception as e:
+        log.error("course_batch_error", error=str(e), traceback=traceback.format_exc())
+        return jsonify({"error": str(e)}), 500
+
+def catalog_rows():
+    """Rows the course catalog is built from (the shared employee snapshot)"""
+    snapshot = employee_cache.get()
+    return snapshot.rows if snapshot else []
+
+# Keeps course recommendations precomputed for every skill profile in the employee table
+course_catalog_warmer = CourseCatalogWarmer(
+    catalog_rows,
+    course_cache_key,
+    course_cache,
+    lambda profiles: generate_course_batch(gemini_client, profiles),
+    interval=float(os.getenv('COURSE_CATALOG_INTERVAL', 21600)),
+    batch_size=COURSE_BATCH_SIZE,
+    min_call_interval=float(os.getenv('COURSE_CATALOG_MIN_CALL_INTERVAL', 4)),
+    max_calls_per_run=int(os.getenv('COURSE_CATALOG_MAX_CALLS', 100))
+)
+
+def start_course_catalog_warmer():
+    if genai_api_key and os.getenv('COURSE_CATALOG_WARMER', '1') == '1':
+        course_catalog_warmer.start()
+        print("Course catalog warmer started")
+
 def generate_fallback_courses(skill_data):
     """Enhanced fallback course recommendations"""
     skill_name = skill_data.get('Sub Category', 'Professional Skills')
@@ -763,9 +1957,54 @@ def generate_fallback_courses(skill_data):
     
     return courses
 
+def prefork_tasks():
+    """Startup work whose result forked workers can share: the employee snapshot"""
+    tasks = [("employee_snapshot_file", seed_employee_cache)]
+    if supabase_configured:
+        tasks.append(("employee_cache", employee_cache.get))
+    return tasks
+
+def worker_tasks():
+    """Startup work each serving process does itself - sockets and gRPC channels don't survive a fork"""
+    tasks = []
+    if supabase_configured:
+        tasks.append(("supabase", get_supabase_client))
+    if genai_api_key:
+        tasks.append(("gemini", lambda: gemini_client.model))
+    return tasks
+
+def warm_up_before_fork():
+    """Preloading master: load the employee snapshot once so every forked worker shares its pages"""
+    global _supabase_client, _followed_snapshot_file
+    startup.run(prefork_tasks())
+    if METRICS_DIR:
+        clear_shared_metrics(METRICS_DIR)
+    # No refresh or save may be half done (holding locks) when the workers are forked
+    employee_cache.wait_idle()
+    snapshot_file.flush()
+    # What the workers already share, so followers don't reload it
+    _followed_snapshot_file = _snapshot_file_stamp()
+    # Each worker opens its own Supabase connections
+    _supabase_client = None
+    # Keep the cyclic GC from writing to (and so un-sharing) the pages of objects built so far
+    gc.freeze()
+
+def after_fork():
+    """Forked worker: create this process's upstream clients in the background, then report ready"""
+    if METRICS_DIR:
+        metrics.share(METRICS_DIR, interval=METRICS_WRITE_INTERVAL)
+    startup.warm_up(worker_tasks(), 'background')
+
+startup.imported()
+if STARTUP_WARMUP != 'prefork':
+    startup.warm_up(prefork_tasks() + worker_tasks(), STARTUP_WARMUP)
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     print(f"Starting Enhanced Flask server on port {port}")
     print(f"CORS enabled for frontend URLs")
     print(f"Health check available at: http://localhost:{port}/api/health")
+    # With the debug reloader only the child process serves requests
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_course_catalog_warmer()
     app.run(host='0.0.0.0', port=port, debug=True)
\ No newline at end of file
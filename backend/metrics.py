@@ -0,0 +1,345 @@
+import bisect
+import contextvars
+import functools
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+# Latency buckets in seconds: from cache hits and local query work up to slow LLM calls
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_current_trace = contextvars.ContextVar('request_trace', default=None)
+
+
+def _label_text(names, values):
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _number(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    """Monotonic counter per label set"""
+
+    kind = "counter"
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def state(self):
+        with self._lock:
+            return dict(self._values)
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    @staticmethod
+    def merge(states):
+        merged = {}
+        for state in states:
+            for key, value in state.items():
+                merged[key] = merged.get(key, 0) + value
+        return merged
+
+    def samples(self, state=None):
+        values = self.state() if state is None else state
+        return [(self.name, _label_text(self.labels, key), value) for key, value in sorted(values.items())]
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set, in the Prometheus exposition layout"""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (+Inf last), sum]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, "") for name in self.labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def state(self):
+        with self._lock:
+            return {key: (list(counts), total) for key, (counts, total) in self._series.items()}
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    @staticmethod
+    def merge(states):
+        merged = {}
+        for state in states:
+            for key, (counts, total) in state.items():
+                if key in merged:
+                    merged_counts, merged_total = merged[key]
+                    merged[key] = ([a + b for a, b in zip(merged_counts, counts)], merged_total + total)
+                else:
+                    merged[key] = (list(counts), total)
+        return merged
+
+    def samples(self, state=None):
+        series = self.state() if state is None else state
+        samples = []
+        for key, (counts, total) in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                le = bound if bound == "+Inf" else _number(bound)
+                samples.append((f"{self.name}_bucket", _label_text(self.labels + ("le",), key + (le,)), cumulative))
+            samples.append((f"{self.name}_sum", _label_text(self.labels, key), round(total, 6)))
+            samples.append((f"{self.name}_count", _label_text(self.labels, key), cumulative))
+        return samples
+
+
+class Gauge:
+    """Value read from a callback at scrape time: a number, or {label value tuple: number}"""
+
+    kind = "gauge"
+
+    def __init__(self, name, help_text, callback, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.callback = callback
+        self.labels = tuple(labels)
+
+    def state(self):
+        value = self.callback()
+        if not isinstance(value, dict):
+            return {} if value is None else {(): value}
+        return {tuple(key): number for key, number in value.items() if number is not None}
+
+    def samples(self, state=None):
+        values = self.state() if state is None else state
+        return [(self.name, _label_text(self.labels, key), number) for key, number in sorted(values.items())]
+
+
+class MetricsRegistry:
+    """The process's metrics, rendered in the Prometheus text format by render().
+
+    Behind a pre-forking server every scrape lands on a random worker, so
+    workers share() a directory: each one writes its metrics to a file of
+    its own there (every `interval` seconds and before answering a scrape),
+    and render() merges the files of all of them. Counters and histograms
+    are summed - including workers that have since exited, so they never go
+    backwards - and gauges are reported per live process with a `worker`
+    label. Other workers' values are at most `interval` seconds old.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._directory = None
+        self._path = None
+        self._write_lock = threading.Lock()
+
+    def counter(self, name, help_text, labels=()):
+        return self._add(Counter(name, help_text, labels))
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, help_text, labels, buckets))
+
+    def gauge(self, name, help_text, callback, labels=()):
+        return self._add(Gauge(name, help_text, callback, labels))
+
+    def share(self, directory, interval=5):
+        """Merge metrics with the other processes writing to `directory` (call in each forked worker).
+
+        Values inherited from the parent process are dropped first, so
+        every observation is counted by exactly one file.
+        """
+        for metric in self._metrics:
+            if metric.kind != "gauge":
+                metric.reset()
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        self._path = os.path.join(directory, f"metrics-{os.getpid()}.json")
+        self.write()
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.write()
+                except Exception as e:
+                    print(f"Error writing metrics to {self._path}: {str(e)}")
+
+        threading.Thread(target=run, name="metrics-writer", daemon=True).start()
+
+    def write(self):
+        """Write this process's metrics to its file in the shared directory"""
+        state = {}
+        for metric in self._metrics:
+            try:
+                state[metric.name] = [[list(key), value] for key, value in metric.state().items()]
+            except Exception as e:
+                print(f"Error collecting metric {metric.name}: {str(e)}")
+        with self._write_lock:
+            temp_path = f"{self._path}.tmp"
+            with open(temp_path, 'w') as f:
+                json.dump(state, f, separators=(',', ':'))
+            os.replace(temp_path, self._path)
+
+    def render(self):
+        if self._directory is None:
+            return self._render({metric.name: metric.samples for metric in self._metrics})
+        self.write()
+        processes = []
+        for path in glob.glob(os.path.join(self._directory, "metrics-*.json")):
+            pid = int(os.path.basename(path)[len("metrics-"):-len(".json")])
+            try:
+                with open(path) as f:
+                    state = json.load(f)
+            except (OSError, ValueError):
+                # Being replaced, or left half written by a killed worker
+                continue
+            processes.append((pid, _process_alive(pid), state))
+
+        collectors = {}
+        for metric in self._metrics:
+            states = [(pid, alive, {tuple(key): value if metric.kind != "histogram" else tuple(value)
+                                    for key, value in state.get(metric.name, ())})
+                      for pid, alive, state in processes]
+            if metric.kind == "gauge":
+                merged = {key + (str(pid),): value for pid, alive, state in states if alive for key, value in state.items()}
+                collectors[metric.name] = functools.partial(_worker_gauge_samples, metric, merged)
+            else:
+                collectors[metric.name] = functools.partial(metric.samples, metric.merge(state for _, _, state in states))
+        return self._render(collectors)
+
+    def _render(self, collectors):
+        lines = []
+        for metric in self._metrics:
+            try:
+                samples = collectors[metric.name]()
+            except Exception as e:
+                print(f"Error collecting metric {metric.name}: {str(e)}")
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(f"{name}{labels} {_number(value)}" for name, labels, value in samples)
+        return "\n".join(lines) + "\n"
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _worker_gauge_samples(gauge, values):
+    labels = gauge.labels + ("worker",)
+    return [(gauge.name, _label_text(labels, key), number) for key, number in sorted(values.items())]
+
+
+def clear_shared_metrics(directory):
+    """Remove the files of a previous server run, so its counts aren't added to this one's"""
+    for path in glob.glob(os.path.join(directory, "metrics-*.json*")):
+        os.remove(path)
+
+
+class RequestTrace:
+    """Stage spans of one request, for the Server-Timing header and log lines"""
+
+    def __init__(self):
+        self.request_id = uuid.uuid4().hex[:12]
+        self.started = time.perf_counter()
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        with self._lock:
+            self.spans.append((stage, seconds))
+
+    def server_timing(self):
+        """Server-Timing header value; repeated stages are summed"""
+        with self._lock:
+            totals = {}
+            for stage, seconds in self.spans:
+                totals[stage] = totals.get(stage, 0.0) + seconds
+        entries = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in totals.items()]
+        entries.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.1f}")
+        return ", ".join(entries)
+
+
+def start_trace():
+    """Make a new trace current for this request; returns (trace, token for end_trace)"""
+    trace = RequestTrace()
+    return trace, _current_trace.set(trace)
+
+
+def end_trace(token):
+    _current_trace.reset(token)
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+class StageTimer:
+    """Times named stages into a histogram and into the current request's trace, if any"""
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    @contextmanager
+    def span(self, stage):
+        trace = _current_trace.get()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.histogram.observe(elapsed, stage=stage)
+            if trace is not None:
+                trace.add(stage, elapsed)
+
+    def timed(self, stage):
+        """Decorator form of span()"""
+        def decorate(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(stage):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorate
@@ -0,0 +1,65 @@
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+
+class StageTimeout(Exception):
+    """A pipeline stage did not finish within its deadline"""
+
+
+class PipelineTimings:
+    """Per-stage latency breakdown of one assistant request, in milliseconds"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.timed_out = []
+
+    def record(self, stage, started):
+        self.stages[stage] = round((time.perf_counter() - started) * 1000, 2)
+
+    def time(self, stage, func, *args, **kwargs):
+        """Run func inline and record how long it took"""
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.record(stage, started)
+
+    def as_dict(self):
+        timings = dict(self.stages)
+        timings["total"] = round((time.perf_counter() - self.started) * 1000, 2)
+        if self.timed_out:
+            timings["timed_out"] = list(self.timed_out)
+        return timings
+
+
+class StagePool:
+    """Shared worker pool that runs independent pipeline stages concurrently.
+
+    Stages are plain blocking calls (Supabase, Gemini, chart building), so a
+    thread pool is enough to overlap them. A stage that misses its deadline
+    keeps running in the background - only the request stops waiting for it.
+    Stages run in a copy of the submitting request's context, so their spans
+    land in that request's trace.
+    """
+
+    def __init__(self, max_workers=16, name="assistant-stage"):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+
+    def submit(self, timings, stage, func, *args, **kwargs):
+        def run():
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                timings.record(stage, started)
+        return self._executor.submit(contextvars.copy_context().run, run)
+
+    def result(self, timings, stage, future, timeout):
+        """Result of a submitted stage, raising StageTimeout once `timeout` seconds have passed"""
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            timings.timed_out.append(stage)
+            raise StageTimeout(f"{stage} did not finish within {timeout}s")
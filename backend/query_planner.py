@@ -0,0 +1,125 @@
+import re
+
+# Columns the assistant reads from the dhanush table - everything else select('*') would ship is dead weight
+EMPLOYEE_COLUMNS = ('Name', 'Domain', 'Category', 'Sub Category', 'Skill Rate', 'Interest Rate', 'Access', 'Email')
+
+# Filter text that can be sent as a PostgREST pattern without escaping (LIKE wildcards, quotes and the
+# or=() syntax characters are left to the local filter instead)
+_SAFE_TERM = re.compile(r"^[^%_\\\"(),]+$")
+
+
+def quote_column(column):
+    """PostgREST needs double quotes around column names with spaces"""
+    return f'"{column}"' if ' ' in column else column
+
+
+def _contains_pattern(term):
+    return f"%{term}%"
+
+
+class QueryPlan:
+    """Server-side form of one employee query: projection, PostgREST predicates, ordering and limit.
+
+    A plan may leave predicates out (terms that can't be sent safely); the
+    rows it returns are then a superset that the caller re-filters locally.
+    Ordering and limit are only pushed down when every predicate was. The
+    ordering is the local ranking's total order: missing ratings sort as
+    the lowest value (nulls last when descending, first when ascending)
+    and rating ties go to the lower id, so the `limit` rows returned are
+    exactly the local top `limit`.
+    """
+
+    def __init__(self, columns=EMPLOYEE_COLUMNS):
+        self.columns = list(columns)
+        self.predicates = []
+        self.order = []
+        self.limit = None
+        self.complete = True
+
+    def select_clause(self):
+        return ",".join(quote_column(column) for column in self.columns)
+
+    def apply(self, query):
+        """Add the predicates, ordering and limit to a postgrest query builder"""
+        for method, args in self.predicates:
+            query = getattr(query, method)(*args)
+        for column, desc in self.order:
+            # Missing ratings rank as 0 locally, below every real rating
+            query = query.order(quote_column(column), desc=desc, nullsfirst=not desc)
+        if self.limit is not None:
+            query = query.limit(self.limit)
+        return query
+
+    def describe(self):
+        return {
+            "columns": self.columns,
+            "predicates": [[method] + list(args) for method, args in self.predicates],
+            "order": [f"{column} {'desc' if desc else 'asc'}" for column, desc in self.order],
+            "limit": self.limit,
+            "complete": self.complete
+        }
+
+
+def plan_employee_query(query_type, filters, limit, sort_by, sort_order, max_rows=1000, id_column='id'):
+    """QueryPlan equivalent to process_employee_query for already-normalized `filters`.
+
+    `filters` uses the EmployeeStore.filter keywords (domain, category,
+    skill_name, access, min_skill, max_skill, min_interest). Text filters
+    become case-insensitive substring matches (`ilike`), like the local
+    index; access is a case-insensitive equality. `id_column` is the
+    integer primary key EmployeeStore breaks rating ties on.
+    """
+    plan = QueryPlan(EMPLOYEE_COLUMNS + (id_column,))
+
+    for key, column in (('domain', 'Domain'), ('category', 'Category')):
+        term = filters.get(key)
+        if term is None:
+            continue
+        if _SAFE_TERM.match(term):
+            plan.predicates.append(('ilike', (column, _contains_pattern(term))))
+        else:
+            plan.complete = False
+
+    term = filters.get('skill_name')
+    if term is not None:
+        if _SAFE_TERM.match(term):
+            pattern = _contains_pattern(term)
+            plan.predicates.append(('or_', (",".join(
+                f'{quote_column(column)}.ilike."{pattern}"' for column in ('Sub Category', 'Category', 'Domain')
+            ),)))
+        else:
+            plan.complete = False
+
+    term = filters.get('access')
+    if term is not None:
+        if _SAFE_TERM.match(term):
+            plan.predicates.append(('ilike', ('Access', term)))
+        else:
+            plan.complete = False
+
+    for key, column in (('min_skill', 'Skill Rate'), ('min_interest', 'Interest Rate')):
+        if filters.get(key) is not None:
+            plan.predicates.append(('gte', (column, filters[key])))
+    for key, column in (('max_skill', 'Skill Rate'), ('max_interest', 'Interest Rate')):
+        if filters.get(key) is not None:
+            # A missing rating counts as 0 locally, which is under every upper bound - but NULL <= N is never true
+            plan.predicates.append(('or_', (f'{quote_column(column)}.lte.{filters[key]},{quote_column(column)}.is.null',)))
+
+    if not plan.complete or not isinstance(limit, int) or isinstance(limit, bool) or limit < 0:
+        return plan
+
+    if query_type == 'top_performers':
+        plan.order = [('Skill Rate', True), ('Interest Rate', True)]
+    elif query_type == 'upskilling_needs':
+        plan.order = [('Interest Rate', True), ('Skill Rate', False)]
+    elif query_type == 'skill_search':
+        plan.order = [('Skill Rate', True)]
+    elif sort_by in ('Skill Rate', 'Interest Rate'):
+        plan.order = [(sort_by, sort_order == 'desc')]
+    else:
+        # Text ordering in Postgres depends on collation - rank those rows locally instead
+        return plan
+    # Ratings tie heavily - without a tie-break the database and the local ranking could each pick different rows
+    plan.order.append((id_column, False))
+    plan.limit = min(limit, max_rows)
+    return plan
@@ -0,0 +1,169 @@
+import json
+import re
+from contextlib import contextmanager
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Filler words that don't change what a question asks for. Keys built from this are shared between
+# users (and between concurrent requests), so words like "to", "of" or "all" that can tell two questions
+# apart ("move to Java" / "move from Java", "all Python developers" / "Python developers") stay in
+_FILLER_WORDS = {
+    "a", "an", "the", "please", "pls", "me", "us", "can", "could", "would", "you", "kindly",
+    "i", "want", "see", "give", "tell", "list", "show", "display", "our",
+}
+# Keep characters that are part of skill names (C++, C#, Node.js) and split on everything else
+_TOKEN_PATTERN = re.compile(r"[a-z0-9+#.]+")
+
+
+def normalize_message(message):
+    """Canonical form of a user question for cache keys.
+
+    Lowercases, drops punctuation and filler words and collapses whitespace,
+    so "Show me the top Python developers!" and "top python developers" share
+    an entry. Word order is kept since it can change the meaning.
+    """
+    tokens = [token.strip(".") for token in _TOKEN_PATTERN.findall(message.lower())]
+    return " ".join(token for token in tokens if token and token not in _FILLER_WORDS)
+
+
+class TTLCache:
+    """Thread-safe LRU cache with per-entry expiry and optional SQLite persistence.
+
+    Values must be JSON-serializable when a `path` is given: entries are then
+    written through to an SQLite table and read back on an in-memory miss, so
+    the cache survives restarts and is shared by workers on the same host.
+    Cached values are shared between callers and must not be mutated.
+    """
+
+    def __init__(self, name, max_size=512, ttl=3600, path=None):
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self.path = path
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "expired": 0, "writes": 0}
+        if path:
+            with self._connect() as db:
+                db.execute(
+                    "CREATE TABLE IF NOT EXISTS cache_entries ("
+                    "cache TEXT, key TEXT, value TEXT, expires_at REAL, PRIMARY KEY (cache, key))"
+                )
+
+    def get(self, key):
+        """Cached value for `key`, or None when missing or expired"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return value
+                del self._entries[key]
+                self._stats["expired"] += 1
+
+        if self.path:
+            entry = self._disk_get(key, now)
+            if entry is not None:
+                value, expires_at = entry
+                with self._lock:
+                    self._stats["disk_hits"] += 1
+                    self._store(key, value, expires_at)
+                return value
+
+        with self._lock:
+            self._stats["misses"] += 1
+        return None
+
+    def ttl_remaining(self, key):
+        """Seconds until `key` expires, or None when it is not cached"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None and self.path:
+            entry = self._disk_get(key, now)
+        if entry is None or entry[1] <= now:
+            return None
+        return entry[1] - now
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._stats["writes"] += 1
+            self._store(key, value, expires_at)
+        if self.path:
+            try:
+                with self._connect() as db:
+                    db.execute(
+                        "INSERT OR REPLACE INTO cache_entries (cache, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                        (self.name, key, json.dumps(value), expires_at)
+                    )
+            except (sqlite3.Error, TypeError, ValueError) as e:
+                print(f"Error persisting {self.name} cache entry: {str(e)}")
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.path:
+            with self._connect() as db:
+                db.execute("DELETE FROM cache_entries WHERE cache = ? AND key = ?", (self.name, key))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.path:
+            with self._connect() as db:
+                db.execute("DELETE FROM cache_entries WHERE cache = ?", (self.name,))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+        lookups = stats["hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["hits"] + stats["disk_hits"]) / lookups, 3) if lookups else None
+        stats["max_size"] = self.max_size
+        stats["ttl_seconds"] = self.ttl
+        stats["persistent"] = bool(self.path)
+        return stats
+
+    def _store(self, key, value, expires_at):
+        """Insert into the in-memory LRU; caller holds the lock"""
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _disk_get(self, key, now):
+        try:
+            with self._connect() as db:
+                row = db.execute(
+                    "SELECT value, expires_at FROM cache_entries WHERE cache = ? AND key = ?",
+                    (self.name, key)
+                ).fetchone()
+                if row is None:
+                    return None
+                if row[1] <= now:
+                    db.execute("DELETE FROM cache_entries WHERE cache = ? AND key = ?", (self.name, key))
+                    return None
+                return json.loads(row[0]), row[1]
+        except (sqlite3.Error, ValueError) as e:
+            print(f"Error reading {self.name} cache entry: {str(e)}")
+            return None
+
+    @contextmanager
+    def _connect(self):
+        """Connection for one transaction, committed (or rolled back) and closed on exit"""
+        db = sqlite3.connect(self.path, timeout=5)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
@@ -0,0 +1,70 @@
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Collapses concurrent calls with the same key into one.
+
+    The first caller for a key (the leader) runs the function; callers that
+    arrive while it is still running wait for it and get the same result,
+    or the same exception. Nothing is kept once the call finishes - this
+    only shares work between requests that overlap in time; caching results
+    is left to the caches. A follower that has waited `wait_timeout`
+    seconds stops waiting and runs the function itself.
+    """
+
+    def __init__(self, name, wait_timeout=30):
+        self.name = name
+        self.wait_timeout = wait_timeout
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._stats = {"leaders": 0, "coalesced": 0, "wait_timeouts": 0}
+
+    def do(self, key, func):
+        """(func() or the in-flight call's result, whether it was shared)"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._stats["leaders"] += 1
+
+        if not leader:
+            if call.done.wait(self.wait_timeout):
+                with self._lock:
+                    self._stats["coalesced"] += 1
+                if call.error is not None:
+                    raise call.error
+                return call.result, True
+            with self._lock:
+                self._stats["wait_timeouts"] += 1
+            return func(), False
+
+        try:
+            call.result = func()
+            return call.result, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = len(self._calls)
+        requests = stats["leaders"] + stats["coalesced"]
+        stats["coalesced_ratio"] = round(stats["coalesced"] / requests, 4) if requests else 0.0
+        return stats
@@ -0,0 +1,256 @@
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from array import array
+
+MAGIC = b"EMPSNAP\0"
+FORMAT_VERSION = 1
+# magic, format version, snapshot version, row count, saved_at, payload bytes, payload crc32
+_HEADER = struct.Struct("<8sIIIdQI")
+_COLUMN_NAME = struct.Struct("<H")
+_COLUMN_INFO = struct.Struct("<BI")
+_CODE_TYPES = {1: 'B', 2: 'H', 4: 'I'}
+
+
+class SnapshotFileError(Exception):
+    """The on-disk snapshot is missing, truncated, corrupt or from another format version"""
+
+
+# Decoded in place of code 0 - a row without that key
+_MISSING = object()
+
+
+def _value_key(value):
+    """Dictionary key of a cell value that keeps 1, 1.0 and True apart"""
+    try:
+        hash(value)
+    except TypeError:
+        return ('json', json.dumps(value, sort_keys=True))
+    return (value.__class__, value)
+
+
+def encode_rows(rows):
+    """Columnar payload: every column dictionary-encoded as a JSON vocabulary plus fixed-width codes.
+
+    Code 0 marks a row that has no such key, so rows round-trip exactly
+    (values, types and missing keys). Codes take 1, 2 or 4 bytes depending
+    on the vocabulary size - ratings and domains cost one byte per row.
+    """
+    columns = []
+    seen = set()
+    for emp in rows:
+        for column in emp:
+            if column not in seen:
+                seen.add(column)
+                columns.append(column)
+
+    parts = [struct.pack("<I", len(columns))]
+    missing = object()
+    for column in columns:
+        lookup = {}
+        vocab = []
+        codes = array('I')
+        for emp in rows:
+            value = emp.get(column, missing)
+            if value is missing:
+                codes.append(0)
+                continue
+            key = _value_key(value)
+            code = lookup.get(key)
+            if code is None:
+                code = lookup[key] = len(vocab) + 1
+                vocab.append(value)
+            codes.append(code)
+        width = 1 if len(vocab) < 0xFF else 2 if len(vocab) < 0xFFFF else 4
+        if width != 4:
+            codes = array(_CODE_TYPES[width], codes)
+        vocab_json = json.dumps(vocab, separators=(',', ':')).encode()
+        name = column.encode()
+        parts += [_COLUMN_NAME.pack(len(name)), name, _COLUMN_INFO.pack(width, len(vocab_json)), vocab_json, codes.tobytes()]
+    return b"".join(parts)
+
+
+def decode_rows(buffer, row_count):
+    """Rows from an encode_rows payload; `buffer` may be a memoryview over an mmap (codes are read in place)"""
+    offset = 0
+    (column_count,) = struct.unpack_from("<I", buffer, offset)
+    offset += 4
+    names = []
+    columns = []
+    has_missing = False
+    for _ in range(column_count):
+        (name_length,) = _COLUMN_NAME.unpack_from(buffer, offset)
+        offset += _COLUMN_NAME.size
+        names.append(bytes(buffer[offset:offset + name_length]).decode())
+        offset += name_length
+        width, vocab_length = _COLUMN_INFO.unpack_from(buffer, offset)
+        offset += _COLUMN_INFO.size
+        vocab = json.loads(bytes(buffer[offset:offset + vocab_length]))
+        offset += vocab_length
+        codes = buffer[offset:offset + row_count * width].cast(_CODE_TYPES[width])
+        offset += row_count * width
+        if len(codes) != row_count:
+            raise SnapshotFileError("Snapshot payload is truncated")
+        values = [_MISSING] + vocab
+        has_missing = has_missing or 0 in codes
+        columns.append(map(values.__getitem__, codes))
+
+    if not has_missing:
+        return [dict(zip(names, values)) for values in zip(*columns)]
+    return [{name: value for name, value in zip(names, values) if value is not _MISSING} for values in zip(*columns)]
+
+
+class SnapshotFile:
+    """Last good employee table persisted as a compact, checksummed, versioned binary file.
+
+    load() memory-maps the file, so the bytes come straight from the shared
+    page cache (every worker on the host maps the same pages) and the codes
+    are decoded in place. save() writes a temporary file next to the target
+    and renames it over it, so readers only ever see a complete snapshot.
+    save_async() persists from a background thread, at most once every
+    `min_interval` seconds. Saving the rows the file already holds leaves it
+    untouched, so processes that loaded it keep their copy.
+    """
+
+    def __init__(self, path, min_interval=300):
+        self.path = path
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._saving = False
+        self._writer = None
+        # Rows handed to save_async() while a save was running, written right after it
+        self._pending = None
+        # (payload bytes, crc32) of the rows the file holds, as far as this process knows
+        self._contents = None
+        self._stats = {"loads": 0, "load_errors": 0, "saves": 0, "save_errors": 0, "skipped_saves": 0,
+                       "unchanged_saves": 0,
+                       "last_saved_at": None, "last_save_ms": None, "last_load_ms": None, "bytes": None}
+
+    def load(self):
+        """(rows, info) from the file; raises SnapshotFileError when it can't be used"""
+        started = time.perf_counter()
+        error = None
+        try:
+            with open(self.path, 'rb') as f:
+                # mmap refuses an empty file (a save cut short, say) with a ValueError of its own
+                if os.fstat(f.fileno()).st_size < _HEADER.size:
+                    raise SnapshotFileError("File is shorter than the header")
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                rows, info = self._decode(mapped)
+            except (ValueError, struct.error, SnapshotFileError) as e:
+                error = str(e)
+        except (OSError, SnapshotFileError) as e:
+            error = str(e)
+        if error is None:
+            mapped.close()
+        else:
+            # The mapping is closed once the views the failed decode left behind are collected
+            with self._lock:
+                self._stats["load_errors"] += 1
+            raise SnapshotFileError(f"Can't load employee snapshot {self.path}: {error}")
+        with self._lock:
+            self._contents = info["contents"]
+            self._stats["loads"] += 1
+            self._stats["last_load_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            self._stats["bytes"] = info["bytes"]
+        return rows, info
+
+    def save(self, rows, version):
+        """Write `rows` atomically (temp file + fsync + rename); False if the file already holds them"""
+        started = time.perf_counter()
+        payload = encode_rows(rows)
+        contents = (len(payload), zlib.crc32(payload))
+        if contents == self._contents and os.path.exists(self.path):
+            with self._lock:
+                self._stats["unchanged_saves"] += 1
+            return False
+        header = _HEADER.pack(MAGIC, FORMAT_VERSION, version, len(rows), time.time(), *contents)
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(header)
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        with self._lock:
+            self._contents = contents
+            self._stats["saves"] += 1
+            self._stats["last_saved_at"] = time.time()
+            self._stats["last_save_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            self._stats["bytes"] = _HEADER.size + len(payload)
+        return True
+
+    def save_async(self, rows, version):
+        """Persist `rows` in the background unless one finished recently.
+
+        Rows handed over while a save is running are written right after it
+        (only the newest of them), so the file never stays behind the last
+        snapshot saved.
+        """
+        with self._lock:
+            if self._saving:
+                self._pending = (rows, version)
+                return False
+            last_saved_at = self._stats["last_saved_at"]
+            if last_saved_at and time.time() - last_saved_at < self.min_interval:
+                self._stats["skipped_saves"] += 1
+                return False
+            self._saving = True
+
+        def run():
+            pending = (rows, version)
+            while pending:
+                try:
+                    self.save(*pending)
+                except Exception as e:
+                    print(f"Error saving employee snapshot: {str(e)}")
+                    with self._lock:
+                        self._stats["save_errors"] += 1
+                with self._lock:
+                    pending, self._pending = self._pending, None
+                    if pending is None:
+                        self._saving = False
+
+        self._writer = threading.Thread(target=run, name="snapshot-writer", daemon=True)
+        self._writer.start()
+        return True
+
+    def flush(self, timeout=None):
+        """Wait for a background save to finish"""
+        writer = self._writer
+        if writer is not None:
+            writer.join(timeout)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["path"] = self.path
+        return stats
+
+    def _decode(self, mapped):
+        if len(mapped) < _HEADER.size:
+            raise SnapshotFileError("File is shorter than the header")
+        magic, format_version, version, row_count, saved_at, payload_bytes, checksum = _HEADER.unpack_from(mapped, 0)
+        if magic != MAGIC:
+            raise SnapshotFileError("Not an employee snapshot file")
+        if format_version != FORMAT_VERSION:
+            raise SnapshotFileError(f"Unsupported snapshot format version {format_version}")
+        if len(mapped) - _HEADER.size != payload_bytes:
+            raise SnapshotFileError("Snapshot payload is truncated")
+        with memoryview(mapped) as view:
+            if zlib.crc32(view[_HEADER.size:]) != checksum:
+                raise SnapshotFileError("Snapshot checksum mismatch")
+            rows = decode_rows(view[_HEADER.size:], row_count)
+        info = {"version": version, "rows": row_count, "saved_at": saved_at, "bytes": len(mapped),
+                "contents": (payload_bytes, checksum)}
+        return rows, info
@@ -0,0 +1,83 @@
+import threading
+import time
+
+
+class Startup:
+    """Startup phases of one process, timed against a budget, and whether it is ready for traffic.
+
+    The process is live as soon as it can answer HTTP at all. It is ready
+    once the warm-up tasks (client setup, loading the employee snapshot)
+    have run - until then a load balancer should keep traffic away from
+    it. A failed task is logged and recorded but does not block readiness,
+    since every upstream has a fallback path.
+    """
+
+    def __init__(self, started, budget_ms=1000):
+        self.started = started
+        self.budget_ms = budget_ms
+        self.import_ms = None
+        self.ready_ms = None
+        self.mode = None
+        self._phases = {}
+        self._errors = {}
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+
+    def imported(self):
+        """Record how long the module import took and warn when it is over budget"""
+        self.import_ms = round((time.perf_counter() - self.started) * 1000, 2)
+        if self.import_ms > self.budget_ms:
+            print(f"WARNING: Startup took {self.import_ms} ms, over the {self.budget_ms} ms budget")
+
+    def is_ready(self):
+        return self._ready.is_set()
+
+    def wait_ready(self, timeout=None):
+        return self._ready.wait(timeout)
+
+    def warm_up(self, tasks, mode='background'):
+        """Run (name, func) tasks, then report ready: in a background thread, right now ("blocking") or not at all ("off")"""
+        self.mode = mode
+        if mode == 'off':
+            self._mark_ready()
+        elif mode == 'blocking':
+            self._warm_up(tasks)
+        else:
+            threading.Thread(target=self._warm_up, args=(tasks,), name="startup-warmup", daemon=True).start()
+
+    def run(self, tasks):
+        """Run and time (name, func) tasks in order without reporting ready (e.g. in a master before forking)"""
+        for name, func in tasks:
+            started = time.perf_counter()
+            try:
+                func()
+            except Exception as e:
+                print(f"Startup task {name} failed: {str(e)}")
+                with self._lock:
+                    self._errors[name] = f"{type(e).__name__}: {str(e)[:200]}"
+            with self._lock:
+                self._phases[name] = round((time.perf_counter() - started) * 1000, 2)
+
+    def stats(self):
+        with self._lock:
+            phases = dict(self._phases)
+            errors = dict(self._errors)
+        return {
+            "ready": self.is_ready(),
+            "mode": self.mode,
+            "import_ms": self.import_ms,
+            "ready_ms": self.ready_ms,
+            "budget_ms": self.budget_ms,
+            "within_budget": self.import_ms is not None and self.import_ms <= self.budget_ms,
+            "phases_ms": phases,
+            "errors": errors
+        }
+
+    def _warm_up(self, tasks):
+        self.run(tasks)
+        self._mark_ready()
+
+    def _mark_ready(self):
+        self.ready_ms = round((time.perf_counter() - self.started) * 1000, 2)
+        self._ready.set()
+        print(f"Backend ready in {self.ready_ms} ms")
@@ -0,0 +1,92 @@
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+
+_LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40}
+
+
+class StructuredLogger:
+    """JSON-lines logger that never blocks the request thread.
+
+    log() only builds a dict and puts it on a bounded queue; a background
+    thread serializes and writes it. When the queue is full the record is
+    dropped and counted instead of waiting. Records below `min_level` are
+    discarded, and debug/info records are kept with probability
+    `sample_rate` - warnings and errors are always kept.
+    """
+
+    def __init__(self, stream=None, sample_rate=1.0, min_level="info", queue_size=10000, context=None):
+        self.stream = stream
+        self.sample_rate = sample_rate
+        self.min_level = _LEVELS.get(min_level, 20)
+        # Returns fields added to every record (e.g. the current request id)
+        self.context = context
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._writer_pid = None
+        self._stats = {"written": 0, "sampled_out": 0, "dropped": 0}
+
+    def debug(self, event, **fields):
+        self.log("debug", event, **fields)
+
+    def info(self, event, **fields):
+        self.log("info", event, **fields)
+
+    def warning(self, event, **fields):
+        self.log("warning", event, **fields)
+
+    def error(self, event, **fields):
+        self.log("error", event, **fields)
+
+    def log(self, level, event, **fields):
+        severity = _LEVELS.get(level, 20)
+        if severity < self.min_level:
+            return
+        if severity < _LEVELS["warning"] and self.sample_rate < 1 and random.random() >= self.sample_rate:
+            self._count("sampled_out")
+            return
+        record = {"ts": round(time.time(), 3), "level": level, "event": event}
+        if self.context is not None:
+            record.update(self.context() or {})
+        record.update(fields)
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self._count("dropped")
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["queued"] = self._queue.qsize()
+        stats["sample_rate"] = self.sample_rate
+        return stats
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def _ensure_writer(self):
+        # Checked by pid because a forked worker inherits the flag but not the thread
+        if self._writer_pid != os.getpid():
+            with self._lock:
+                if self._writer_pid != os.getpid():
+                    self._writer_pid = os.getpid()
+                    threading.Thread(target=self._write_loop, name="log-writer", daemon=True).start()
+
+    def _write_loop(self):
+        while True:
+            record = self._queue.get()
+            stream = self.stream or sys.stdout
+            try:
+                stream.write(json.dumps(record, default=str) + "\n")
+                if self._queue.empty():
+                    stream.flush()
+            except Exception:
+                self._count("dropped")
+                continue
+            self._count("written")
@@ -0,0 +1,96 @@
+import random
+
+# Domain -> Category -> skills, modelled on the values seen in the dhanush table
+SKILL_TAXONOMY = {
+    "Data Science": {
+        "Programming": ["Python", "R", "SQL", "Scala", "Julia"],
+        "Machine Learning": ["TensorFlow", "Scikit-learn", "XGBoost", "Keras", "MLflow"],
+        "Analytics": ["Power BI", "Tableau", "Excel", "Looker", "Pandas"],
+        "Statistics": ["Hypothesis Testing", "Regression", "Bayesian Methods", "Time Series"],
+    },
+    "Web Development": {
+        "Frontend": ["React", "Angular", "Vue.js", "TypeScript", "Next.js", "Tailwind CSS"],
+        "Backend": ["Node.js", "Django", "Flask", "Spring Boot", "Express", "GraphQL"],
+        "Full Stack": ["MERN Stack", "Angular", "Ruby on Rails", "Laravel"],
+    },
+    "AI": {
+        "Deep Learning": ["PyTorch", "TensorFlow", "Computer Vision", "Transformers"],
+        "NLP": ["spaCy", "Hugging Face", "LangChain", "Prompt Engineering"],
+        "MLOps": ["Kubeflow", "MLflow", "SageMaker", "Vertex AI"],
+    },
+    "Cloud": {
+        "Infrastructure": ["AWS", "Azure", "Google Cloud", "Terraform"],
+        "DevOps": ["Docker", "Kubernetes", "Jenkins", "GitHub Actions", "Ansible"],
+        "Networking": ["VPC Design", "Load Balancing", "CDN", "DNS"],
+    },
+    "Security": {
+        "Application Security": ["OWASP", "Penetration Testing", "Threat Modeling"],
+        "Identity": ["OAuth", "SAML", "Active Directory"],
+        "Compliance": ["ISO 27001", "SOC 2", "GDPR"],
+    },
+    "Mobile": {
+        "Native": ["Swift", "Kotlin", "Objective-C"],
+        "Cross Platform": ["Flutter", "React Native", "Xamarin"],
+    },
+    "Management": {
+        "Project Management": ["Agile", "Scrum", "Jira", "Kanban"],
+        "Leadership": ["Mentoring", "Stakeholder Management", "Communication"],
+    },
+    "Quality Assurance": {
+        "Automation": ["Selenium", "Cypress", "Playwright", "Appium"],
+        "Performance": ["JMeter", "Gatling", "k6"],
+    },
+}
+
+FIRST_NAMES = ["John", "Jane", "Mike", "Sarah", "David", "Lisa", "Tom", "Priya", "Arjun", "Ananya",
+               "Wei", "Mei", "Carlos", "Sofia", "Omar", "Fatima", "Liam", "Emma", "Noah", "Olivia"]
+LAST_NAMES = ["Doe", "Smith", "Johnson", "Wilson", "Brown", "Garcia", "Anderson", "Kumar", "Sharma",
+              "Reddy", "Chen", "Wang", "Lopez", "Martinez", "Khan", "Ali", "Taylor", "Thomas"]
+
+
+def generate_employee_rows(count, seed=42, skills_per_employee=(3, 12), long_tail_skills=0):
+    """Generate `count` dhanush-shaped rows (one row per employee skill), deterministically for `seed`.
+
+    `long_tail_skills` adds that many rare, made-up skills per category
+    (picked for ~5% of rows), for skill vocabularies in the thousands like
+    real skill matrices have; the default keeps the curated taxonomy only.
+    """
+    rng = random.Random(seed)
+    domains = list(SKILL_TAXONOMY)
+    # Skewed popularity so a few domains/skills dominate, as in real skill matrices
+    domain_weights = [1.0 / (rank + 1) for rank in range(len(domains))]
+
+    rows = []
+    employee_id = 0
+    while len(rows) < count:
+        employee_id += 1
+        first = rng.choice(FIRST_NAMES)
+        last = rng.choice(LAST_NAMES)
+        name = f"{first} {last} {employee_id}"
+        email = f"{first.lower()}.{last.lower()}{employee_id}@example.com"
+        access = "admin" if rng.random() < 0.05 else "user"
+        home_domain = rng.choices(domains, weights=domain_weights)[0]
+
+        for _ in range(rng.randint(*skills_per_employee)):
+            domain = home_domain if rng.random() < 0.7 else rng.choices(domains, weights=domain_weights)[0]
+            category = rng.choice(list(SKILL_TAXONOMY[domain]))
+            if long_tail_skills and rng.random() < 0.05:
+                skill = f"{category} Tool {rng.randint(1, long_tail_skills)}"
+            else:
+                skill = rng.choice(SKILL_TAXONOMY[domain][category])
+            skill_rate = min(5, max(1, round(rng.gauss(3, 1.1))))
+            interest_rate = min(5, max(1, round(rng.gauss(3.4, 1.0))))
+            rows.append({
+                "id": len(rows) + 1,
+                "Name": name,
+                "Domain": domain,
+                "Category": category,
+                "Sub Category": skill,
+                "Skill Rate": skill_rate,
+                "Interest Rate": interest_rate,
+                "Access": access,
+                "Email": email
+            })
+            if len(rows) >= count:
+                break
+    return rows
@@ -0,0 +1,10 @@
+import os
+import sys
+
+# Tests import the backend modules directly, and main without any external service or warm-up
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.update(
+    GEMINI_API_KEY="", NEXT_PUBLIC_SUPABASE_URL="", NEXT_PUBLIC_SUPABASE_ANON_KEY="", STARTUP_WARMUP="off",
+    EMPLOYEE_SNAPSHOT_PATH="", COURSE_CACHE_PATH="", ANALYSIS_CACHE_PATH="", COURSE_CATALOG_WARMER="0",
+    METRICS_DIR="", LOG_LEVEL="error",
+)
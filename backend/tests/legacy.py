@@ -0,0 +1,273 @@
+"""The baseline's query, chart and summary code, kept verbatim as the reference the rewritten paths must match.
+
+The original walks the rows with list comprehensions and full sorts;
+main.py answers from EmployeeStore, the top-k engine and the aggregation
+pass instead. Ties keep the rows' input order (Python's sort is stable),
+so rows are listed by id when results are compared.
+"""
+
+
+def generate_visualizations(processed_data, analysis_result, all_employee_data):
+    """Generate visualization data based on the query and processed data"""
+    try:
+        visualization_type = analysis_result.get('visualization_type', 'bar_chart')
+        visualizations = []
+        
+        if not processed_data and not all_employee_data:
+            return None
+        
+        data_to_use = processed_data if processed_data else all_employee_data
+        
+        # Skill Distribution Bar Chart
+        if visualization_type in ['bar_chart', 'chart']:
+            skill_counts = {}
+            for emp in data_to_use:
+                skill = emp.get('Sub Category', 'Unknown')
+                skill_counts[skill] = skill_counts.get(skill, 0) + 1
+            
+            # Sort by count and take top 10
+            top_skills = sorted(skill_counts.items(), key=lambda x: x[1], reverse=True)[:10]
+            
+            visualizations.append({
+                "type": "bar_chart",
+                "title": "Top Skills Distribution",
+                "data": {
+                    "labels": [skill for skill, count in top_skills],
+                    "datasets": [{
+                        "label": "Number of Employees",
+                        "data": [count for skill, count in top_skills],
+                        "backgroundColor": "rgba(59, 130, 246, 0.6)",
+                        "borderColor": "rgba(59, 130, 246, 1)",
+                        "borderWidth": 1
+                    }]
+                }
+            })
+        
+        # Domain Distribution Pie Chart
+        if visualization_type in ['pie_chart', 'chart'] or len(visualizations) < 2:
+            domain_counts = {}
+            for emp in data_to_use:
+                domain = emp.get('Domain', 'Unknown')
+                domain_counts[domain] = domain_counts.get(domain, 0) + 1
+            
+            visualizations.append({
+                "type": "pie_chart",
+                "title": "Domain Distribution",
+                "data": {
+                    "labels": list(domain_counts.keys()),
+                    "datasets": [{
+                        "data": list(domain_counts.values()),
+                        "backgroundColor": [
+                            "#FF6384", "#36A2EB", "#FFCE56", "#4BC0C0", 
+                            "#9966FF", "#FF9F40", "#FF6384", "#C9CBCF"
+                        ]
+                    }]
+                }
+            })
+        
+        # Skill vs Interest Heatmap
+        if visualization_type == 'heatmap' or 'heatmap' in analysis_result.get('context', '').lower():
+            # Create skill-interest matrix
+            skill_interest_matrix = {}
+            for emp in data_to_use:
+                skill_rate = emp.get('Skill Rate', 0)
+                interest_rate = emp.get('Interest Rate', 0)
+                key = f"{skill_rate},{interest_rate}"
+                skill_interest_matrix[key] = skill_interest_matrix.get(key, 0) + 1
+            
+            heatmap_data = []
+            for skill in range(1, 6):
+                row = []
+                for interest in range(1, 6):
+                    count = skill_interest_matrix.get(f"{skill},{interest}", 0)
+                    row.append(count)
+                heatmap_data.append(row)
+            
+            visualizations.append({
+                "type": "heatmap",
+                "title": "Skill vs Interest Level Heatmap",
+                "data": {
+                    "matrix": heatmap_data,
+                    "xLabels": ["1", "2", "3", "4", "5"],
+                    "yLabels": ["1", "2", "3", "4", "5"],
+                    "xTitle": "Interest Level",
+                    "yTitle": "Skill Level"
+                }
+            })
+        
+        # Skill Level Distribution
+        if len(visualizations) < 3:
+            skill_levels = {}
+            for emp in data_to_use:
+                level = emp.get('Skill Rate', 0)
+                skill_levels[f"Level {level}"] = skill_levels.get(f"Level {level}", 0) + 1
+            
+            visualizations.append({
+                "type": "radar_chart",
+                "title": "Skill Level Distribution",
+                "data": {
+                    "labels": ["Level 1", "Level 2", "Level 3", "Level 4", "Level 5"],
+                    "datasets": [{
+                        "label": "Number of Employees",
+                        "data": [
+                            skill_levels.get("Level 1", 0),
+                            skill_levels.get("Level 2", 0),
+                            skill_levels.get("Level 3", 0),
+                            skill_levels.get("Level 4", 0),
+                            skill_levels.get("Level 5", 0)
+                        ],
+                        "backgroundColor": "rgba(34, 197, 94, 0.2)",
+                        "borderColor": "rgba(34, 197, 94, 1)",
+                        "pointBackgroundColor": "rgba(34, 197, 94, 1)",
+                        "borderWidth": 2
+                    }]
+                }
+            })
+        
+        return visualizations if visualizations else None
+        
+    except Exception as e:
+        print(f"Error generating visualizations: {str(e)}")
+        return None
+
+
+def generate_data_summary(data, analysis_result):
+    """Generate a summary of the processed data for better context"""
+    if not data:
+        return "No employees found matching the criteria."
+    
+    summary_parts = []
+    
+    # Basic count
+    summary_parts.append(f"Found {len(data)} employees")
+    
+    # Domain distribution if relevant
+    domains = {}
+    skill_rates = []
+    interest_rates = []
+    
+    for emp in data:
+        domain = emp.get('Domain', 'Unknown')
+        domains[domain] = domains.get(domain, 0) + 1
+        skill_rates.append(emp.get('Skill Rate', 0))
+        interest_rates.append(emp.get('Interest Rate', 0))
+    
+    if len(domains) > 1:
+        top_domain = max(domains, key=domains.get)
+        summary_parts.append(f"Most from {top_domain} ({domains[top_domain]} employees)")
+    
+    # Skill statistics
+    if skill_rates:
+        avg_skill = sum(skill_rates) / len(skill_rates)
+        summary_parts.append(f"Average skill rating: {avg_skill:.1f}/5")
+    
+    return ". ".join(summary_parts)
+
+def process_employee_query(employee_data, analysis_result):
+    """Enhanced employee data processing with better filtering and sorting"""
+    try:
+        query_type = analysis_result.get('query_type', 'general_info')
+        filters = analysis_result.get('filters', {})
+        limit = analysis_result.get('limit', 10)
+        sort_by = analysis_result.get('sort_by', 'Skill Rate')
+        sort_order = analysis_result.get('sort_order', 'desc')
+        
+        # Start with all data
+        filtered_data = employee_data.copy()
+        
+        # Apply filters with fuzzy matching
+        if filters.get('domain'):
+            domain_filter = filters['domain'].lower()
+            filtered_data = [emp for emp in filtered_data 
+                           if domain_filter in emp.get('Domain', '').lower()]
+        
+        if filters.get('category'):
+            category_filter = filters['category'].lower()
+            filtered_data = [emp for emp in filtered_data 
+                           if category_filter in emp.get('Category', '').lower()]
+        
+        if filters.get('skill_name'):
+            skill_filter = filters['skill_name'].lower()
+            filtered_data = [emp for emp in filtered_data 
+                           if (skill_filter in emp.get('Sub Category', '').lower() or
+                               skill_filter in emp.get('Category', '').lower() or
+                               skill_filter in emp.get('Domain', '').lower())]
+        
+        if filters.get('min_skill_rate'):
+            min_skill = filters['min_skill_rate']
+            filtered_data = [emp for emp in filtered_data 
+                           if emp.get('Skill Rate', 0) >= min_skill]
+        
+        if filters.get('max_skill_rate'):
+            max_skill = filters['max_skill_rate']
+            filtered_data = [emp for emp in filtered_data 
+                           if emp.get('Skill Rate', 0) <= max_skill]
+        
+        if filters.get('min_interest_rate'):
+            min_interest = filters['min_interest_rate']
+            filtered_data = [emp for emp in filtered_data 
+                           if emp.get('Interest Rate', 0) >= min_interest]
+        
+        if filters.get('access_level'):
+            access_filter = filters['access_level'].lower()
+            filtered_data = [emp for emp in filtered_data 
+                           if emp.get('Access', '').lower() == access_filter]
+        
+        # Apply query-specific logic
+        if query_type == 'top_performers':
+            filtered_data.sort(key=lambda x: (x.get('Skill Rate', 0), x.get('Interest Rate', 0)), reverse=True)
+        elif query_type == 'upskilling_needs':
+            # High interest but lower skill
+            filtered_data = [emp for emp in filtered_data 
+                           if emp.get('Skill Rate', 0) <= 3 and emp.get('Interest Rate', 0) >= 3]
+            filtered_data.sort(key=lambda x: (x.get('Interest Rate', 0), -x.get('Skill Rate', 0)), reverse=True)
+        elif query_type == 'skill_search':
+            filtered_data.sort(key=lambda x: x.get('Skill Rate', 0), reverse=True)
+        else:
+            # Default sorting based on analysis
+            if sort_by in ['Skill Rate', 'Interest Rate']:
+                filtered_data.sort(key=lambda x: x.get(sort_by, 0), reverse=(sort_order == 'desc'))
+            else:
+                filtered_data.sort(key=lambda x: str(x.get(sort_by, '')), reverse=(sort_order == 'desc'))
+        
+        # Apply limit
+        return filtered_data[:limit]
+        
+    except Exception as e:
+        print(f"Error processing query: {str(e)}")
+        return employee_data[:10]  # Return first 10 as fallback
+
+
+def handle_query_rule_based(user_message, employee_data, user_role):
+    """Enhanced rule-based query handling with better pattern matching"""
+    message_lower = user_message.lower()
+    
+    # Check for visualization keywords
+    viz_keywords = ['chart', 'graph', 'heatmap', 'visualize', 'plot', 'distribution', 'breakdown']
+    needs_viz = any(keyword in message_lower for keyword in viz_keywords)
+    
+    # Top performers query
+    if any(keyword in message_lower for keyword in ['top', 'best', 'highest', 'skilled', 'performer', 'excellent']):
+        sorted_data = sorted(employee_data, key=lambda x: (x.get('Skill Rate', 0), x.get('Interest Rate', 0)), reverse=True)
+        limited_data = sorted_data[:10]
+        
+        visualizations = None
+        if needs_viz:
+            visualizations = generate_visualizations(limited_data, {'visualization_type': 'bar_chart'}, employee_data)
+        
+        return {
+            "response": f"Here are the top {len(limited_data)} employees with the highest skill ratings. These employees have demonstrated excellent proficiency in their respective domains and show strong engagement.",
+            "data": {"employees": limited_data},
+            "visualizations": visualizations
+        }
+    
+    # Default response with visualization if requested
+    response_data = {
+        "response": f"I found {len(employee_data)} employees in our database. I can help you find specific skills, identify top performers, or suggest training opportunities. Try being more specific about what you're looking for!",
+        "data": {"employees": employee_data[:5]}
+    }
+    
+    if needs_viz:
+        response_data["visualizations"] = generate_visualizations(employee_data[:20], {'visualization_type': 'bar_chart'}, employee_data)
+    
+    return response_data
@@ -0,0 +1,118 @@
+"""In-memory stand-in for the supabase client's postgrest query builder over the dhanush table.
+
+Used by the tests and by `benchmark.py plan`. It applies the predicates,
+ordering and limit a QueryPlan sends with Postgres semantics: no order is
+promised beyond the ORDER BY (matching rows are shuffled first, so rows
+tied on every sort column come back in arbitrary order), comparisons with
+NULL are never true, and NULLs sort first when descending unless told
+otherwise. `rtt` and `bandwidth` (MB/s) simulate the network.
+"""
+import json
+import random
+import re
+import time
+
+# One `column.operator.value` condition of an or=() filter; quoted columns and values may hold dots and commas
+_CONDITION = re.compile(r'\s*("[^"]+"|[^,.]+)\.(\w+)\.("[^"]*"|[^,]*)\s*(?:,|$)')
+
+
+def _like(pattern):
+    return re.compile("^" + ".*".join(re.escape(part) for part in pattern.split("%")) + "$", re.IGNORECASE | re.DOTALL)
+
+
+def _value(text):
+    """A filter value as PostgREST would compare it to a number column"""
+    try:
+        return float(text)
+    except ValueError:
+        return text
+
+
+def _condition(column, operator, value):
+    column = column.strip('"')
+    value = value.strip('"')
+    if operator == 'ilike':
+        regex = _like(value)
+        return lambda row: row.get(column) is not None and regex.match(str(row[column])) is not None
+    if operator == 'is' and value == 'null':
+        return lambda row: row.get(column) is None
+    compare = {'gte': lambda a, b: a >= b, 'lte': lambda a, b: a <= b, 'eq': lambda a, b: a == b}[operator]
+    value = _value(value)
+    return lambda row: row.get(column) is not None and compare(row[column], value)
+
+
+class StubQuery:
+    def __init__(self, table, rtt=0, bandwidth=None, on_transfer=None):
+        self.table = table
+        self.rtt = rtt
+        self.bandwidth = bandwidth
+        self.on_transfer = on_transfer
+        self.columns = None
+        self.predicates = []
+        self.orders = []
+        self.row_limit = None
+        self.rng = random.Random(len(table))
+
+    def select(self, columns):
+        if columns != "*":
+            self.columns = [column.strip().strip('"') for column in columns.split(",")]
+        return self
+
+    def ilike(self, column, pattern):
+        self.predicates.append(_condition(column, 'ilike', pattern))
+        return self
+
+    def or_(self, filters):
+        conditions = [_condition(*match.groups()) for match in _CONDITION.finditer(filters) if match.group(0).strip()]
+        self.predicates.append(lambda row: any(condition(row) for condition in conditions))
+        return self
+
+    def gte(self, column, value):
+        self.predicates.append(_condition(column, 'gte', str(value)))
+        return self
+
+    def lte(self, column, value):
+        self.predicates.append(_condition(column, 'lte', str(value)))
+        return self
+
+    def order(self, column, desc=False, nullsfirst=None):
+        self.orders.append((column.strip('"'), desc, desc if nullsfirst is None else nullsfirst))
+        return self
+
+    def limit(self, count):
+        self.row_limit = count
+        return self
+
+    def execute(self):
+        rows = [row for row in self.table if all(predicate(row) for predicate in self.predicates)]
+        self.rng.shuffle(rows)
+        for column, desc, nullsfirst in reversed(self.orders):
+            # NULLs sort above every value when they should come first in a descending order or last in an ascending one
+            null_key = (2,) if nullsfirst == desc else (0,)
+            rows.sort(key=lambda row: null_key if row.get(column) is None else (1, row.get(column)), reverse=desc)
+        if self.row_limit is not None:
+            rows = rows[:self.row_limit]
+        if self.columns:
+            rows = [{column: row[column] for column in self.columns if column in row} for row in rows]
+        payload = json.dumps(rows).encode()
+        if self.rtt or self.bandwidth:
+            time.sleep(self.rtt + (len(payload) / (self.bandwidth * 1024 * 1024) if self.bandwidth else 0))
+        if self.on_transfer is not None:
+            self.on_transfer(len(payload))
+        return type("StubResult", (), {"data": json.loads(payload)})()
+
+
+class StubSupabase:
+    """Stand-in for a supabase client: table() starts a StubQuery over `rows`"""
+
+    def __init__(self, rows, rtt=0, bandwidth=None):
+        self.rows = rows
+        self.rtt = rtt
+        self.bandwidth = bandwidth
+        self.bytes_transferred = 0
+
+    def table(self, name):
+        return StubQuery(self.rows, self.rtt, self.bandwidth, on_transfer=self._count)
+
+    def _count(self, size):
+        self.bytes_transferred += size
@@ -0,0 +1,54 @@
+"""Random assistant analyses over synthetic employee rows, for comparing query paths with each other"""
+import random
+
+from synthetic_data import generate_employee_rows
+
+TEXT_TERMS = ["python", "data", "cloud", "react", "learning", "sec", "ops", "an", "script", "nosuchskill"]
+QUERY_TYPES = ["top_performers", "upskilling_needs", "skill_search", "domain_filter", "general_info", "statistics",
+               "skill_distribution", "visualization_request"]
+SORT_FIELDS = ["Skill Rate", "Interest Rate", "Name", "Domain", "Sub Category"]
+
+
+def employee_rows(count, seed=1):
+    """Synthetic rows listed by id, the order the legacy code's stable sorts kept for ties"""
+    rows = generate_employee_rows(count, seed=seed)
+    assert [emp["id"] for emp in rows] == sorted(emp["id"] for emp in rows)
+    return rows
+
+
+def odd_rows(rng, count, ratings):
+    """Synthetic rows with some ratings replaced by `ratings` values and some rating/Domain columns missing"""
+    rows = employee_rows(count, seed=rng.randint(0, 1000))
+    for row in rows:
+        for column in ("Skill Rate", "Interest Rate"):
+            if rng.random() < 0.2:
+                row[column] = rng.choice(ratings)
+            if rng.random() < 0.05:
+                del row[column]
+        if rng.random() < 0.05:
+            del row["Domain"]
+    return rows
+
+
+def random_analysis(rng):
+    filters = {}
+    for key in ("domain", "category", "skill_name"):
+        if rng.random() < 0.3:
+            filters[key] = rng.choice(TEXT_TERMS)
+    for key in ("min_skill_rate", "max_skill_rate", "min_interest_rate"):
+        if rng.random() < 0.25:
+            filters[key] = rng.randint(1, 5)
+    if rng.random() < 0.15:
+        filters["access_level"] = rng.choice(["admin", "user"])
+    return {
+        "query_type": rng.choice(QUERY_TYPES),
+        "filters": filters,
+        "limit": rng.choice([1, 5, 10, 20, 50, 200]),
+        "sort_by": rng.choice(SORT_FIELDS),
+        "sort_order": rng.choice(["asc", "desc"]),
+    }
+
+
+def random_analyses(count, seed=0):
+    rng = random.Random(seed)
+    return [random_analysis(rng) for _ in range(count)]
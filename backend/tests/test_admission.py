@@ -0,0 +1,87 @@
+import threading
+import time
+
+import pytest
+
+from admission import ConcurrencyLimiter, OverloadedError, RateLimiter
+
+
+def test_limiter_sheds_when_queue_is_full():
+    shed = []
+    limiter = ConcurrencyLimiter("test", max_concurrent=1, queue_timeout=1, max_queue=0, on_shed=shed.append)
+    limiter.acquire()
+    with pytest.raises(OverloadedError):
+        limiter.acquire()
+    assert shed == ["queue_full"]
+    limiter.release()
+    limiter.acquire()
+    assert limiter.active() == 1
+
+
+def test_limiter_waiter_times_out():
+    limiter = ConcurrencyLimiter("test", max_concurrent=1, queue_timeout=0.05, max_queue=1)
+    limiter.acquire()
+    started = time.monotonic()
+    with pytest.raises(OverloadedError):
+        limiter.acquire()
+    assert time.monotonic() - started >= 0.05
+    stats = limiter.stats()
+    assert stats["queue_timeout"] == 1
+    assert stats["queue_depth"] == 0
+
+
+def test_limiter_hands_slot_to_waiter():
+    limiter = ConcurrencyLimiter("test", max_concurrent=1, queue_timeout=2, max_queue=1)
+    limiter.acquire()
+    admitted = threading.Event()
+
+    def wait():
+        limiter.acquire()
+        admitted.set()
+
+    waiter = threading.Thread(target=wait)
+    waiter.start()
+    time.sleep(0.05)
+    assert limiter.queue_depth() == 1
+    limiter.release()
+    waiter.join(1)
+    assert admitted.is_set()
+    assert limiter.active() == 1
+
+
+def test_rate_limiter_bucket_per_key():
+    limiter = RateLimiter(rate=0.001, burst=2)
+    assert limiter.allow("a") and limiter.allow("a")
+    assert not limiter.available("a")
+    assert not limiter.allow("a")
+    assert limiter.available("b")
+    assert limiter.allow("b")
+    assert limiter.stats()["limited"] == 1
+
+
+def test_rate_limiter_available_takes_no_token():
+    limiter = RateLimiter(rate=0.001, burst=1)
+    for _ in range(3):
+        assert limiter.available("a")
+    assert limiter.allow("a")
+
+
+def test_rate_limiter_refills_and_evicts():
+    limiter = RateLimiter(rate=100, burst=1, max_keys=2)
+    assert limiter.allow("a")
+    time.sleep(0.02)
+    assert limiter.allow("a")
+    limiter.allow("b")
+    limiter.allow("c")
+    assert limiter.stats()["keys"] == 2
+
+
+def test_rate_limit_of_zero_allows_everything():
+    limiter = RateLimiter(rate=0, burst=0)
+    assert all(limiter.allow("a") for _ in range(100))
+
+
+def test_forwarded_for_is_not_trusted_by_default():
+    import main
+    # Otherwise any client could choose its own rate-limit key with an X-Forwarded-For header
+    assert main.app.wsgi_app.x_for == 0
@@ -0,0 +1,35 @@
+import random
+
+import pytest
+
+import main
+from aggregates import aggregate_employees
+from tests import legacy
+from tests.query_cases import odd_rows
+
+CHART_ANALYSES = [{"visualization_type": kind} for kind in ("bar_chart", "pie_chart", "chart", "heatmap", "histogram")] + [
+    {"visualization_type": "bar_chart", "context": "show a HEATMAP too"}]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_charts_match_legacy(seed):
+    rng = random.Random(seed)
+    # Values the old string-keyed buckets skipped ("4.0", 6) next to ones they counted ("4")
+    rows = odd_rows(rng, 800, [0, 6, 4.0, 2.5, "4", "x", True])
+    for analysis in CHART_ANALYSES:
+        for processed in (rows[:rng.randint(1, 50)], []):
+            expected = legacy.generate_visualizations(processed, analysis, rows)
+            assert main.generate_visualizations(processed, analysis, rows) == expected
+            if processed:
+                assert main.generate_visualizations(processed, analysis, rows, aggregate_employees(processed)) == expected
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_data_summary_matches_legacy(seed):
+    rng = random.Random(seed)
+    rows = odd_rows(rng, 300, [0, 4.0, 2.5])
+    for data in (rows, rows[:1], [row for row in rows if row.get("Domain") == "Cloud"], []):
+        expected = legacy.generate_data_summary(data, {})
+        assert main.generate_data_summary(data, {}) == expected
+        assert main.generate_data_summary(data, {}, aggregate_employees(data) if data else None) == expected
+
@@ -0,0 +1,80 @@
+import random
+
+import pytest
+
+import main
+from aggregates import AggregateCube, aggregate_employees
+from employee_cache import EmployeeSnapshotCache
+from tests import legacy
+from tests.query_cases import employee_rows, odd_rows, random_analyses
+
+VISUALIZATION_TYPES = ["bar_chart", "pie_chart", "chart", "heatmap", "histogram"]
+RULE_BASED_MESSAGES = [
+    "show me the top performers in a chart",
+    "who needs training? plot it",
+    "python experts",
+    "skill distribution breakdown",
+    "heatmap of everyone",
+]
+
+
+@pytest.fixture
+def snapshot_rows(monkeypatch):
+    rows = employee_rows(2000, seed=11)
+    cache = EmployeeSnapshotCache(lambda: rows)
+    monkeypatch.setattr(main, "employee_cache", cache)
+    return cache.get().rows
+
+
+def chart_analyses():
+    rng = random.Random(5)
+    for analysis in random_analyses(200, seed=6):
+        analysis["needs_visualization"] = True
+        analysis["visualization_type"] = rng.choice(VISUALIZATION_TYPES)
+        yield analysis
+
+
+def test_charts_match_legacy_for_snapshot_rows(snapshot_rows):
+    for analysis in chart_analyses():
+        processed = main.process_employee_query(snapshot_rows, analysis)
+        # What the response paths pass: one pass over the rows shown, shared with the data summary
+        aggregates = aggregate_employees(processed) if processed else None
+        expected = legacy.generate_visualizations(legacy.process_employee_query(snapshot_rows, analysis), analysis, snapshot_rows)
+        assert main.generate_visualizations(processed, analysis, snapshot_rows, aggregates) == expected, analysis
+
+
+def test_no_op_filter_keeps_the_charts(snapshot_rows):
+    analysis = {"query_type": "skill_distribution", "filters": {"domain": "data"}, "limit": 10,
+                "needs_visualization": True, "visualization_type": "pie_chart"}
+    with_no_op = dict(analysis, filters={"domain": "data", "min_skill_rate": 1})
+    charts = [main.handle_query_rule_based("", snapshot_rows, "admin", a)["visualizations"] for a in (analysis, with_no_op)]
+    assert charts[0] == charts[1]
+    assert sum(charts[0][0]["data"]["datasets"][0]["data"]) == 10
+
+
+def test_empty_results_chart_the_whole_snapshot(snapshot_rows):
+    analysis = {"query_type": "skill_search", "filters": {"skill_name": "nosuchskill"}, "limit": 10,
+                "needs_visualization": True, "visualization_type": "chart"}
+    assert main.process_employee_query(snapshot_rows, analysis) == []
+    expected = legacy.generate_visualizations([], analysis, snapshot_rows)
+    assert main.generate_visualizations([], analysis, snapshot_rows) == expected
+
+
+def test_rule_based_charts_match_legacy(snapshot_rows):
+    for message in RULE_BASED_MESSAGES:
+        expected = legacy.handle_query_rule_based(message, snapshot_rows, "admin").get("visualizations")
+        assert main.handle_query_rule_based(message, snapshot_rows, "admin").get("visualizations") == expected, message
+
+
+def test_cube_rollup_matches_a_pass_over_the_rows():
+    rows = odd_rows(random.Random(1), 1000, [0, 6, 4.0, "4"])
+    cube = AggregateCube(rows[:900])
+    for row in rows[900:]:
+        cube.add_row(row)
+    for row in rows[:50]:
+        cube.remove_row(row)
+    expected = aggregate_employees(rows[50:])
+    actual = cube.rollup()
+    assert (actual.count, actual.skill_counts, actual.domain_counts, actual.skill_interest, actual.skill_levels) == \
+        (expected.count, expected.skill_counts, expected.domain_counts, expected.skill_interest, expected.skill_levels)
+    assert actual.average_skill() == pytest.approx(expected.average_skill())
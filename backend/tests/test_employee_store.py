@@ -0,0 +1,82 @@
+import random
+
+import pytest
+
+from employee_store import EmployeeStore
+from tests.query_cases import TEXT_TERMS, employee_rows
+
+
+def legacy_filter(rows, domain=None, category=None, skill_name=None, access=None,
+                  min_skill=None, max_skill=None, min_interest=None):
+    """The list comprehensions process_employee_query ran before the store"""
+    if domain:
+        rows = [emp for emp in rows if domain.lower() in emp.get('Domain', '').lower()]
+    if category:
+        rows = [emp for emp in rows if category.lower() in emp.get('Category', '').lower()]
+    if skill_name:
+        term = skill_name.lower()
+        rows = [emp for emp in rows if term in emp.get('Sub Category', '').lower()
+                or term in emp.get('Category', '').lower() or term in emp.get('Domain', '').lower()]
+    if min_skill:
+        rows = [emp for emp in rows if emp.get('Skill Rate', 0) >= min_skill]
+    if max_skill:
+        rows = [emp for emp in rows if emp.get('Skill Rate', 0) <= max_skill]
+    if min_interest:
+        rows = [emp for emp in rows if emp.get('Interest Rate', 0) >= min_interest]
+    if access:
+        rows = [emp for emp in rows if emp.get('Access', '').lower() == access.lower()]
+    return rows
+
+
+def random_filters(rng):
+    filters = {}
+    for key in ("domain", "category", "skill_name"):
+        if rng.random() < 0.4:
+            filters[key] = rng.choice(TEXT_TERMS + ["A", "Py", "DATA SCI"])
+    for key in ("min_skill", "max_skill", "min_interest"):
+        if rng.random() < 0.3:
+            filters[key] = rng.randint(1, 5)
+    if rng.random() < 0.2:
+        filters["access"] = rng.choice(["admin", "USER"])
+    return filters
+
+
+@pytest.fixture(scope="module")
+def rows():
+    rows = employee_rows(3000, seed=21)
+    # Rows missing columns, which the legacy filters read as '' or 0
+    for row in rows[::97]:
+        del row["Category"]
+    for row in rows[5::89]:
+        del row["Skill Rate"]
+    return rows
+
+
+@pytest.mark.parametrize("use_numpy", [False, True])
+def test_filter_matches_legacy_list_filters(rows, use_numpy):
+    store = EmployeeStore(rows, use_numpy=use_numpy)
+    rng = random.Random(4)
+    for _ in range(300):
+        filters = random_filters(rng)
+        assert store.get_rows(store.filter(**filters)) == legacy_filter(rows, **filters), filters
+
+
+def test_patched_store_matches_a_fresh_build(rows):
+    rows = [dict(row) for row in rows[:500]]
+    store = EmployeeStore(list(rows))
+    rng = random.Random(9)
+    for step in range(200):
+        action = rng.choice(["append", "update", "delete"])
+        if action == "append":
+            row = dict(rng.choice(rows), id=10_000 + step, Domain="Quantum " + rng.choice(TEXT_TERMS))
+            store.append_row(row)
+        elif action == "update":
+            row_id = rng.randrange(store.size)
+            store.update_row(row_id, dict(store.rows[row_id], **{"Skill Rate": rng.randint(1, 5)}))
+        else:
+            store.delete_row(rng.randrange(store.size))
+    fresh = EmployeeStore(list(store.rows))
+    for filters in [random_filters(rng) for _ in range(100)] + [{"domain": "quantum"}]:
+        assert store.get_rows(store.filter(**filters)) == fresh.get_rows(fresh.filter(**filters)), filters
+        for ranking in ("top_performers", "upskilling_needs", "Interest Rate"):
+            assert store.top_k(store.filter(**filters), 20, ranking) == fresh.top_k(fresh.filter(**filters), 20, ranking)
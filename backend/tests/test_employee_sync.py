@@ -0,0 +1,152 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from aggregates import aggregate_employees
+from employee_cache import EmployeeSnapshot
+from employee_store import EmployeeStore
+from synthetic_data import generate_employee_rows
+from tests.postgrest_stub import StubSupabase
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def key(emp):
+    return emp.get("id")
+
+
+def stamp(second):
+    return f"2026-01-01T00:{second // 60:02d}:{second % 60:02d}+00:00"
+
+
+def assert_matches_table(snapshot, table):
+    """The synced store and cube answer like ones built fresh from the source table"""
+    assert len(snapshot.rows) == len(table)
+    fresh = EmployeeStore(list(table.values()))
+    store = snapshot.store
+    for kwargs in ({"skill_name": "python"}, {"domain": "cloud", "min_skill": 3}, {}):
+        expected = fresh.get_rows(fresh.top_k(fresh.filter(**kwargs), 25, "top_performers"))
+        assert store.get_rows(store.top_k(store.filter(**kwargs), 25, "top_performers")) == expected
+    expected = aggregate_employees(table.values())
+    actual = snapshot.cube.rollup()
+    assert (actual.count, actual.skill_counts, actual.domain_counts) == \
+        (expected.count, expected.skill_counts, expected.domain_counts)
+
+
+def test_apply_changes_matches_a_fresh_build_of_the_table():
+    rows = generate_employee_rows(500)
+    table = {emp["id"]: dict(emp) for emp in rows}
+    snapshot = EmployeeSnapshot(rows, 1)
+    changes = []
+    for emp_id in range(1, 60):
+        # Edits to the columns the old (Email, Sub Category) key was made of must update the row in place
+        record = dict(table[emp_id], **{"Sub Category": "Rust", "Skill Rate": 5})
+        table[emp_id] = record
+        changes.append({"type": "UPDATE", "record": record})
+    for emp_id in range(60, 80):
+        changes.append({"type": "DELETE", "record": table.pop(emp_id)})
+    inserted = dict(rows[0], id=10_000, Name="New Hire")
+    table[inserted["id"]] = inserted
+    changes.append({"type": "INSERT", "record": inserted})
+
+    assert snapshot.apply_changes(changes, key) == len(changes)
+    assert_matches_table(snapshot, table)
+    # Replaying the batch changes nothing
+    snapshot.apply_changes(changes[:59] + changes[60:], key)
+    assert_matches_table(snapshot, table)
+
+
+def test_apply_changes_swaps_in_a_new_list():
+    rows = generate_employee_rows(50)
+    before = [dict(emp) for emp in rows]
+    snapshot = EmployeeSnapshot(rows, 1)
+    store = snapshot.store
+    snapshot.apply_changes([{"type": "DELETE", "record": rows[0]}, {"type": "UPDATE", "record": dict(rows[1], Name="x")}], key)
+    # Readers still iterating the old list see it unchanged
+    assert rows == before
+    assert snapshot.rows is not rows
+    assert store.rows is snapshot.rows
+    assert snapshot.owns(rows) and snapshot.owns(snapshot.rows)
+    assert not snapshot.owns(list(snapshot.rows))
+
+
+def test_owns_forgets_lists_after_a_few_syncs():
+    rows = generate_employee_rows(10)
+    snapshot = EmployeeSnapshot(rows, 1)
+    for index in range(EmployeeSnapshot.PREVIOUS_ROWS_KEPT + 1):
+        snapshot.apply_changes([{"type": "UPDATE", "record": dict(rows[0], Name=str(index))}], key)
+    assert not snapshot.owns(rows)
+
+
+def test_no_changes_leaves_the_rows_alone():
+    rows = generate_employee_rows(10)
+    snapshot = EmployeeSnapshot(rows, 1)
+    assert snapshot.apply_changes([], key) == 0
+    assert snapshot.rows is rows
+
+
+def test_failed_batch_publishes_nothing():
+    rows = generate_employee_rows(200)
+    table = {emp["id"]: dict(emp) for emp in rows}
+    snapshot = EmployeeSnapshot(rows, 1)
+    snapshot.store, snapshot.cube
+    changes = [{"type": "UPDATE", "record": dict(rows[index], **{"Skill Rate": 1})} for index in range(10)]
+    changes.insert(5, {"type": "INSERT", "record": {"Name": "no id"}})
+
+    def strict_key(emp):
+        return emp["id"]
+
+    with pytest.raises(KeyError):
+        snapshot.apply_changes(changes, strict_key)
+    assert snapshot.rows is rows
+    assert_matches_table(snapshot, table)
+
+
+@pytest.fixture
+def synced_table(monkeypatch):
+    import main
+
+    table = []
+    for index, emp in enumerate(generate_employee_rows(20)):
+        table.append(dict(emp, updated_at=stamp(index)))
+    monkeypatch.setattr(main, "supabase_configured", True)
+    monkeypatch.setattr(main, "get_supabase_client", lambda: StubSupabase(table))
+    monkeypatch.setattr(main, "EMPLOYEE_KEY_COLUMNS", ("id",))
+    return main, table
+
+
+def test_late_commit_below_the_high_water_mark_is_synced(synced_table):
+    main, table = synced_table
+    snapshot = EmployeeSnapshot([dict(emp) for emp in table], 1)
+    # The first sync re-reads the overlap window once; nothing changed since
+    snapshot.apply_changes(main.load_employee_changes(snapshot), main.employee_row_key)
+    assert main.load_employee_changes(snapshot) == []
+
+    # Committed after the last sync but stamped before its high-water mark
+    table[15] = dict(table[15], **{"Sub Category": "Rust", "updated_at": stamp(17)})
+    changes = main.load_employee_changes(snapshot)
+    assert [change["record"]["id"] for change in changes] == [table[15]["id"]]
+    snapshot.apply_changes(changes, main.employee_row_key)
+    assert len(snapshot.rows) == len(table)
+    assert [emp["Sub Category"] for emp in snapshot.rows if emp["id"] == table[15]["id"]] == ["Rust"]
+    assert main.load_employee_changes(snapshot) == []
+
+
+def test_rows_without_a_key_fall_back_to_full_reloads(synced_table):
+    main, table = synced_table
+    rows = [dict(emp) for emp in table]
+    del rows[3]["id"]
+    assert main.load_employee_changes(EmployeeSnapshot(rows, 1)) is None
+
+
+def import_main(**env):
+    return subprocess.run([sys.executable, "-c", "import main; print(main.snapshot_file.path)"], cwd=BACKEND,
+                          env=dict(os.environ, **env), capture_output=True, text=True, timeout=60)
+
+
+def test_updated_at_sync_on_editable_key_columns_fails_at_startup():
+    result = import_main(EMPLOYEE_SYNC_MODE="updated_at", EMPLOYEE_KEY_COLUMNS="Email,Sub Category")
+    assert result.returncode != 0
+    assert "immutable primary key" in result.stderr
@@ -0,0 +1,54 @@
+import pytest
+
+from employee_store import EmployeeStore
+from intent_classifier import IntentClassifier
+from llm_json import coerce_analysis
+from tests.query_cases import employee_rows
+
+CONFIDENT = [
+    ("Show me the top 5 Python experts", "top_performers", {"skill_name": "Python"}, 5, None),
+    ("Who needs training in Cloud?", "upskilling_needs", {"domain": "Cloud"}, 10, None),
+    ("How many admins have skill rating above 3?", "statistics", {"access_level": "admin", "min_skill_rate": 4}, 10, None),
+    ("list Kubernetes engineers with skill at least 4", "skill_search", {"skill_name": "Kubernetes", "min_skill_rate": 4}, 10, None),
+    ("pie chart of Machine Learning", "visualization_request", {"category": "Machine Learning"}, 10, "pie_chart"),
+]
+
+LEFT_TO_THE_LLM = [
+    "compare python and java developers",
+    "What should I learn next for my career?",
+    "heatmap of skill vs interest for Data Science",
+    "Python and Java experts",
+    "who has interest below 3",
+]
+
+
+@pytest.fixture(scope="module")
+def store():
+    return EmployeeStore(employee_rows(2000))
+
+
+@pytest.mark.parametrize("message, query_type, filters, limit, chart", CONFIDENT)
+def test_confident_questions_take_the_fast_path(store, message, query_type, filters, limit, chart):
+    analysis = IntentClassifier().fast_path(message, store)
+    assert analysis is not None
+    assert (analysis["query_type"], analysis["filters"], analysis["limit"]) == (query_type, filters, limit)
+    assert analysis["needs_visualization"] == (chart is not None)
+    if chart:
+        assert analysis["visualization_type"] == chart
+    # The same schema the LLM analysis is coerced to
+    assert coerce_analysis(analysis) == analysis
+
+
+@pytest.mark.parametrize("message", LEFT_TO_THE_LLM)
+def test_unclear_questions_go_to_the_llm(store, message):
+    assert IntentClassifier().fast_path(message, store) is None
+
+
+def test_record_counts_requests_by_path():
+    classifier = IntentClassifier()
+    classifier.record({"query_type": "top_performers"}, True)
+    classifier.record({"query_type": "top_performers"}, False)
+    stats = classifier.stats()
+    assert (stats["requests"], stats["fast_path"], stats["llm"]) == (2, 1, 1)
+    assert stats["by_query_type"] == {"top_performers": 1}
+    assert stats["fast_path_rate"] == 0.5
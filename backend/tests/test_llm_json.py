@@ -0,0 +1,86 @@
+import json
+
+import pytest
+
+from llm_json import DEFAULT_LIMIT, JsonExtractor, coerce_analysis, coerce_courses, extract_json
+
+
+def test_extracts_json_between_prose_and_code_fences():
+    text = 'Sure! Here it is:\n```json\n{"query_type": "skill_search", "filters": {}}\n```\nAnything else?'
+    assert extract_json(text) == {"query_type": "skill_search", "filters": {}}
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 1000])
+def test_feed_in_chunks_finds_value_when_it_closes(chunk_size):
+    value = {"a": [1, {"b": "x}]"}], "c": "quote \" and { brace"}
+    text = 'prefix [1, "]"] ' + json.dumps(value) + " trailing {"
+    extractor = JsonExtractor(convert=lambda v: v if isinstance(v, dict) else None)
+    results = [extractor.feed(text[i:i + chunk_size]) for i in range(0, len(text), chunk_size)]
+    assert extractor.done
+    assert extractor.value == value
+    closing = text.index(json.dumps(value)) + len(json.dumps(value))
+    # Nothing is returned before the closing bracket has been fed
+    assert all(result is None for result in results[:(closing - 1) // chunk_size])
+
+
+def test_unterminated_string_waits_for_more_text():
+    extractor = JsonExtractor()
+    assert extractor.feed('{"text": "has a } inside') is None
+    assert not extractor.done
+    assert extractor.feed(' and ends here"}') == {"text": "has a } inside and ends here"}
+
+
+def test_unterminated_reply_yields_nothing():
+    assert extract_json('{"query_type": "top_performers", "filters": {"domain": "Cloud') is None
+
+
+def test_mismatched_brackets_fall_back_to_nested_value():
+    assert extract_json('{"outer": [1, 2}, {"query_type": "statistics"}') == {"query_type": "statistics"}
+    assert extract_json('[{"title": "a"}}') == {"title": "a"}
+
+
+def test_wrong_shape_then_right_shape():
+    text = 'Example: {"foo": 1}. Answer: {"query_type": "skill_search", "filters": {"skill_name": "Python"}}'
+    analysis = extract_json(text, coerce_analysis)
+    assert analysis["query_type"] == "skill_search"
+    assert analysis["filters"] == {"skill_name": "Python"}
+
+
+def test_no_json_at_all():
+    assert extract_json("I can't help with that.") is None
+    assert extract_json(None) is None
+
+
+def test_coerce_analysis_drops_echoed_placeholders():
+    analysis = coerce_analysis({
+        "query_type": "made_up",
+        "filters": {"domain": "domain_if_mentioned", "category": "N/A", "skill_name": " Python ",
+                    "min_skill_rate": "4", "max_skill_rate": 9, "access_level": "ADMIN"},
+        "limit": "0",
+        "sort_by": "skill_rate",
+        "sort_order": "ascending",
+        "needs_visualization": "yes",
+    })
+    assert analysis["query_type"] == "general_info"
+    assert analysis["filters"] == {"skill_name": "Python", "min_skill_rate": 4, "access_level": "admin"}
+    assert analysis["limit"] == DEFAULT_LIMIT
+    assert analysis["sort_by"] == "Skill Rate"
+    assert analysis["sort_order"] == "asc"
+    assert analysis["needs_visualization"] is True
+    assert analysis["visualization_type"] == "bar_chart"
+
+
+def test_coerce_analysis_rejects_other_shapes():
+    assert coerce_analysis({"courses": []}) is None
+    assert coerce_analysis(["query_type"]) is None
+
+
+def test_coerce_courses_fills_defaults_and_needs_enough_titles():
+    courses = coerce_courses({"courses": [{"title": " A ", "duration": 6, "rating": "9"}, {"title": "B"}, {"name": "x"},
+                                          {"title": "C", "features": "Labs"}]})
+    assert [course["title"] for course in courses] == ["A", "B", "C"]
+    assert courses[0]["duration"] == "6 weeks"
+    assert courses[0]["rating"] == 5.0
+    assert courses[1]["provider"] == "Online"
+    assert courses[2]["features"] == ["Labs"]
+    assert coerce_courses([{"title": "A"}, {"title": ""}]) is None
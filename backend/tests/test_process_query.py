@@ -0,0 +1,36 @@
+import random
+
+import pytest
+
+import main
+from employee_store import top_k
+from tests import legacy
+from tests.query_cases import employee_rows, random_analyses
+
+
+@pytest.fixture(scope="module")
+def rows():
+    return employee_rows(4000, seed=17)
+
+
+def test_results_match_legacy(rows):
+    for analysis in random_analyses(500, seed=8):
+        expected = legacy.process_employee_query(rows, analysis)[:main.MAX_RESULT_ROWS]
+        assert main.process_employee_query(rows, analysis) == expected, analysis
+
+
+@pytest.mark.parametrize("limit", [None, -3, 0, True, "10", 5000])
+def test_unusual_limits_match_legacy(rows, limit):
+    for analysis in random_analyses(40, seed=9):
+        analysis["limit"] = limit
+        expected = legacy.process_employee_query(rows, analysis)[:main.MAX_RESULT_ROWS]
+        assert main.process_employee_query(rows, analysis) == expected, analysis
+
+
+def test_top_k_is_a_sorted_slice():
+    rng = random.Random(2)
+    items = [rng.randint(0, 20) for _ in range(500)]
+    for k in (0, 1, 7, 499, 500, 900):
+        for reverse in (False, True):
+            key = lambda item: item % 5
+            assert top_k(items, k, key=key, reverse=reverse) == sorted(items, key=key, reverse=reverse)[:k]
@@ -0,0 +1,51 @@
+import random
+
+import pytest
+
+import main
+from tests import legacy
+from tests.postgrest_stub import StubSupabase
+from tests.query_cases import employee_rows, random_analyses
+
+
+@pytest.fixture
+def rows_with_gaps():
+    rows = employee_rows(3000, seed=7)
+    rng = random.Random(7)
+    for row in rows:
+        # Few distinct ratings, so most of any ranking is ties, and some rows without one
+        if rng.random() < 0.05:
+            row["Skill Rate"] = None
+        if rng.random() < 0.05:
+            row["Interest Rate"] = None
+    return rows
+
+
+@pytest.fixture
+def planned(monkeypatch, rows_with_gaps):
+    monkeypatch.setattr(main, "get_supabase_client", lambda: StubSupabase(rows_with_gaps))
+    return main.fetch_planned_rows
+
+
+def test_planned_rows_give_the_local_results(rows_with_gaps, planned):
+    for analysis in random_analyses(300, seed=1):
+        expected = main.process_employee_query(rows_with_gaps, analysis)
+        got = main.process_employee_query(planned(analysis), analysis)
+        assert [row["id"] for row in got] == [row["id"] for row in expected], analysis
+
+
+def test_unrated_rows_stay_under_upper_bounds(monkeypatch, rows_with_gaps):
+    rows = rows_with_gaps[:500]
+    monkeypatch.setattr(main, "get_supabase_client", lambda: StubSupabase(rows))
+    unrated = [row for row in rows if row["Skill Rate"] is None and (row["Interest Rate"] or 0) >= 3]
+    # Upskilling implies a maximum skill rate of 3
+    analysis = {"query_type": "upskilling_needs", "filters": {}, "limit": len(rows)}
+    ids = {row["id"] for row in main.fetch_planned_rows(analysis)}
+    assert unrated and all(row["id"] in ids for row in unrated)
+
+
+def test_local_order_matches_legacy_sort():
+    rows = employee_rows(3000, seed=3)
+    for analysis in random_analyses(300, seed=2):
+        expected = legacy.process_employee_query(rows, analysis)[:main.MAX_RESULT_ROWS]
+        assert main.process_employee_query(rows, analysis) == expected, analysis
@@ -0,0 +1,84 @@
+import threading
+import time
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+def run_concurrently(count, target):
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+
+def test_overlapping_calls_share_one_result():
+    flight = SingleFlight("test")
+    calls = []
+    results = []
+    release = threading.Event()
+
+    def work():
+        calls.append(1)
+        release.wait(1)
+        return "value"
+
+    def request():
+        results.append(flight.do("key", work))
+
+    threading.Timer(0.1, release.set).start()
+    run_concurrently(5, request)
+    assert len(calls) == 1
+    assert sorted(results) == [("value", False)] + [("value", True)] * 4
+    assert flight.in_flight() == 0
+    assert flight.stats()["coalesced"] == 4
+
+
+def test_followers_get_the_leaders_exception():
+    flight = SingleFlight("test")
+    errors = []
+
+    def work():
+        time.sleep(0.1)
+        raise ValueError("upstream failed")
+
+    def request():
+        try:
+            flight.do("key", work)
+        except ValueError as e:
+            errors.append(e)
+
+    run_concurrently(3, request)
+    assert len(errors) == 3
+    assert flight.in_flight() == 0
+
+
+def test_nothing_is_kept_after_the_call():
+    flight = SingleFlight("test")
+    assert flight.do("key", lambda: 1) == (1, False)
+    assert flight.do("key", lambda: 2) == (2, False)
+
+
+def test_follower_stops_waiting_and_runs_itself():
+    flight = SingleFlight("test", wait_timeout=0.05)
+    release = threading.Event()
+    leader = threading.Thread(target=lambda: flight.do("key", lambda: release.wait(1)))
+    leader.start()
+    time.sleep(0.02)
+    assert flight.do("key", lambda: "own") == ("own", False)
+    release.set()
+    leader.join(1)
+    assert flight.stats()["wait_timeouts"] == 1
+
+
+def test_different_keys_do_not_wait_for_each_other():
+    flight = SingleFlight("test")
+    release = threading.Event()
+    leader = threading.Thread(target=lambda: flight.do("a", lambda: release.wait(1)))
+    leader.start()
+    time.sleep(0.02)
+    assert flight.do("b", lambda: "b") == ("b", False)
+    release.set()
+    leader.join(1)
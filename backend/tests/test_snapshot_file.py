@@ -0,0 +1,97 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from snapshot_file import SnapshotFile, SnapshotFileError, decode_rows, encode_rows
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ROWS = [
+    {"id": 1, "Name": "Ana", "Skill Rate": 5, "Interest Rate": 4.5, "Access": "admin", "tags": ["a", "b"]},
+    {"id": 2, "Name": "Bo", "Skill Rate": 1.0, "Interest Rate": None, "Access": True},
+    {"id": 3, "Name": "Cy", "Skill Rate": 5},
+]
+
+
+def test_encode_round_trips_values_types_and_missing_keys():
+    rows = decode_rows(memoryview(encode_rows(ROWS)), len(ROWS))
+    assert rows == ROWS
+    assert type(rows[1]["Skill Rate"]) is float
+    assert rows[1]["Access"] is True
+    assert "Access" not in rows[2]
+
+
+def test_wide_vocabularies_round_trip():
+    rows = [{"id": i, "Name": f"name {i}"} for i in range(70000)]
+    assert decode_rows(memoryview(encode_rows(rows)), len(rows)) == rows
+
+
+def test_save_then_load(tmp_path):
+    snapshot = SnapshotFile(str(tmp_path / "employees.bin"))
+    snapshot.save(ROWS, version=7)
+    rows, info = snapshot.load()
+    assert rows == ROWS
+    assert info["version"] == 7
+    assert info["rows"] == len(ROWS)
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+
+@pytest.mark.parametrize("content", [b"", b"EMPSNAP\0", b"x" * 100])
+def test_empty_short_or_foreign_file_is_a_snapshot_error(tmp_path, content):
+    path = tmp_path / "employees.bin"
+    path.write_bytes(content)
+    snapshot = SnapshotFile(str(path))
+    with pytest.raises(SnapshotFileError):
+        snapshot.load()
+    assert snapshot.stats()["load_errors"] == 1
+
+
+def test_missing_file_is_a_snapshot_error(tmp_path):
+    with pytest.raises(SnapshotFileError):
+        SnapshotFile(str(tmp_path / "missing.bin")).load()
+
+
+def test_truncated_or_corrupt_payload_is_detected(tmp_path):
+    path = tmp_path / "employees.bin"
+    snapshot = SnapshotFile(str(path))
+    snapshot.save(ROWS, version=1)
+    data = path.read_bytes()
+    path.write_bytes(data[:-5])
+    with pytest.raises(SnapshotFileError, match="truncated"):
+        snapshot.load()
+    corrupt = bytearray(data)
+    corrupt[-3] ^= 0xFF
+    path.write_bytes(bytes(corrupt))
+    with pytest.raises(SnapshotFileError, match="checksum"):
+        snapshot.load()
+
+
+def test_save_async_skips_saves_within_min_interval(tmp_path):
+    snapshot = SnapshotFile(str(tmp_path / "employees.bin"), min_interval=300)
+    assert snapshot.save_async(ROWS, 1)
+    snapshot.flush(5)
+    assert not snapshot.save_async(ROWS, 2)
+    assert snapshot.load()[1]["version"] == 1
+
+
+def import_main(env):
+    return subprocess.run([sys.executable, "-c", "import main; print(main.snapshot_file.path)"], cwd=BACKEND,
+                          env=env, capture_output=True, text=True, timeout=60)
+
+
+def test_snapshot_file_is_opt_in():
+    env = dict(os.environ)
+    env.pop("EMPLOYEE_SNAPSHOT_PATH", None)
+    result = import_main(env)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().splitlines()[-1] == "None"
+
+
+def test_empty_snapshot_file_does_not_stop_startup(tmp_path):
+    path = tmp_path / "employees.bin"
+    path.write_bytes(b"")
+    result = import_main(dict(os.environ, EMPLOYEE_SNAPSHOT_PATH=str(path), STARTUP_WARMUP="blocking"))
+    assert result.returncode == 0, result.stderr
+    assert "Can't load employee snapshot" in result.stdout
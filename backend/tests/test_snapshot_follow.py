@@ -0,0 +1,74 @@
+import os
+
+import pytest
+
+import main
+from employee_cache import EmployeeSnapshotCache
+from snapshot_file import SnapshotFile
+from tests.query_cases import employee_rows
+
+
+@pytest.fixture
+def leader_file(monkeypatch, tmp_path):
+    snapshot_file = SnapshotFile(str(tmp_path / "employee_snapshot.bin"), min_interval=0)
+    monkeypatch.setattr(main, "snapshot_file", snapshot_file)
+    monkeypatch.setattr(main, "_followed_snapshot_file", None)
+    return snapshot_file
+
+
+def test_unchanged_rows_keep_the_snapshot():
+    rows = employee_rows(200)
+    cache = EmployeeSnapshotCache(lambda: rows, ttl=0, stale_ttl=0)
+    snapshot = cache.get()
+    store = snapshot.store
+    cache.follow(lambda: cache.peek().rows)
+    cache.invalidate()
+    assert cache.get() is snapshot and snapshot.store is store
+    assert cache.stats()["unchanged_refreshes"] == 1 and not cache.invalidated
+
+
+def test_saving_the_same_rows_leaves_the_file_alone(leader_file):
+    rows = employee_rows(200)
+    assert leader_file.save(rows, 1)
+    stamp = os.stat(leader_file.path)
+    assert not leader_file.save(list(rows), 2)
+    assert os.stat(leader_file.path).st_ino == stamp.st_ino
+    assert leader_file.stats()["unchanged_saves"] == 1
+
+
+def test_save_requested_during_a_save_is_written_after_it(leader_file):
+    rows = employee_rows(2000)
+    newest = rows[:-1]
+    assert leader_file.save_async(rows, 1)
+    leader_file.save_async(rows[:-2], 2)
+    leader_file.save_async(newest, 3)
+    leader_file.flush(5)
+    assert leader_file.load()[0] == newest
+
+
+def test_follower_reloads_only_when_the_leader_saves(monkeypatch, leader_file):
+    rows = employee_rows(200)
+    leader_file.save(rows, 1)
+    follower = EmployeeSnapshotCache(lambda: None, ttl=0, stale_ttl=0)
+    monkeypatch.setattr(main, "employee_cache", follower)
+    follower.follow(main.load_followed_snapshot)
+
+    first = follower.get()
+    assert first.rows == rows
+    assert follower.get() is first
+
+    changed = [dict(row, **{"Skill Rate": 5}) for row in rows]
+    leader_file.save(changed, 2)
+    second = follower.get()
+    assert second is not first and second.rows == changed
+    assert follower.get() is second
+    assert follower.stats()["unchanged_refreshes"] == 2
+
+
+def test_follower_without_a_file_keeps_its_snapshot(monkeypatch, leader_file):
+    rows = employee_rows(50)
+    follower = EmployeeSnapshotCache(lambda: rows, ttl=0, stale_ttl=0)
+    monkeypatch.setattr(main, "employee_cache", follower)
+    snapshot = follower.get()
+    follower.follow(main.load_followed_snapshot)
+    assert follower.get() is snapshot
@@ -0,0 +1,33 @@
+import random
+
+from synthetic_data import SKILL_TAXONOMY
+from text_index import NgramIndex
+
+VALUES = sorted({skill for categories in SKILL_TAXONOMY.values() for skills in categories.values() for skill in skills}
+                | {category for categories in SKILL_TAXONOMY.values() for category in categories} | set(SKILL_TAXONOMY))
+
+
+def test_search_is_exactly_substring_matching():
+    index = NgramIndex(VALUES)
+    lowered = [value.lower() for value in VALUES]
+    rng = random.Random(3)
+    terms = ["", "a", "Py", "script", "zzz", "data sci", "learning"]
+    for _ in range(300):
+        value = rng.choice(VALUES)
+        start = rng.randrange(len(value))
+        terms.append(value[start:start + rng.randint(1, 8)])
+    for term in terms:
+        assert index.search(term) == [i for i, value in enumerate(lowered) if term.lower() in value], term
+
+
+def test_added_values_are_searchable():
+    index = NgramIndex(["Python", "Java"])
+    assert index.add("Jython") == 2
+    assert index.search("ython") == [0, 2]
+
+
+def test_rank_finds_misspelled_values():
+    index = NgramIndex(VALUES)
+    best, similarity = index.rank("pyhton")[0]
+    assert VALUES[best] == "Python" and similarity >= 0.75
+    assert index.rank("completely unrelated words") == []
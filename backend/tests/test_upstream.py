@@ -0,0 +1,97 @@
+import gc
+
+import pytest
+
+from admission import ConcurrencyLimiter, OverloadedError
+from upstream import CircuitBreaker, CircuitOpenError, GeminiClient, UpstreamClient
+
+
+class Model:
+    def __init__(self, chunks=("a", "b"), error=None):
+        self.chunks = chunks
+        self.error = error
+
+    def generate_content(self, prompt, stream=False, request_options=None):
+        def chunks():
+            yield from self.chunks
+            if self.error:
+                raise self.error
+        return chunks()
+
+
+def client(model, **kwargs):
+    limiter = ConcurrencyLimiter("gemini", max_concurrent=1, queue_timeout=0.01, max_queue=0)
+    upstream = UpstreamClient("gemini", retries=0, breaker=CircuitBreaker(failure_threshold=1, reset_timeout=60))
+    return GeminiClient(lambda: model, upstream, limiter=limiter, **kwargs), limiter
+
+
+@pytest.mark.parametrize("finish", ["read", "close", "drop"])
+def test_stream_gives_its_slot_back_however_it_ends(finish):
+    gemini, limiter = client(Model())
+    stream = gemini.generate_content("prompt", stream=True)
+    if finish == "read":
+        assert list(stream) == ["a", "b"]
+    elif finish == "close":
+        next(stream)
+        stream.close()
+    else:
+        del stream
+        gc.collect()
+    assert limiter.active() == 0
+    assert gemini.upstream.breaker.state == "closed"
+
+
+def test_error_while_reading_a_stream_opens_the_breaker():
+    gemini, limiter = client(Model(error=ConnectionError("reset")))
+    with pytest.raises(ConnectionError):
+        list(gemini.generate_content("prompt", stream=True))
+    assert limiter.active() == 0
+    assert gemini.upstream.breaker.state == "open"
+
+
+def test_transient_errors_are_retried_then_open_the_breaker():
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        raise ConnectionError("refused")
+
+    upstream = UpstreamClient("supabase", retries=2, backoff=0, breaker=CircuitBreaker(failure_threshold=1, reset_timeout=60))
+    with pytest.raises(ConnectionError):
+        upstream.call(flaky)
+    assert len(calls) == 3
+    # An open breaker fails fast without calling the upstream
+    with pytest.raises(CircuitOpenError):
+        upstream.call(flaky)
+    assert len(calls) == 3
+    assert upstream.stats()["short_circuited"] == 1
+
+
+def test_bad_request_is_not_retried_and_keeps_the_breaker_closed():
+    calls = []
+
+    def bad():
+        calls.append(1)
+        raise ValueError("bad filter")
+
+    upstream = UpstreamClient("supabase", retries=2, backoff=0, breaker=CircuitBreaker(failure_threshold=1))
+    with pytest.raises(ValueError):
+        upstream.call(bad)
+    assert len(calls) == 1
+    assert upstream.breaker.state == "closed"
+
+
+def test_half_open_breaker_lets_one_trial_through():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.allow() == "trial"
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_refused_admission_makes_no_call():
+    gemini, limiter = client(Model(), admit=lambda: False)
+    with pytest.raises(OverloadedError):
+        gemini.generate_content("prompt", stream=True)
+    assert limiter.stats()["admitted"] == 0
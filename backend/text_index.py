@@ -0,0 +1,79 @@
+from difflib import SequenceMatcher
+
+
+class NgramIndex:
+    """Trigram index over a small vocabulary of lowercased strings.
+
+    `search` resolves a term to the ids of every value containing it as a
+    substring (exactly `term in value`): candidates come from intersecting the
+    term's trigram posting sets and are then verified, so the cost depends on
+    the postings rather than on the vocabulary size. Terms shorter than `n`
+    fall back to a direct scan of the vocabulary. `rank` gathers candidates
+    sharing any padded trigram with the term and orders them by edit
+    similarity, for typo-tolerant lookups.
+    """
+
+    def __init__(self, values, n=3):
+        self.n = n
+        self.values = []
+        self._postings = {}
+        self._padded_postings = {}
+        for value in values:
+            self.add(value)
+
+    def add(self, value):
+        """Index one more value; returns its id (the next vocabulary position)"""
+        value = value.lower()
+        value_id = len(self.values)
+        self.values.append(value)
+        for gram in self._grams(value):
+            self._postings.setdefault(gram, set()).add(value_id)
+        for gram in self._padded_grams(value):
+            self._padded_postings.setdefault(gram, set()).add(value_id)
+        return value_id
+
+    def search(self, term):
+        """Ids of values containing `term` (case-insensitive), in vocabulary order"""
+        term = term.lower()
+        if len(term) < self.n:
+            return [value_id for value_id, value in enumerate(self.values) if term in value]
+
+        postings = [self._postings.get(gram) for gram in self._grams(term)]
+        if not all(postings):
+            return []
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates &= posting
+            if not candidates:
+                return []
+        values = self.values
+        return sorted(value_id for value_id in candidates if term in values[value_id])
+
+    def rank(self, term, limit=5, min_similarity=0.75):
+        """(value_id, similarity) pairs for the closest values to `term`, best first"""
+        term = term.lower()
+        candidates = set()
+        for gram in self._padded_grams(term):
+            candidates.update(self._padded_postings.get(gram, ()))
+
+        scored = []
+        matcher = SequenceMatcher(b=term, autojunk=False)
+        for value_id in candidates:
+            matcher.set_seq1(self.values[value_id])
+            if matcher.real_quick_ratio() < min_similarity or matcher.quick_ratio() < min_similarity:
+                continue
+            similarity = matcher.ratio()
+            if similarity >= min_similarity:
+                scored.append((value_id, round(similarity, 3)))
+        scored.sort(key=lambda item: (-item[1], item[0]))
+        return scored[:limit]
+
+    def _grams(self, text):
+        n = self.n
+        return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+    def _padded_grams(self, text):
+        if not text:
+            return set()
+        return self._grams(f"  {text} ")
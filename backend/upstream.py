@@ -0,0 +1,314 @@
+import random
+import threading
+import time
+
+from admission import OverloadedError
+
+
+class CircuitOpenError(Exception):
+    """The upstream is marked unhealthy and calls are short-circuited to the fallback path"""
+
+
+def is_retryable(error):
+    """Client errors (bad request, bad key, not found) won't go away on retry; everything else might"""
+    code = getattr(error, 'code', None)
+    if isinstance(code, int) and 400 <= code < 500 and code not in (408, 429):
+        return False
+    return not isinstance(error, (ValueError, TypeError, KeyError))
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures and lets one trial call through after `reset_timeout` seconds"""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+        self.trips = 0
+
+    @property
+    def state(self):
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self):
+        """Whether a call may go to the upstream now ("trial" when it is the half-open trial call)"""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_running:
+                self._trial_running = True
+                return "trial"
+            return False
+
+    def available(self):
+        """Whether a call would currently be let through, without claiming the half-open trial"""
+        return self.state == "closed" or (self.state == "half_open" and not self._trial_running)
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def release_trial(self):
+        """Give up the half-open trial without an outcome (the call was interrupted), so another call can take it"""
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    self.trips += 1
+                self._opened_at = time.monotonic()
+            self._trial_running = False
+
+
+class ClosingStream:
+    """Iterator over a streamed response that reports how it ended, exactly once.
+
+    `on_close(error)` runs when the chunks are exhausted (error None), when
+    reading them raises (that exception), or when the stream is closed or
+    garbage collected before its end (ABANDONED) - including a stream that
+    was dropped before its first chunk, which a generator's finally would
+    never see.
+    """
+
+    ABANDONED = object()
+
+    def __init__(self, chunks, on_close):
+        self._chunks = iter(chunks)
+        self._on_close = on_close
+        self._closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._closed:
+            raise StopIteration
+        try:
+            return next(self._chunks)
+        except StopIteration:
+            self._finish(None)
+            raise
+        except BaseException as e:
+            self._finish(e)
+            raise
+
+    def close(self):
+        if self._closed:
+            return
+        close = getattr(self._chunks, 'close', None)
+        try:
+            if close is not None:
+                close()
+        finally:
+            self._finish(self.ABANDONED)
+
+    def __del__(self):
+        self.close()
+
+    def _finish(self, error):
+        if self._closed:
+            return
+        self._closed = True
+        self._on_close(error)
+
+
+class UpstreamClient:
+    """Retry, backoff and circuit-breaking policy for calls to one upstream service.
+
+    call() runs `func` up to 1 + `retries` times, sleeping a jittered
+    exponential backoff between attempts, and records latency and error
+    counters. `timeout` bounds one attempt and is enforced by the
+    underlying client (callers pass it on); `deadline` bounds the whole
+    call from its start - a retry is only made while a full attempt (and
+    its backoff) still fits in it, so a call never runs much past
+    `deadline` seconds however many retries are allowed. While the breaker
+    is open every call raises CircuitOpenError immediately, so callers drop
+    straight to their fallback instead of waiting on an unhealthy upstream.
+    """
+
+    def __init__(self, name, timeout=30, retries=2, backoff=0.5, max_backoff=8, breaker=None, deadline=45):
+        self.name = name
+        self.timeout = timeout
+        self.deadline = deadline
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.breaker = breaker or CircuitBreaker()
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "successes": 0, "failures": 0, "retries": 0, "retries_over_deadline": 0,
+                       "short_circuited": 0, "stream_errors": 0, "latency_ms_total": 0.0, "max_latency_ms": 0.0,
+                       "last_error": None}
+
+    def available(self):
+        return self.breaker.available()
+
+    def call(self, func, *args, **kwargs):
+        return self._call(func, args, kwargs)
+
+    def stream(self, func, *args, **kwargs):
+        """call() for a streamed response, returned as a ClosingStream.
+
+        The breaker only hears how the call went once the stream has been
+        read: a connection that drops or times out halfway through the
+        chunks counts as a failure, and a stream abandoned before its end
+        gives up the half-open trial it may hold.
+        """
+        trial, chunks = self._call(func, args, kwargs, streaming=True)
+
+        def settle(error):
+            if error is ClosingStream.ABANDONED or not isinstance(error, (Exception, type(None))):
+                if trial:
+                    self.breaker.release_trial()
+                return
+            if error is not None and is_retryable(error):
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            if error is not None:
+                with self._lock:
+                    self._stats["stream_errors"] += 1
+                    self._stats["last_error"] = f"{type(error).__name__}: {str(error)[:200]}"
+
+        return ClosingStream(chunks, settle)
+
+    def _call(self, func, args, kwargs, streaming=False):
+        """Run func with retries; a successful streamed call returns (holds the trial, result) unsettled"""
+        trial = self.breaker.allow()
+        if not trial:
+            with self._lock:
+                self._stats["short_circuited"] += 1
+            raise CircuitOpenError(f"{self.name} circuit is open")
+        trial = trial == "trial"
+
+        started = time.perf_counter()
+        attempt = 0
+        settled = False
+        try:
+            while True:
+                try:
+                    result = func(*args, **kwargs)
+                except Exception as e:
+                    if attempt < self.retries and is_retryable(e):
+                        delay = self._backoff_delay(attempt + 1)
+                        if time.perf_counter() - started + delay + self.timeout <= self.deadline:
+                            attempt += 1
+                            with self._lock:
+                                self._stats["retries"] += 1
+                            time.sleep(delay)
+                            continue
+                        with self._lock:
+                            self._stats["retries_over_deadline"] += 1
+                    if is_retryable(e):
+                        self.breaker.record_failure()
+                    else:
+                        # The upstream answered - it's the request that was bad
+                        self.breaker.record_success()
+                    settled = True
+                    self._record(started, error=e)
+                    raise
+                settled = True
+                self._record(started)
+                if streaming:
+                    return trial, result
+                self.breaker.record_success()
+                return result
+        finally:
+            if not settled and trial:
+                # Interrupted by a BaseException (e.g. the worker shutting down) - don't hold the half-open trial forever
+                self.breaker.release_trial()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        completed = stats["successes"] + stats["failures"]
+        stats["avg_latency_ms"] = round(stats.pop("latency_ms_total") / completed, 2) if completed else None
+        stats["max_latency_ms"] = round(stats["max_latency_ms"], 2)
+        stats["circuit"] = self.breaker.state
+        stats["circuit_trips"] = self.breaker.trips
+        stats["timeout_seconds"] = self.timeout
+        stats["deadline_seconds"] = self.deadline
+        return stats
+
+    def _backoff_delay(self, attempt):
+        """Full-jitter exponential backoff"""
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1)))
+
+    def _record(self, started, error=None):
+        elapsed = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self._stats["calls"] += 1
+            self._stats["failures" if error else "successes"] += 1
+            self._stats["latency_ms_total"] += elapsed
+            self._stats["max_latency_ms"] = max(self._stats["max_latency_ms"], elapsed)
+            if error:
+                self._stats["last_error"] = f"{type(error).__name__}: {str(error)[:200]}"
+
+
+class GeminiClient:
+    """One shared Gemini model behind an UpstreamClient.
+
+    Exposes the generate_content() the endpoints already call on a model,
+    so it can be passed anywhere a GenerativeModel was. The model (and the
+    connection its client keeps open) is created on first use and reused by
+    every request instead of being rebuilt per call. With a `limiter`
+    (admission.ConcurrencyLimiter) every call holds one of its slots - a
+    streamed call until the stream has been read, closed or dropped - and
+    raises OverloadedError when none frees up in time. `admit()`, when
+    given, is asked before every call and a False raises OverloadedError
+    too, so only calls that really reach Gemini are charged to a user.
+    """
+
+    def __init__(self, model_factory, upstream, limiter=None, admit=None):
+        self.model_factory = model_factory
+        self.upstream = upstream
+        self.limiter = limiter
+        self.admit = admit
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = self.model_factory()
+        return self._model
+
+    def available(self):
+        return self.upstream.available()
+
+    def generate_content(self, prompt, stream=False):
+        if self.admit is not None and not self.admit():
+            raise OverloadedError(f"{self.upstream.name} call not admitted")
+        if self.limiter is None:
+            return self._generate(prompt, stream)
+        self.limiter.acquire()
+        try:
+            response = self._generate(prompt, stream)
+        except BaseException:
+            self.limiter.release()
+            raise
+        if not stream:
+            self.limiter.release()
+            return response
+        return ClosingStream(response, lambda error: self.limiter.release())
+
+    def _generate(self, prompt, stream):
+        call = self.upstream.stream if stream else self.upstream.call
+        return call(
+            self.model.generate_content, prompt, stream=stream,
+            request_options={"timeout": self.upstream.timeout}
+        )
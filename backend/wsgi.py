@@ -0,0 +1,9 @@
+"""Production WSGI entry point.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+main.py's __main__ block runs Flask's development server instead.
+"""
+from main import app
+
+__all__ = ["app"]
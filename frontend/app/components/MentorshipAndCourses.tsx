@@ -2,7 +2,7 @@ import { useState, useEffect } from 'react';
 import { useParams } from 'react-router-dom';
 import supabase from '../config/supabaseClient';
 import CourseRecommendationModal from './CourseRecommendationModal';
-import { getCourseRecommendations } from '../services/apiService';
+import { getBatchCourseRecommendations, getCourseRecommendations } from '../services/apiService';
 
 type SkillEntry = {
   id: number;
@@ -213,35 +213,29 @@ export const MentorshipAndCourses = () => {
       // Create some fallback recommendations if API fails
       const fallbackRecommendations: TopCourseRecommendation[] = [];
       
-      // Process each skill sequentially to ensure we get results
+      // One batched request for all skills; results come back in the same order
       const results: TopCourseRecommendation[] = [];
+      const batchCourses = await getBatchCourseRecommendations(weakestSkills);
       
-      for (const skill of weakestSkills) {
-        try {
-          console.log(`Requesting course recommendations for skill: ${skill['Sub Category']}`);
-          const courses = await getCourseRecommendations(skill);
-          
-          if (Array.isArray(courses) && courses.length > 0) {
-            // Take the top recommendation for this skill
-            results.push({
-              ...courses[0],
-              skillName: skill['Sub Category'],
-              domain: skill.Domain,
-              category: skill.Category,
-              skillRate: skill['Skill Rate'],
-              interestRate: skill['Interest Rate']
-            });
-            console.log(`Successfully got recommendation for ${skill['Sub Category']}`);
-          } else {
-            // If API doesn't return valid data, create a fallback recommendation
-            fallbackRecommendations.push(createFallbackCourse(skill));
-            console.log(`Using fallback for ${skill['Sub Category']}`);
-          }
-        } catch (err) {
-          console.error(`Error fetching course for ${skill['Sub Category']}:`, err);
+      weakestSkills.forEach((skill, index) => {
+        const courses = batchCourses[index];
+        
+        if (Array.isArray(courses) && courses.length > 0) {
+          // Take the top recommendation for this skill
+          results.push({
+            ...courses[0],
+            skillName: skill['Sub Category'],
+            domain: skill.Domain,
+            category: skill.Category,
+            skillRate: skill['Skill Rate'],
+            interestRate: skill['Interest Rate']
+          });
+        } else {
+          // If API doesn't return valid data, create a fallback recommendation
           fallbackRecommendations.push(createFallbackCourse(skill));
+          console.log(`Using fallback for ${skill['Sub Category']}`);
         }
-      }
+      });
       
       // Combine API results with fallbacks if needed to ensure we have at least 3 recommendations
       const combinedResults = [...results];
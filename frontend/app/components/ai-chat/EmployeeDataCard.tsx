@@ -1,4 +1,5 @@
-import React from 'react';
+import React, { useState } from 'react';
+import { API_BASE_URL } from '@/app/lib/constants';
 import { BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer, PieChart, Pie, Cell, RadarChart, PolarGrid, PolarAngleAxis, PolarRadiusAxis, Radar } from 'recharts';
 
 interface EmployeeData {
@@ -21,6 +22,10 @@ interface VisualizationData {
 interface EmployeeDataCardProps {
   data: {
     employees: EmployeeData[];
+    // Server-side pagination: total matches and the ID/cursor for fetching further pages
+    total?: number;
+    query_id?: string;
+    next_cursor?: number | null;
   };
   visualizations?: VisualizationData[];
 }
@@ -76,8 +81,36 @@ const HeatmapChart: React.FC<{ data: any; title: string }> = ({ data, title }) =
 };
 
 export const EmployeeDataCard: React.FC<EmployeeDataCardProps> = ({ data, visualizations }) => {
+  // Further pages of the ranked results are fetched from the server on demand
+  const [employees, setEmployees] = useState<EmployeeData[]>(data?.employees ?? []);
+  const [nextCursor, setNextCursor] = useState<number | null>(data?.next_cursor ?? null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
+  const [loadError, setLoadError] = useState<string | null>(null);
+
   if (!data?.employees || !Array.isArray(data.employees)) return null;
 
+  const total = data.total ?? employees.length;
+
+  const loadMore = async () => {
+    if (!data.query_id || nextCursor === null) return;
+    setIsLoadingMore(true);
+    setLoadError(null);
+    try {
+      const response = await fetch(`${API_BASE_URL}/ai-assistant/results/${data.query_id}?cursor=${nextCursor}`);
+      const result = await response.json();
+      if (!response.ok || !result.data) {
+        throw new Error(result.error || `Server responded with ${response.status}`);
+      }
+      setEmployees(prev => [...prev, ...result.data.employees]);
+      setNextCursor(result.data.next_cursor ?? null);
+    } catch (error) {
+      console.error('Error loading more employee results:', error);
+      setLoadError(error instanceof Error ? error.message : 'Could not load more results');
+    } finally {
+      setIsLoadingMore(false);
+    }
+  };
+
   const renderVisualization = (viz: VisualizationData, index: number) => {
     switch (viz.type) {
       case 'bar_chart':
@@ -213,7 +246,7 @@ export const EmployeeDataCard: React.FC<EmployeeDataCardProps> = ({ data, visual
         <div className="p-4 border-b border-gray-200">
           <div className="flex items-center justify-between">
             <h4 className="font-semibold text-lg text-gray-800">
-              Employee Results ({data.employees.length})
+              Employee Results ({employees.length < total ? `${employees.length} of ${total}` : total})
             </h4>
             <div className="flex items-center space-x-4 text-xs text-gray-500">
               <div className="flex items-center space-x-1">
@@ -230,7 +263,7 @@ export const EmployeeDataCard: React.FC<EmployeeDataCardProps> = ({ data, visual
         
         <div className="max-h-96 overflow-y-auto">
           <div className="space-y-1 p-4">
-            {data.employees.map((employee, index) => (
+            {employees.map((employee, index) => (
               <div key={index} className="bg-gray-50 hover:bg-gray-100 p-4 rounded-lg border transition-colors">
                 <div className="flex justify-between items-start">
                   <div className="flex-1">
@@ -293,11 +326,23 @@ export const EmployeeDataCard: React.FC<EmployeeDataCardProps> = ({ data, visual
           </div>
         </div>
         
-        {data.employees.length > 10 && (
-          <div className="p-4 border-t border-gray-200 text-center">
-            <span className="text-sm text-gray-500">
-              Showing first 10 of {data.employees.length} employees
+        {employees.length < total && (
+          <div className="p-4 border-t border-gray-200 text-center space-y-2">
+            <span className="block text-sm text-gray-500">
+              Showing {employees.length} of {total} employees
             </span>
+            {nextCursor !== null && data.query_id && (
+              <button
+                onClick={loadMore}
+                disabled={isLoadingMore}
+                className="px-4 py-2 text-sm font-medium text-blue-600 bg-blue-50 rounded-lg hover:bg-blue-100 disabled:opacity-50"
+              >
+                {isLoadingMore ? 'Loading...' : 'Load more'}
+              </button>
+            )}
+            {loadError && (
+              <span className="block text-xs text-red-600">{loadError}</span>
+            )}
           </div>
         )}
       </div>
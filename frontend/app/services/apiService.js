@@ -42,4 +42,40 @@ export const getCourseRecommendations = async (skill) => {
       // Return empty array instead of rethrowing
       return [];
     }
-};
\ No newline at end of file
+};
+
+// Course recommendations for several skills in one round trip; results come back in the same order
+export const getBatchCourseRecommendations = async (skills) => {
+    try {
+      const controller = new AbortController();
+      const timeoutId = setTimeout(() => controller.abort(), 60000); // 60-second timeout
+      
+      const response = await fetch(`${API_BASE_URL}/recommend-courses/batch`, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+          'Accept': 'application/json'
+        },
+        body: JSON.stringify({ profiles: skills }),
+        signal: controller.signal
+      });
+      
+      clearTimeout(timeoutId);
+      
+      if (!response.ok) {
+        throw new Error(`Server responded with ${response.status}: ${response.statusText}`);
+      }
+      
+      const data = await response.json();
+      
+      if (!Array.isArray(data.recommendations)) {
+        console.error('API returned unexpected batch data:', data);
+        return skills.map(() => []);
+      }
+      
+      return data.recommendations;
+    } catch (error) {
+      console.error('Error fetching batch course recommendations:', error);
+      return skills.map(() => []);
+    }
+};